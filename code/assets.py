@@ -0,0 +1,149 @@
+import pygame
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from settings import *
+from manifest import asset_manifest, asset_path
+
+
+class AssetCache:
+    def __init__(self, budget: Optional[int] = None) -> None:
+        """Process wide cache of decoded images. Images are keyed by their content hash from the asset manifest,
+        so identical files share one surface, and by their path if they aren't in the manifest.
+
+        Args:
+            budget (Optional[int], optional): Max amount of bytes of surfaces to keep around.
+                The least recently used surfaces are evicted once it's exceeded. Defaults to None (no limit).
+        """
+        self.budget = budget
+        self.surfaces: OrderedDict[Tuple[str, bool], pygame.Surface] = OrderedDict()
+
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+
+    @staticmethod
+    def surface_size(surface: pygame.Surface) -> int:
+        """Returns the amount of bytes used by the pixels of a surface.
+
+        Args:
+            surface (pygame.Surface): The surface to measure.
+
+        Returns:
+            int: Size of the pixel data in bytes.
+        """
+        return surface.get_pitch() * surface.get_height()
+
+    @staticmethod
+    def key(path: str, alpha: bool) -> Tuple[str, bool]:
+        """Returns the cache key of an image.
+
+        Args:
+            path (str): Path to the image.
+            alpha (bool): Whether the image is converted with per pixel alpha.
+
+        Returns:
+            Tuple[str, bool]: The content hash, or the normalised path, and the alpha flag.
+        """
+        return (asset_manifest.content_hash(path) or asset_path(path), alpha)
+
+    def load(self, path: str, alpha: bool = True) -> pygame.Surface:
+        """Returns the surface for an image, only reading it from disk the first time.
+        The returned surface is shared, so it should not be drawn on.
+
+        Args:
+            path (str): Path to the image.
+            alpha (bool, optional): Whether to convert the image with per pixel alpha. Defaults to True.
+
+        Returns:
+            pygame.Surface: The decoded and converted image.
+        """
+        key = self.key(path, alpha)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        return self.insert(path, pygame.image.load(path), alpha)
+
+    def cached(self, path: str, alpha: bool = True) -> bool:
+        """Returns whether an image is in the cache, without counting a hit or miss.
+
+        Args:
+            path (str): Path to the image.
+            alpha (bool, optional): Whether the image was converted with per pixel alpha. Defaults to True.
+
+        Returns:
+            bool: True if loading the image would be a hit.
+        """
+        return self.key(path, alpha) in self.surfaces
+
+    def insert(self, path: str, surface: pygame.Surface, alpha: bool = True) -> pygame.Surface:
+        """Converts an image that was decoded somewhere else and adds it to the cache,
+        so loading it later is a hit. Used to decode images on worker threads.
+
+        Args:
+            path (str): Path of the image.
+            surface (pygame.Surface): The decoded, unconverted image.
+            alpha (bool, optional): Whether to convert the image with per pixel alpha. Defaults to True.
+
+        Returns:
+            pygame.Surface: The converted image.
+        """
+        key = self.key(path, alpha)
+        if key in self.surfaces:
+            return self.surfaces[key]
+        surface = surface.convert_alpha() if alpha else surface.convert()
+        self.surfaces[key] = surface
+        self.bytes += self.surface_size(surface)
+        self.evict()
+        return surface
+
+    def evict(self) -> None:
+        """Drops the least recently used surfaces until the cache fits in its budget.
+        The most recently used surface is always kept.
+        """
+        if self.budget is None:
+            return
+        while self.bytes > self.budget and len(self.surfaces) > 1:
+            _, surface = self.surfaces.popitem(last=False)
+            self.bytes -= self.surface_size(surface)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Empties the cache, the counters are left as they are.
+        """
+        self.surfaces.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the cache counters.
+
+        Returns:
+            Dict[str, int]: hits, misses, evictions, amount of cached surfaces and their size in bytes.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'surfaces': len(self.surfaces),
+            'bytes': self.bytes}
+
+
+asset_cache = AssetCache(ASSET_CACHE_BUDGET)
+
+
+def load_image(path: str, alpha: bool = True) -> pygame.Surface:
+    """Loads an image through the shared asset cache.
+
+    Args:
+        path (str): Path to the image.
+        alpha (bool, optional): Whether to convert the image with per pixel alpha. Defaults to True.
+
+    Returns:
+        pygame.Surface: The cached surface.
+    """
+    return asset_cache.load(path, alpha)
@@ -0,0 +1,285 @@
+import json
+import posixpath
+import pygame
+import zlib
+from functools import partial
+from os import makedirs, path as os_path
+from typing import Callable, Dict, List, Optional, Tuple
+from settings import *
+from assets import load_image
+from manifest import asset_manifest, asset_path
+
+
+class TextureAtlas:
+    def __init__(self, sheet: pygame.Surface, frames: Dict[str, pygame.Rect], folders: Dict[str, List[str]]) -> None:
+        """One big surface that holds many small images, the images are handed out as subsurfaces of it.
+        Subsurfaces share the pixels of the sheet, so a whole animation folder is one allocation.
+
+        Args:
+            sheet (pygame.Surface): The packed images.
+            frames (Dict[str, pygame.Rect]): Area of every image on the sheet by its path.
+            folders (Dict[str, List[str]]): Paths of the images in every folder, in the order import_folder returns them.
+        """
+        self.sheet = sheet
+        self.frames = frames
+        self.folders = folders
+        self.subsurfaces: Dict[str, pygame.Surface] = {}
+
+    def frame(self, path: str) -> pygame.Surface:
+        """Returns one image of the atlas.
+
+        Args:
+            path (str): Path of the image.
+
+        Returns:
+            pygame.Surface: Subsurface of the sheet.
+        """
+        path = asset_path(path)
+        surface = self.subsurfaces.get(path)
+        if surface is None:
+            surface = self.subsurfaces[path] = self.sheet.subsurface(self.frames[path])
+        return surface
+
+    def folder(self, path: str) -> List[pygame.Surface]:
+        """Returns the images of a folder.
+
+        Args:
+            path (str): Path of the folder.
+
+        Returns:
+            List[pygame.Surface]: Subsurfaces of the sheet.
+        """
+        return [self.frame(frame_path) for frame_path in self.folders.get(asset_path(path), [])]
+
+
+def find_frames(root: str) -> Dict[str, List[str]]:
+    """Lists the images below a folder from the asset manifest.
+
+    Args:
+        root (str): The folder to search.
+
+    Returns:
+        Dict[str, List[str]]: Paths of the images in frame order by the folder they're in.
+    """
+    root = asset_path(root)
+    return {folder: asset_manifest.frames(folder) for folder in list(asset_manifest.folders)
+            if folder == root or folder.startswith(root + '/')}
+
+
+def pack_frames(sizes: Dict[str, Tuple[int, int]], width: int = ATLAS_WIDTH) -> Tuple[Dict[str, pygame.Rect], int]:
+    """Places rectangles on a sheet row by row, tallest first, so every row wastes little height.
+
+    Args:
+        sizes (Dict[str, Tuple[int, int]]): Width and height of every image by its path.
+        width (int, optional): Width of the sheet. Defaults to ATLAS_WIDTH.
+
+    Returns:
+        Tuple[Dict[str, pygame.Rect], int]: Area of every image and the height of the sheet.
+    """
+    frames = {}
+    x = y = row_height = 0
+    for path, (frame_width, frame_height) in sorted(sizes.items(), key=lambda item: (-item[1][1], -item[1][0], item[0])):
+        if x + frame_width > width:
+            x = 0
+            y += row_height
+            row_height = 0
+        frames[path] = pygame.Rect(x, y, frame_width, frame_height)
+        x += frame_width
+        row_height = max(row_height, frame_height)
+    return frames, y + row_height
+
+
+def decode_frames(root: str) -> Tuple[Dict[str, List[str]], Dict[str, pygame.Surface]]:
+    """Reads and decodes every image below a folder. Doesn't touch the display, so it can run on a worker thread.
+
+    Args:
+        root (str): The folder to pack.
+
+    Returns:
+        Tuple[Dict[str, List[str]], Dict[str, pygame.Surface]]: The images by folder and the unconverted images by path.
+    """
+    folders = find_frames(root)
+    return folders, {path: pygame.image.load(path) for paths in folders.values() for path in paths}
+
+
+def pack_atlas(folders: Dict[str, List[str]], images: Dict[str, pygame.Surface]) -> TextureAtlas:
+    """Packs decoded images into one atlas.
+
+    Args:
+        folders (Dict[str, List[str]]): Paths of the images by the folder they're in.
+        images (Dict[str, pygame.Surface]): The decoded images by path.
+
+    Returns:
+        TextureAtlas: The new atlas.
+    """
+    images = {path: image.convert_alpha() for path, image in images.items()}
+    frames, height = pack_frames({path: image.get_size() for path, image in images.items()})
+
+    # the images are copied onto the transparent sheet as they are, blending would darken their soft edges
+    sheet = pygame.Surface((ATLAS_WIDTH, max(height, 1)), pygame.SRCALPHA)
+    sheet.blits([(image, frames[path], None, pygame.BLEND_RGBA_MAX) for path, image in images.items()], doreturn=False)
+    return TextureAtlas(sheet.convert_alpha(), frames, folders)
+
+
+def build_atlas(root: str) -> TextureAtlas:
+    """Packs every image below a folder into one atlas.
+
+    Args:
+        root (str): The folder to pack.
+
+    Returns:
+        TextureAtlas: The new atlas.
+    """
+    return pack_atlas(*decode_frames(root))
+
+
+def atlas_paths(root: str) -> Tuple[str, str]:
+    """Returns where the prebuilt atlas of a folder is stored.
+
+    Args:
+        root (str): The packed folder.
+
+    Returns:
+        Tuple[str, str]: Path of the sheet image and of its frame index.
+    """
+    name = posixpath.basename(asset_path(root))
+    return f"{ATLAS_DIR}/{name}.rgba", f"{ATLAS_DIR}/{name}.json"
+
+
+def save_atlas(root: str, atlas: TextureAtlas) -> None:
+    """Writes an atlas to ATLAS_DIR so later starts don't have to pack it again.
+    The sheet is stored as raw pixels compressed with a fast zlib level, which loads several
+    times faster than decoding a png of the same size.
+
+    Args:
+        root (str): The packed folder.
+        atlas (TextureAtlas): The atlas of the folder.
+    """
+    sheet_path, index_path = atlas_paths(root)
+    makedirs(ATLAS_DIR, exist_ok=True)
+    with open(sheet_path, 'wb') as sheet_file:
+        sheet_file.write(zlib.compress(pygame.image.tobytes(atlas.sheet, 'RGBA'), 1))
+    with open(index_path, 'w') as index_file:
+        json.dump({
+            'hash': asset_manifest.tree_hash(root),
+            'size': atlas.sheet.get_size(),
+            'frames': {path: list(rect) for path, rect in atlas.frames.items()},
+            'folders': atlas.folders}, index_file, indent=1)
+
+
+def read_prebuilt_atlas(root: str) -> Optional[Tuple[dict, bytes]]:
+    """Reads the prebuilt atlas of a folder if it was built from the images the asset manifest lists.
+    Doesn't touch the display, so it can run on a worker thread.
+
+    Args:
+        root (str): The packed folder.
+
+    Returns:
+        Optional[Tuple[dict, bytes]]: The frame index and the pixels of the sheet, or None if it's missing or outdated.
+    """
+    sheet_path, index_path = atlas_paths(root)
+    if not (os_path.exists(sheet_path) and os_path.exists(index_path)):
+        return None
+
+    with open(index_path) as index_file:
+        index = json.load(index_file)
+    if index.get('hash') != asset_manifest.tree_hash(root):
+        return None
+    with open(sheet_path, 'rb') as sheet_file:
+        return index, zlib.decompress(sheet_file.read())
+
+
+def unpack_atlas(index: dict, pixels: bytes) -> TextureAtlas:
+    """Creates an atlas from a prebuilt sheet.
+
+    Args:
+        index (dict): The frame index of the sheet.
+        pixels (bytes): The RGBA pixels of the sheet.
+
+    Returns:
+        TextureAtlas: The atlas.
+    """
+    sheet = pygame.image.frombuffer(pixels, index['size'], 'RGBA').convert_alpha()
+    frames = {asset_path(path): pygame.Rect(rect) for path, rect in index['frames'].items()}
+    folders = {asset_path(folder): [asset_path(path) for path in paths] for folder, paths in index['folders'].items()}
+    return TextureAtlas(sheet, frames, folders)
+
+
+def decode_atlas(root: str) -> Callable[[], TextureAtlas]:
+    """Does the slow part of loading the atlas of a folder: reading the prebuilt sheet,
+    or decoding the images if it's missing or outdated. Can run on a worker thread.
+
+    Args:
+        root (str): The packed folder.
+
+    Returns:
+        Callable[[], TextureAtlas]: Finishes the atlas, has to be called on the main thread
+            because converting surfaces needs the display.
+    """
+    prebuilt = read_prebuilt_atlas(root)
+    if prebuilt is not None:
+        return partial(unpack_atlas, *prebuilt)
+    return partial(pack_atlas, *decode_frames(root))
+
+
+def atlas_root(path: str) -> Optional[str]:
+    """Returns the atlas folder a path is in.
+
+    Args:
+        path (str): Path of an image or folder.
+
+    Returns:
+        Optional[str]: The normalised atlas folder, or None if the path isn't below one of the ATLAS_FOLDERS.
+    """
+    path = asset_path(path)
+    for root in ATLAS_FOLDERS:
+        root = asset_path(root)
+        if path == root or path.startswith(root + '/'):
+            return root
+    return None
+
+
+atlases: Dict[str, TextureAtlas] = {}
+
+
+def get_atlas(path: str) -> Optional[TextureAtlas]:
+    """Returns the atlas that contains a path, loading or packing it the first time.
+
+    Args:
+        path (str): Path of an image or folder.
+
+    Returns:
+        Optional[TextureAtlas]: The atlas, or None if the path isn't below one of the ATLAS_FOLDERS.
+    """
+    root = atlas_root(path)
+    if root is None:
+        return None
+    atlas = atlases.get(root)
+    if atlas is None:
+        atlas = atlases[root] = decode_atlas(root)()
+    return atlas
+
+
+def load_frame(path: str) -> pygame.Surface:
+    """Returns an image from its atlas, or through the asset cache if it isn't in one.
+
+    Args:
+        path (str): Path of the image.
+
+    Returns:
+        pygame.Surface: The image.
+    """
+    atlas = get_atlas(path)
+    if atlas is None:
+        return load_image(path)
+    return atlas.frame(path)
+
+
+if __name__ == "__main__":
+    pygame.init()
+    # images are converted to the display format, so a (dummy) display is still needed
+    pygame.display.set_mode((1, 1), pygame.HIDDEN)
+    for root in ATLAS_FOLDERS:
+        atlas = build_atlas(root)
+        save_atlas(root, atlas)
+        print(f"packed {len(atlas.frames)} images of {root} into a {atlas.sheet.get_width()}x{atlas.sheet.get_height()} atlas")
@@ -0,0 +1,216 @@
+import os
+
+# has to be set before pygame initialises the display
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import json
+import platform
+import subprocess
+import tracemalloc
+import pygame
+from argparse import ArgumentParser
+from math import isqrt
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+from settings import *
+from support import import_map_layout
+from level import Level
+from timer import FixedClock
+
+
+def scale_layout(layout: Dict[str, List[List]], factor: int) -> Dict[str, List[List]]:
+    """Builds a bigger synthetic map by tiling the stock map.
+    Only the first copy keeps the player, the others keep their enemies.
+
+    Args:
+        layout (Dict[str, List[List]]): The map layers to repeat.
+        factor (int): How many times bigger the map area should be, has to be a square number.
+
+    Returns:
+        Dict[str, List[List]]: The tiled map layers.
+    """
+    repeat = isqrt(factor)
+    if repeat * repeat != factor:
+        raise ValueError(f"map scale has to be a square number, got {factor}")
+
+    scaled = {}
+    for style, rows in layout.items():
+        scaled_rows = []
+        for copy_row in range(repeat):
+            for row in rows:
+                scaled_row = []
+                for copy_col in range(repeat):
+                    if style == 'entities' and (copy_row or copy_col):
+                        scaled_row.extend(-1 if col == 394 else col for col in row)
+                    else:
+                        scaled_row.extend(row)
+                scaled_rows.append(scaled_row)
+        scaled[style] = scaled_rows
+    return scaled
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    """Returns the nearest rank percentile of the samples.
+
+    Args:
+        samples (List[float]): The measured values.
+        percent (float): Percentile between 0 and 100.
+
+    Returns:
+        float: The value below which the given percentage of samples fall.
+    """
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def frame_phases(level: Level) -> List[Tuple[str, Callable[[], None]]]:
+    """Returns the phases of Level.run in the order they are run.
+
+    Args:
+        level (Level): The level to benchmark.
+
+    Returns:
+        List[Tuple[str, Callable[[], None]]]: Name and function of every phase.
+    """
+    return [
+        ('custom_draw', lambda: level.visible_sprites.custom_draw(level.player, force=True)),
+        ('update', lambda: [player.update() for player in level.players]),
+        ('flow_field', lambda: level.flow_field.update([player.rect.center for player in level.players])),
+        ('enemy_update', lambda: level.enemies.update(level.players, level.flow_field)),
+        ('particles', level.particles.update),
+        ('ui.display', lambda: level.ui.display(level.player))]
+
+
+def run_frames(level: Level, clock: FixedClock, frames: int, measure: Callable) -> Dict[str, List[float]]:
+    """Runs the level for some frames and measures every phase.
+
+    Args:
+        level (Level): The level to run.
+        clock (FixedClock): The clock of the level, advanced one timestep per frame.
+        frames (int): Amount of frames to run.
+        measure (Callable): Called with a phase function, returns the measurement for it.
+
+    Returns:
+        Dict[str, List[float]]: The measurements of every phase and the whole frame.
+    """
+    phases = frame_phases(level)
+    samples = {name: [] for name, _ in phases}
+    samples['frame'] = []
+    for _ in range(frames):
+        clock.advance(FIXED_TIMESTEP)
+        frame_total = 0
+        for name, phase in phases:
+            value = measure(phase)
+            samples[name].append(value)
+            frame_total += value
+        samples['frame'].append(frame_total)
+    return samples
+
+
+def time_phase(phase: Callable) -> float:
+    start = perf_counter()
+    phase()
+    return (perf_counter() - start) * 1000
+
+
+def allocate_phase(phase: Callable) -> float:
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    phase()
+    return tracemalloc.get_traced_memory()[1] - before
+
+
+def summarise(samples: List[float]) -> Dict[str, float]:
+    return {
+        'p50': percentile(samples, 50),
+        'p95': percentile(samples, 95),
+        'p99': percentile(samples, 99),
+        'max': max(samples)}
+
+
+def bench_map(name: str, layout: dict, frames: int, warmup: int, allocations: bool) -> dict:
+    """Loads a map and measures its startup time and frame phases.
+
+    Args:
+        name (str): Name of the map in the report.
+        layout (dict): The map layers.
+        frames (int): Amount of frames to measure.
+        warmup (int): Amount of frames to run before measuring.
+        allocations (bool): Whether to also measure the peak memory allocated by every phase.
+
+    Returns:
+        dict: The report for the map.
+    """
+    clock = FixedClock()
+    start = perf_counter()
+    level = Level(clock, layout)
+    load_time = (perf_counter() - start) * 1000
+
+    run_frames(level, clock, warmup, time_phase)
+    timings = run_frames(level, clock, frames, time_phase)
+
+    report = {
+        'map': name,
+        'frames': frames,
+        'load_ms': load_time,
+        'sprites': {
+            'tiles': len(level.tiles),
+            'visible': len(level.visible_sprites),
+            'obstacle': len(level.obstacle_sprites),
+            'enemy': len(level.enemies),
+            'drawn': len(level.visible_sprites.visible_sprites())},
+        'phases_ms': {phase: summarise(values) for phase, values in timings.items()}}
+
+    if allocations:
+        # measured in a separate pass since tracing slows everything down
+        tracemalloc.start()
+        peaks = run_frames(level, clock, frames, allocate_phase)
+        tracemalloc.stop()
+        report['phases_peak_alloc_bytes'] = {
+            phase: summarise(values) for phase, values in peaks.items() if phase != 'frame'}
+    return report
+
+
+def commit_hash() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Runs the level headless and reports per phase frame timings as JSON.")
+    parser.add_argument('--frames', type=int, default=300, help="frames to measure per map")
+    parser.add_argument('--warmup', type=int, default=30, help="frames to run before measuring")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 4, 16, 64],
+                        help="map sizes to run, as multiples of the stock map area")
+    parser.add_argument('--allocations', action='store_true', help="also measure peak allocations per phase")
+    parser.add_argument('--output', help="file to write the report to, defaults to stdout")
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGTH))
+
+    stock_layout = import_map_layout()
+    maps = []
+    for scale in args.scales:
+        name = 'stock' if scale == 1 else f'{scale}x'
+        layout = stock_layout if scale == 1 else scale_layout(stock_layout, scale)
+        maps.append(bench_map(name, layout, args.frames, args.warmup, args.allocations))
+
+    report = {
+        'commit': commit_hash(),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'fixed_timestep_ms': FIXED_TIMESTEP,
+        'maps': maps}
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            report_file.write(output + '\n')
+    else:
+        print(output)
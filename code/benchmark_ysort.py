@@ -0,0 +1,116 @@
+import os
+import pygame
+from argparse import ArgumentParser
+from random import Random
+from time import perf_counter
+from settings import *
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+
+class MovingSprite(pygame.sprite.Sprite):
+    def __init__(self, pos, groups) -> None:
+        """Stand in for an entity that wanders around a bit every frame.
+        """
+        super().__init__()
+        self.image = pygame.Surface((TILESIZE, TILESIZE))
+        self.rect = self.image.get_rect(topleft=pos)
+        self.add(groups)
+
+
+def build_scene(sprite_count: int, seed: int = 0):
+    """Fills a camera group with tiles on a square map and a few moving sprites.
+    The tiles are also returned as Tile sprites, for the methods that sort sprites.
+
+    Args:
+        sprite_count (int): Total amount of sprites.
+        seed (int, optional): Seed for the sprite placement. Defaults to 0.
+
+    Returns:
+        tuple: The camera group, the tile and moving sprites and the random generator.
+    """
+    from level import YsortCameraGroup
+    from tile import Tile
+    from tile_store import TileStore
+
+    rng = Random(seed)
+    moving_count = max(10, sprite_count // 100)
+    side = int((sprite_count - moving_count) ** 0.5) + 1
+    surface = pygame.Surface((TILESIZE, TILESIZE))
+    tile_store = TileStore(side, side)
+    group = YsortCameraGroup(tile_store)
+
+    tiles = []
+    for index in range(sprite_count - moving_count):
+        row, col = divmod(index, side)
+        tile_store.add((col * TILESIZE, row * TILESIZE), 'grass', surface)
+        tiles.append(Tile((col * TILESIZE, row * TILESIZE), [], 'grass', surface))
+
+    moving = [MovingSprite((rng.randrange(side * TILESIZE), rng.randrange(side * TILESIZE)), [group])
+              for _ in range(moving_count)]
+
+    # put the camera in the middle of the map
+    group.camera_rect.center = (side * TILESIZE // 2, side * TILESIZE // 2)
+    return group, tiles + moving, moving, rng
+
+
+def move_sprites(moving: list, rng: Random) -> None:
+    for sprite in moving:
+        sprite.rect.move_ip(rng.randint(-5, 5), rng.randint(-5, 5))
+
+
+def bench(sprite_count: int, frames: int) -> dict:
+    """Times the old full sort against the incremental y-sort for one scene size.
+
+    Args:
+        sprite_count (int): Amount of sprites in the scene.
+        frames (int): Amount of frames to time.
+
+    Returns:
+        dict: Average milliseconds per frame for every method.
+    """
+    from depth_sort import DepthSortedList
+
+    results = {}
+
+    # sorted() over every sprite, what custom_draw used to do
+    group, sprites, moving, rng = build_scene(sprite_count)
+    start = perf_counter()
+    for _ in range(frames):
+        move_sprites(moving, rng)
+        sorted(sprites, key=lambda sprite: sprite.rect.centery)
+    results['full sort'] = (perf_counter() - start) / frames * 1000
+
+    # one persistent list of every sprite, only the moving ones get repositioned
+    group, sprites, moving, rng = build_scene(sprite_count)
+    depth_list = DepthSortedList(sprites)
+    start = perf_counter()
+    for _ in range(frames):
+        move_sprites(moving, rng)
+        for sprite in moving:
+            depth_list.reposition(sprite)
+    results['incremental sort'] = (perf_counter() - start) / frames * 1000
+
+    # what custom_draw does now, the depth sorted tile store chunks the camera sees merged with the moving sprites
+    group, sprites, moving, rng = build_scene(sprite_count)
+    start = perf_counter()
+    for _ in range(frames):
+        move_sprites(moving, rng)
+        group.visible_sprites()
+    results['culled incremental sort'] = (perf_counter() - start) / frames * 1000
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Compares the y-sort methods of the camera group.")
+    parser.add_argument('--frames', type=int, default=50, help="frames to time per scene size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGTH))
+
+    print(f"{'sprites':>8} | {'method':<24} | ms/frame")
+    for size in args.sizes:
+        for method, ms in bench(size, args.frames).items():
+            print(f"{size:>8} | {method:<24} | {ms:8.3f}")
@@ -0,0 +1,312 @@
+import asyncio
+import pygame
+import socket
+from collections import OrderedDict, deque
+from functools import partial
+from time import monotonic
+from typing import Dict, Optional, Tuple
+from settings import *
+from network import *
+from level import Level
+from main import Game
+from timer import FixedClock
+from player import read_keyboard
+from networked_player import NetworkedPlayer, NetworkedEnemy, PredictedPlayer
+
+
+class GameClient(asyncio.DatagramProtocol):
+    def __init__(self, address: Tuple[str, int]) -> None:
+        """UDP connection to a game server. Sends the local input every tick and
+        keeps the snapshots it receives so the entities can be drawn between them.
+
+        Args:
+            address (Tuple[str, int]): Host and port of the server.
+        """
+        self.address = address
+        self.entity_id = None
+        self.seed = None
+
+        # inputs the server hasn't simulated yet, resent with every input packet
+        self.input_seq = 0
+        self.pending_inputs = deque(maxlen=INPUT_BUFFER_SIZE)
+
+        # decoded snapshots by id, the server delta compresses against the last one acknowledged
+        self.snapshots: OrderedDict[int, Dict[int, EntityState]] = OrderedDict()
+        self.acked_snapshot = 0
+        self.last_processed_input = 0
+        # (last processed input, state) of the local player in the newest snapshot, the player is predicted from it
+        self.authoritative: Optional[Tuple[int, EntityState]] = None
+
+        # (server tick, states) of the newest snapshots, entities are drawn INTERPOLATION_DELAY ticks behind the newest one
+        self.timeline = deque(maxlen=SNAPSHOT_HISTORY)
+        self.render_tick = None
+
+        # bandwidth counters
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+        self.loop = asyncio.new_event_loop()
+        self.transport, _ = self.loop.run_until_complete(
+            self.loop.create_datagram_endpoint(lambda: self, remote_addr=address))
+
+    def datagram_received(self, data: bytes, address: Tuple[str, int]) -> None:
+        if not data:
+            return
+        self.bytes_received += len(data)
+        packet_type = data[0]
+
+        # packets that are cut off or corrupt are dropped like lost ones
+        if packet_type == WELCOME:
+            if len(data) != WELCOME_PACKET.size:
+                return
+            _, self.entity_id, self.seed = WELCOME_PACKET.unpack_from(data)
+        elif packet_type == SNAPSHOT:
+            try:
+                snapshot_id, base_id, tick, last_input = decode_snapshot_header(data)
+            except ValueError:
+                return
+            # late packets are dropped, and so are deltas against a snapshot that was already forgotten
+            if snapshot_id <= self.acked_snapshot:
+                return
+            if base_id and base_id not in self.snapshots:
+                return
+            try:
+                states, _, _ = decode_snapshot(data, self.snapshots.get(base_id, {}))
+            except ValueError:
+                return
+
+            self.snapshots[snapshot_id] = states
+            while len(self.snapshots) > SNAPSHOT_HISTORY:
+                self.snapshots.popitem(last=False)
+            self.acked_snapshot = snapshot_id
+            self.last_processed_input = max(self.last_processed_input, last_input)
+            if self.entity_id in states:
+                self.authoritative = (last_input, states[self.entity_id])
+            self.timeline.append((tick, states))
+
+    def send(self, packet: bytes) -> None:
+        self.bytes_sent += len(packet)
+        self.transport.sendto(packet)
+
+    def poll(self) -> None:
+        """Handles the packets that arrived since the last poll without blocking.
+        """
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+
+    def connect(self, timeout: float = CLIENT_TIMEOUT) -> None:
+        """Asks the server for a player until it answers.
+
+        Args:
+            timeout (float, optional): Seconds to wait for the server. Defaults to CLIENT_TIMEOUT.
+
+        Raises:
+            ConnectionError: If the server didn't answer in time.
+        """
+        deadline = monotonic() + timeout
+        while self.entity_id is None:
+            if monotonic() > deadline:
+                raise ConnectionError(f"no answer from {self.address[0]}:{self.address[1]}")
+            self.send(PACKET_TYPE.pack(CONNECT))
+            self.loop.run_until_complete(asyncio.sleep(0.1))
+
+    def disconnect(self) -> None:
+        """Tells the server the player left and closes the connection.
+        """
+        self.send(PACKET_TYPE.pack(DISCONNECT))
+        self.transport.close()
+        self.poll()
+        self.loop.close()
+
+    def send_input(self, input_bits: int) -> None:
+        """Sends the input of one tick, together with the inputs the server hasn't simulated yet.
+
+        Args:
+            input_bits (int): The pressed keys as input bits.
+        """
+        self.input_seq += 1
+        self.pending_inputs.append((self.input_seq, input_bits))
+        while self.pending_inputs and self.pending_inputs[0][0] <= self.last_processed_input:
+            self.pending_inputs.popleft()
+        inputs = [bits for _, bits in reversed(self.pending_inputs)]
+        self.send(encode_input(self.acked_snapshot, self.input_seq, inputs))
+
+    def advance(self) -> None:
+        """Moves the render time one tick forward, staying INTERPOLATION_DELAY ticks behind the newest snapshot.
+        If the render time drifted too far from that, because packets were late or came in bursts, it jumps back in line.
+        """
+        if not self.timeline:
+            return
+        target = self.timeline[-1][0] - INTERPOLATION_DELAY
+        if self.render_tick is None or abs(self.render_tick + 1 - target) > INTERPOLATION_DELAY:
+            self.render_tick = target
+        else:
+            self.render_tick = min(self.render_tick + 1, self.timeline[-1][0])
+
+    def entity_ids(self) -> Dict[int, int]:
+        """Returns the entities of the newest snapshot.
+
+        Returns:
+            Dict[int, int]: Kind index by network id.
+        """
+        if not self.timeline:
+            return {}
+        return {entity_id: state[0] for entity_id, state in self.timeline[-1][1].items()}
+
+    def interpolated_state(self, entity_id: int) -> Optional[EntityState]:
+        """Returns the state of an entity at the render time. The position is interpolated between
+        the snapshots before and after it, everything else is taken from the one before.
+
+        Args:
+            entity_id (int): Network id of the entity.
+
+        Returns:
+            Optional[EntityState]: The state, or None if the entity isn't in any snapshot around the render time.
+        """
+        if self.render_tick is None:
+            return None
+        before = after = None
+        for tick, states in self.timeline:
+            if tick <= self.render_tick:
+                before = (tick, states)
+            else:
+                after = (tick, states)
+                break
+
+        if before is None:
+            return after[1].get(entity_id) if after else None
+        state = before[1].get(entity_id)
+        if state is None or after is None or entity_id not in after[1]:
+            return state
+
+        next_state = after[1][entity_id]
+        amount = (self.render_tick - before[0]) / (after[0] - before[0])
+        x = round(state[1] + (next_state[1] - state[1]) * amount)
+        y = round(state[2] + (next_state[2] - state[2]) * amount)
+        return (state[0], x, y) + state[3:]
+
+
+def find_room(lobby: Tuple[str, int], room: str, timeout: float = CLIENT_TIMEOUT) -> Tuple[str, int]:
+    """Asks the lobby of a room server where a room is, the room is opened if it isn't running yet.
+
+    Args:
+        lobby (Tuple[str, int]): Host and lobby port of the room server.
+        room (str): Name of the room.
+        timeout (float, optional): Seconds to wait for the server. Defaults to CLIENT_TIMEOUT.
+
+    Raises:
+        ConnectionError: If the server didn't answer in time.
+
+    Returns:
+        Tuple[str, int]: Host and port of the room, to connect a GameClient to.
+    """
+    deadline = monotonic() + timeout
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(0.1)
+        while monotonic() < deadline:
+            sock.sendto(encode_join(room), lobby)
+            try:
+                data = sock.recv(ROOM_PACKET.size)
+            except socket.timeout:
+                continue
+            if len(data) == ROOM_PACKET.size and data[0] == ROOM:
+                return lobby[0], ROOM_PACKET.unpack(data)[1]
+    raise ConnectionError(f"no answer from the lobby at {lobby[0]}:{lobby[1]}")
+
+
+class ClientLevel(Level):
+    def __init__(self, client: GameClient, clock=None, progress=None) -> None:
+        """Level that draws the entities of a server instead of simulating them.
+        The map, tiles and world streaming are local, players and enemies are networked sprites.
+
+        Args:
+            client (GameClient): Connection to the server, has to be connected.
+            clock (optional): Clock used for animations. Defaults to None, the system clock.
+            progress (optional): Called while the assets load, see Level. Defaults to None.
+        """
+        self.client = client
+        self.networked = {}
+        super().__init__(clock, seed=client.seed, local_player=False, progress=progress)
+
+    def spawn_enemy(self, spawn: tuple, enemy_name: str) -> None:
+        """Enemies are spawned by the server."""
+        return None
+
+    def sync_entities(self) -> None:
+        """Creates sprites for the entities that entered the newest snapshot and removes the ones that left.
+        """
+        entities = self.client.entity_ids()
+        for entity_id in [entity_id for entity_id in self.networked if entity_id not in entities]:
+            sprite = self.networked.pop(entity_id)
+            if sprite is self.player:
+                self.player = None
+                self.players = []
+            self.destroy_attack(sprite)
+            sprite.kill()
+
+        for entity_id, kind in entities.items():
+            if entity_id in self.networked:
+                continue
+            state = self.client.timeline[-1][1][entity_id]
+            if KINDS[kind] == 'player':
+                # the local player is predicted from its own input, the others follow the server
+                player_class = PredictedPlayer if entity_id == self.client.entity_id else NetworkedPlayer
+                sprite = player_class((state[1], state[2]), [self.visible_sprites], self.obstacle_sprites,
+                                      None, None, self.client, entity_id, self.clock)
+                sprite.create_attack = partial(self.create_attack, sprite)
+                sprite.destroy_attack = partial(self.destroy_attack, sprite)
+                if entity_id == self.client.entity_id:
+                    self.player = sprite
+                    self.players = [sprite]
+                    self.visible_sprites.camera_pos = pygame.math.Vector2(sprite.rect.center)
+            else:
+                sprite = NetworkedEnemy(KINDS[kind], (0, 0), [self.visible_sprites], self.obstacle_sprites,
+                                        self.client, entity_id, self.clock)
+                sprite.hitbox.topleft = (state[1], state[2])
+            self.networked[entity_id] = sprite
+
+    def update(self) -> None:
+        """Follows the server state for one tick.
+        """
+        self.sync_entities()
+        self.world.update(self.stream_centers())
+        self.visible_sprites.update()
+
+    def draw(self) -> list:
+        """Draws all sprites and the UI once the server sent the local player.
+
+        Returns:
+            list: The rects of the screen that were drawn to.
+        """
+        if self.player:
+            return super().draw()
+        return []
+
+
+class NetworkGame(Game):
+    def __init__(self, address: Tuple[str, int]) -> None:
+        """Game that plays on a server instead of simulating the level itself.
+
+        Args:
+            address (Tuple[str, int]): Host and port of the server.
+        """
+        pygame.init()
+        self.screen = pygame.display.set_mode((WIDTH, HEIGTH), pygame.RESIZABLE)
+        pygame.display.set_caption("RPG-Game")
+        self.clock = pygame.time.Clock()
+
+        self.client = GameClient(address)
+        self.client.connect()
+
+        self.simulation_clock = FixedClock()
+        self.accumulator = 0
+        self.level = ClientLevel(self.client, self.simulation_clock, self.show_progress)
+        self.replay = None
+
+    def step(self) -> None:
+        """Sends the input of one tick and shows the server state one tick further.
+        """
+        self.client.poll()
+        self.client.send_input(read_keyboard())
+        self.client.advance()
+        super().step()
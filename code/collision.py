@@ -0,0 +1,105 @@
+import pygame
+from math import inf
+from typing import List, Optional, Tuple
+
+# a box as (left, top, width, height), floats while a move is being resolved
+Box = Tuple[float, float, float, float]
+
+HORIZONTAL = 0
+VERTICAL = 1
+
+
+def time_of_impact(box: Box, delta: Tuple[float, float], obstacle: pygame.Rect) -> Optional[Tuple[float, int]]:
+    """Sweeps a box along a movement and returns when it first touches an obstacle.
+    Obstacles the box already overlaps are ignored, so an entity that ends up inside one can walk out of it.
+
+    Args:
+        box (Box): The moving box.
+        delta (Tuple[float, float]): The movement in pixels.
+        obstacle (pygame.Rect): The obstacle hitbox.
+
+    Returns:
+        Optional[Tuple[float, int]]: The fraction of the movement done when they touch and the axis
+            the obstacle blocks, or None if the box doesn't run into it.
+    """
+    left, top, width, height = box
+    dx, dy = delta
+
+    if dx > 0:
+        entry_x = (obstacle.left - left - width) / dx
+        exit_x = (obstacle.right - left) / dx
+    elif dx < 0:
+        entry_x = (obstacle.right - left) / dx
+        exit_x = (obstacle.left - left - width) / dx
+    elif left < obstacle.right and left + width > obstacle.left:
+        entry_x, exit_x = -inf, inf
+    else:
+        return None
+
+    if dy > 0:
+        entry_y = (obstacle.top - top - height) / dy
+        exit_y = (obstacle.bottom - top) / dy
+    elif dy < 0:
+        entry_y = (obstacle.bottom - top) / dy
+        exit_y = (obstacle.top - top - height) / dy
+    elif top < obstacle.bottom and top + height > obstacle.top:
+        entry_y, exit_y = -inf, inf
+    else:
+        return None
+
+    entry = max(entry_x, entry_y)
+    if entry < 0 or entry >= 1 or entry >= min(exit_x, exit_y):
+        return None
+    # hitting a corner exactly blocks the vertical movement, like moving horizontally first would
+    return entry, HORIZONTAL if entry_x > entry_y else VERTICAL
+
+
+def sweep(box: Box, delta: Tuple[float, float], obstacles: List[pygame.Rect]) -> Tuple[float, Optional[int]]:
+    """Finds the first obstacle a box runs into along a movement.
+
+    Args:
+        box (Box): The moving box.
+        delta (Tuple[float, float]): The movement in pixels.
+        obstacles (List[pygame.Rect]): Hitboxes of the obstacles near the movement.
+
+    Returns:
+        Tuple[float, Optional[int]]: The fraction of the movement that is free and the axis that is blocked,
+            (1, None) if nothing is in the way.
+    """
+    first_time, first_axis = 1.0, None
+    for obstacle in obstacles:
+        impact = time_of_impact(box, delta, obstacle)
+        if impact and impact[0] < first_time:
+            first_time, first_axis = impact
+    return first_time, first_axis
+
+
+def move_and_slide(hitbox: pygame.Rect, delta: Tuple[int, int], obstacles: List[pygame.Rect]) -> None:
+    """Moves a hitbox as far as it can go and slides it along whatever it hits.
+    The hitbox is swept against the obstacles instead of being moved and pushed back out,
+    so it can't skip over an obstacle however fast it moves.
+    Every hit blocks one axis, so the movement is resolved in at most two sweeps.
+
+    Args:
+        hitbox (pygame.Rect): The hitbox to move, it is changed in place.
+        delta (Tuple[int, int]): The movement in pixels.
+        obstacles (List[pygame.Rect]): Hitboxes of the obstacles near the movement.
+    """
+    left, top = hitbox.topleft
+    dx, dy = delta
+    while dx or dy:
+        time, axis = sweep((left, top, hitbox.width, hitbox.height), (dx, dy), obstacles)
+        left += dx * time
+        top += dy * time
+        if axis is None:
+            break
+
+        # stop flush against the obstacle and keep the rest of the movement along it
+        remaining = 1 - time
+        if axis == HORIZONTAL:
+            left = round(left)
+            dx, dy = 0, dy * remaining
+        else:
+            top = round(top)
+            dx, dy = dx * remaining, 0
+    hitbox.topleft = (round(left), round(top))
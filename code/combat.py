@@ -0,0 +1,73 @@
+import pygame
+from math import sqrt
+from typing import Callable, Dict, List
+from settings import *
+from enemy import Enemy
+from enemy_batch import EnemyBatch
+from particles import ParticleSystem
+from player import Player
+from weapon import Weapon
+
+
+class Combat:
+    def __init__(self, enemies: EnemyBatch, on_kill: Callable[[Enemy, Player], None], particles: ParticleSystem) -> None:
+        """Deals the damage of player and enemy attacks. Attacks only look up the enemies in the grid cells
+        around them, so the amount of checks depends on how crowded the area is and not on how many enemies there are.
+
+        Args:
+            enemies (EnemyBatch): The enemies of the level, looked up through the grid of the batch.
+            on_kill (Callable[[Enemy, Player], None]): Called with the enemy and the player that killed it
+                when an enemy runs out of health.
+            particles (ParticleSystem): Plays the effect of the attack on every player that gets hit.
+        """
+        self.enemies = enemies
+        self.on_kill = on_kill
+        self.particles = particles
+
+        # no enemy attack reaches further than this
+        self.reach = max(monster['attack_radius'] for monster in ENEMY_DATA.values())
+
+    def player_attacks(self, attacks: Dict[Player, Weapon]) -> None:
+        """Damages the enemies the weapon of an attacking player overlaps, once per swing.
+
+        Args:
+            attacks (Dict[Player, Weapon]): The weapon of every attacking player.
+        """
+        for player, weapon in attacks.items():
+            for enemy in self.enemies.query(weapon.rect):
+                if enemy in weapon.hit_enemies or not enemy.hitbox.colliderect(weapon.rect):
+                    continue
+                if enemy.get_damage(player.get_full_weapon_damage(), player.hitbox.center):
+                    weapon.hit_enemies.add(enemy)
+                    self.enemies.wake(enemy)
+                    if enemy.health <= 0:
+                        self.on_kill(enemy, player)
+
+    def enemy_attacks(self, players: List[Player]) -> None:
+        """Damages the players that are within the attack radius of an attacking enemy,
+        and plays the effect of the attack type of the enemy on them.
+
+        Args:
+            players (List[Player]): The players in the scene.
+        """
+        area = pygame.Rect(0, 0, self.reach * 2, self.reach * 2)
+        for player in players:
+            player_x, player_y = area.center = player.rect.center
+            for enemy in self.enemies.query(area):
+                if enemy.status != 'attack':
+                    continue
+                delta_x = player_x - enemy.rect.centerx
+                delta_y = player_y - enemy.rect.centery
+                if sqrt(delta_x * delta_x + delta_y * delta_y) <= enemy.attack_radius:
+                    if player.get_damage(enemy.attack_damage):
+                        self.particles.spawn(enemy.attack_type, player.rect.center)
+
+    def update(self, players: List[Player], attacks: Dict[Player, Weapon]) -> None:
+        """Deals the damage of every attack this tick.
+
+        Args:
+            players (List[Player]): The players in the scene.
+            attacks (Dict[Player, Weapon]): The weapon of every attacking player.
+        """
+        self.player_attacks(attacks)
+        self.enemy_attacks(players)
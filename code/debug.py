@@ -1,18 +1,31 @@
 import pygame
+from settings import *
 pygame.init()
 font = pygame.font.Font(None, 30)
 
+# rendered debug texts, most debug values repeat from frame to frame
+text_cache = {}
 
-def debug(info: str, y: int = 10, x: int = 10) -> None:
+
+def debug(info: str, y: int = 10, x: int = 10) -> pygame.Rect:
     """Writes a string to screen.
 
     Args:
         info (str): The string to be written
         y (int, optional): Y coordinate of the message. Defaults to 10.
         x (int, optional): X coordinate of the message. Defaults to 10.
+
+    Returns:
+        pygame.Rect: The area of the screen that was drawn to.
     """
     display_surface = pygame.display.get_surface()
-    debug_surf = font.render(str(info), True, 'White')
+    info = str(info)
+    debug_surf = text_cache.get(info)
+    if debug_surf is None:
+        if len(text_cache) >= TEXT_CACHE_SIZE:
+            text_cache.clear()
+        debug_surf = text_cache[info] = font.render(info, True, 'White')
     debug_rect = debug_surf.get_rect(topleft=(x, y))
     pygame.draw.rect(display_surface, 'Black', debug_rect)
     display_surface.blit(debug_surf, debug_rect)
+    return debug_rect
@@ -0,0 +1,102 @@
+import pygame
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, List
+
+
+class DepthSortedList:
+    def __init__(self, sprites: Iterable[pygame.sprite.Sprite] = ()) -> None:
+        """List of sprites that is kept sorted by rect.centery.
+        Sprites are inserted in place once, and only the sprites that moved have to be repositioned.
+        Every sprite is stored with a unique key made from its depth and an insertion counter,
+        so sprites at the same depth keep their insertion order and can be found with a bisect.
+
+        Args:
+            sprites (Iterable[pygame.sprite.Sprite], optional): Sprites to start with. Defaults to ().
+        """
+        self.sprites: List[pygame.sprite.Sprite] = []
+        self.keys: List[int] = []
+        self.sprite_keys: Dict[pygame.sprite.Sprite, int] = {}
+        self.counter = 0
+        for sprite in sprites:
+            self.add(sprite)
+
+    def add(self, sprite: pygame.sprite.Sprite) -> None:
+        """Inserts a sprite after all the sprites with the same depth, like a stable sort would.
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite to insert.
+        """
+        key = (sprite.rect.centery << 32) | self.counter
+        self.counter = (self.counter + 1) & 0xFFFFFFFF
+        index = bisect_right(self.keys, key)
+        self.sprites.insert(index, sprite)
+        self.keys.insert(index, key)
+        self.sprite_keys[sprite] = key
+
+    def index(self, sprite: pygame.sprite.Sprite) -> int:
+        """Finds the position of a sprite using the key it was stored with.
+
+        Args:
+            sprite (pygame.sprite.Sprite): A sprite in the list.
+
+        Returns:
+            int: Index of the sprite.
+        """
+        return bisect_left(self.keys, self.sprite_keys[sprite])
+
+    def remove(self, sprite: pygame.sprite.Sprite) -> None:
+        """Removes a sprite, does nothing if it isn't in the list.
+
+        Args:
+            sprite (pygame.sprite.Sprite): The sprite to remove.
+        """
+        if sprite not in self.sprite_keys:
+            return
+        index = self.index(sprite)
+        del self.sprites[index]
+        del self.keys[index]
+        del self.sprite_keys[sprite]
+
+    def reposition(self, sprite: pygame.sprite.Sprite) -> None:
+        """Moves a sprite to its new place if its depth changed since it was inserted.
+        Like an insertion sort step, only the sprites between the old and new place are shifted,
+        which is cheap since moving sprites rarely travel far between frames.
+
+        Args:
+            sprite (pygame.sprite.Sprite): A sprite in the list.
+        """
+        if sprite.rect.centery == self.sprite_keys[sprite] >> 32:
+            return
+        sprites, keys = self.sprites, self.keys
+        old_index = self.index(sprite)
+        key = (sprite.rect.centery << 32) | self.counter
+        self.counter = (self.counter + 1) & 0xFFFFFFFF
+        new_index = bisect_right(keys, key)
+
+        if new_index > old_index:
+            # moved down, shift the sprites in between one step up
+            new_index -= 1
+            sprites[old_index:new_index] = sprites[old_index + 1:new_index + 1]
+            keys[old_index:new_index] = keys[old_index + 1:new_index + 1]
+        else:
+            # moved up, shift the sprites in between one step down
+            sprites[new_index + 1:old_index + 1] = sprites[new_index:old_index]
+            keys[new_index + 1:old_index + 1] = keys[new_index:old_index]
+        sprites[new_index] = sprite
+        keys[new_index] = key
+        self.sprite_keys[sprite] = key
+
+    def update(self) -> None:
+        """Repositions every sprite whose depth changed.
+        """
+        for sprite in list(self.sprite_keys):
+            self.reposition(sprite)
+
+    def __iter__(self) -> Iterator[pygame.sprite.Sprite]:
+        return iter(self.sprites)
+
+    def __len__(self) -> int:
+        return len(self.sprites)
+
+    def __contains__(self, sprite: pygame.sprite.Sprite) -> bool:
+        return sprite in self.sprite_keys
@@ -1,15 +1,16 @@
 import pygame
 from settings import *
 from entity import Entity
-from support import import_folder
+from support import import_atlas
 from typing import Tuple
 from player import Player
+from profiler import profiler
 
 class Enemy(Entity):
-    def __init__(self, monster_name, pos, groups, obstacle_sprites) -> None:
+    def __init__(self, monster_name, pos, groups, obstacle_sprites, clock=None) -> None:
         
         # general setup
-        super().__init__(groups, obstacle_sprites)
+        super().__init__(groups, obstacle_sprites, clock)
         self.animation_speed = 0.15
         self.sprite_type = "enemy"
         
@@ -42,6 +43,12 @@ class Enemy(Entity):
         self.can_attack = True
         self.attack_time = None
         self.attack_cooldown = 600
+
+        # taking damage, the enemy is knocked back and can't be hit again until the invincibility is over
+        self.vulnerable = True
+        self.hit_time = None
+        self.invincibility_duration = 300
+        self.knockback = pygame.math.Vector2()
     
     def import_graphics(self, monster_name: str) -> None:
         """Imports the monster assets for a given monster (by their name)
@@ -52,67 +59,18 @@ class Enemy(Entity):
         self.animations = {'idle': [], 'move': [], 'attack': []}
         main_path = f'../graphics/monsters/{monster_name}/'
         for animation in self.animations.keys():
-            self.animations[animation] = import_folder(main_path + animation)
-
-    def get_player_distance_direction(self, player: Player) -> tuple[float, float]:
-        """Gets are returns the distance and direction to the player as a tuple.
-
-        Args:
-            player (Player): The current player object.
-
-        Returns:
-            tuple[float, float]: a tuple containing the distance and direction from the player in that order.
-        """        
-        enemy_vec = pygame.math.Vector2(self.rect.center)
-        player_vec = pygame.math.Vector2(player.rect.center)
-        distance = (player_vec - enemy_vec).magnitude()
-        
-        if distance > 0:
-            direction = (player_vec - enemy_vec).normalize()
-        else:
-            direction = pygame.math.Vector2()
-        
-        return(distance, direction)
+            self.animations[animation] = import_atlas(main_path + animation)
 
-    def get_status(self, player: Player) -> None:
-        """Updates the status of the enemy in relation to the player.
-
-        Args:
-            player (Player): The player object in the scene.
-        """        
-        distance = self.get_player_distance_direction(player)[0]
-        
-        if distance >= self.max_follow_distance:
-            self.status = "idle" # Move back to spawn pos
-        elif distance <= self.attack_radius and self.can_attack:
-            self.status = "attack"
-            self.attack_time = pygame.time.get_ticks()
-        elif distance <= self.notice_radius:
-            self.status = "move"
-        else:
-            self.status = 'idle'
-    
-    def actions(self, player: Player) -> None:
-        """Mini state machine for the actions the enemy can take.
+    def animate(self, ticks: int = 1) -> None:
+        """Overwritten from the entity base class
 
         Args:
-            player (Player): The player object in the scene.
-        """        
-        if self.status == 'attack':
-            # print("attack")
-            pass
-        elif self.status == 'move':
-            self.direction = self.get_player_distance_direction(player)[1]
-        elif self.status == 'idle':
-            self.direction = pygame.math.Vector2()
-    
-    def animate(self) -> None:
-        """Overwritten from the entity base class
+            ticks (int, optional): Amount of ticks since the last update. Defaults to 1.
         """
         animation = self.animations[self.status]
 
         # loop over frame index
-        self.frame_index += self.animation_speed
+        self.frame_index += self.animation_speed * ticks
         if self.frame_index >= len(animation):
             if self.status == "attack":
                 self.can_attack = False
@@ -123,27 +81,58 @@ class Enemy(Entity):
         self.rect = self.image.get_rect(center=self.hitbox.center)
         
     def cooldowns(self) -> None:
-        """Function that checks to see if the attack cooldown has been completed
+        """Function that checks to see if the attack and invincibility cooldowns have been completed
         """
+        current_time = self.clock.get_ticks()
         if not self.can_attack:
-            current_time = pygame.time.get_ticks()
             if current_time - self.attack_time >= self.attack_cooldown:
                 self.can_attack = True
 
+        if not self.vulnerable:
+            if current_time - self.hit_time >= self.invincibility_duration:
+                self.vulnerable = True
+
+    def get_damage(self, amount: int, source: Tuple[int, int]) -> bool:
+        """Takes damage from an attack and gets knocked away from where it came from.
+
+        Args:
+            amount (int): The damage of the attack.
+            source (Tuple[int, int]): Where the attack came from, usually the centre of the attacker.
+
+        Returns:
+            bool: Whether the attack hit, an enemy can't be hit again during its invincibility.
+        """
+        if not self.vulnerable:
+            return False
+        self.health -= amount
+        self.vulnerable = False
+        self.hit_time = self.clock.get_ticks()
+
+        self.knockback.update(self.hitbox.centerx - source[0], self.hitbox.centery - source[1])
+        if self.knockback.magnitude() != 0:
+            self.knockback.normalize_ip()
+        return True
+
+    def hit_reaction(self) -> None:
+        """Turns the enemy away from the attack that hit it while it's invincible,
+        it's pushed back at its speed times its resistance.
+        """
+        if not self.vulnerable:
+            self.direction.update(self.knockback)
+
     
-    def update(self) -> None:
+    def update(self, ticks: int = 1) -> None:
         """Should run every frame to update the enemy position. This is a general function for all sprites.
-        """        
-        self.move(self.speed)
-        self.animate()
-        self.cooldowns()
-    
-    def enemy_update(self, player: Player) -> None:
-        """Enemy specific update function that updates the enemy status and runs the action state-machine.
-        Should also be run once per frame.
+        Enemies far from the players are updated less often, and catch up on the ticks they missed.
 
         Args:
-            player (Player): The player object in the scene.
-        """        
-        self.get_status(player)
-        self.actions(player)
\ No newline at end of file
+            ticks (int, optional): Amount of ticks since the last update. Defaults to 1.
+        """
+        self.hit_reaction()
+        self.move(self.speed * (1 if self.vulnerable else self.resistance) * ticks)
+        self.animate(ticks)
+        self.cooldowns()
+
+
+# timed while the profiler is on
+profiler.instrument(Enemy, 'animate')
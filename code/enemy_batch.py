@@ -0,0 +1,300 @@
+import pygame
+from array import array
+from math import sqrt
+from typing import Dict, List, Optional
+from settings import *
+from enemy import Enemy
+from player import Player
+from flow_field import FlowField
+from spatial_hash import SpatialHash
+
+# how often an enemy is updated, by how far it is from the closest player
+AWAKE = 0 # every tick
+DROWSY = 1 # every AI_DROWSY_INTERVAL ticks
+ASLEEP = 2 # not at all, until a player comes close
+
+# the statuses the AI gives an enemy, kept as their index in the status column
+STATUSES = ('idle', 'move', 'attack')
+IDLE, MOVE, ATTACK = range(len(STATUSES))
+
+
+class EnemyBatch:
+    def __init__(self) -> None:
+        """Runs the AI of every enemy in the level in one pass per frame.
+        The radii, positions, distances and AI statuses are kept in flat arrays next to the enemy list,
+        and the pass that decides what every enemy does only works on those arrays.
+        Moving and animating an enemy still happens on its object, as it collides with the sprites
+        of the level, so the objects are read once before the pass and written to once after it.
+
+        Enemies close to a player are updated every tick. Enemies between their notice radius and their
+        max follow distance can only stand idle, so they are updated every few ticks, spread over the ticks
+        so that the same amount of them runs every tick. Enemies further away are put to sleep in a spatial
+        hash and only woken up by looking it up around the players, so sleeping enemies cost nothing.
+        """
+        self.enemies: List[Enemy] = []
+        self.indices: Dict[Enemy, int] = {}
+
+        # one entry per enemy, in the same order as self.enemies
+        self.attack_radius = array('d')
+        self.notice_radius = array('d')
+        self.max_follow_distance = array('d')
+        self.distance = array('d')
+        self.tier = array('B')
+        # centre, whether it can attack and what the AI decided for it, as of its last update
+        self.x = array('i')
+        self.y = array('i')
+        self.ready = array('B')
+        self.status = array('B')
+        self.direction_x = array('d')
+        self.direction_y = array('d')
+        self.columns = (self.attack_radius, self.notice_radius, self.max_follow_distance, self.distance, self.tier,
+                        self.x, self.y, self.ready, self.status, self.direction_x, self.direction_y)
+
+        # where the enemies that aren't asleep are, to find the enemies near an attack
+        self.grid = SpatialHash(TILESIZE * 2)
+
+        # the enemies that are updated, drowsy enemies in the bucket of the tick they're updated on
+        self.awake: Dict[Enemy, None] = {}
+        self.drowsy: List[Dict[Enemy, None]] = [{} for _ in range(AI_DROWSY_INTERVAL)]
+        self.sleeping = SpatialHash(CHUNK_SIZE)
+        self.next_bucket = 0
+        self.tick = 0
+
+        # sleeping enemies this close to a player might have to wake up
+        self.wake_radius = max(monster['max_follow_distance'] for monster in ENEMY_DATA.values())
+        # where the players were when the sleeping enemies were last looked up
+        self.wake_centers = None
+
+    def add(self, enemy: Enemy) -> None:
+        """Adds an enemy to the batch, it is updated every tick until it gets far from the players.
+
+        Args:
+            enemy (Enemy): The enemy to run the AI for.
+        """
+        self.indices[enemy] = len(self.enemies)
+        self.enemies.append(enemy)
+        self.attack_radius.append(enemy.attack_radius)
+        self.notice_radius.append(enemy.notice_radius)
+        self.max_follow_distance.append(enemy.max_follow_distance)
+        self.distance.append(0)
+        self.tier.append(AWAKE)
+        self.x.append(enemy.rect.centerx)
+        self.y.append(enemy.rect.centery)
+        self.ready.append(enemy.can_attack)
+        self.status.append(STATUSES.index(enemy.status))
+        self.direction_x.append(0)
+        self.direction_y.append(0)
+        self.awake[enemy] = None
+        self.grid.insert(enemy, enemy.hitbox)
+
+    def remove(self, enemy: Enemy) -> None:
+        """Removes an enemy by moving the last enemy into its slot.
+
+        Args:
+            enemy (Enemy): The enemy to remove, does nothing if it isn't in the batch.
+        """
+        index = self.indices.pop(enemy, None)
+        if index is None:
+            return
+        self.unschedule(enemy, self.tier[index])
+        last = len(self.enemies) - 1
+        if index != last:
+            moved = self.enemies[last]
+            self.enemies[index] = moved
+            self.indices[moved] = index
+            for column in self.columns:
+                column[index] = column[last]
+        self.enemies.pop()
+        for column in self.columns:
+            column.pop()
+
+    def unschedule(self, enemy: Enemy, tier: int) -> None:
+        """Takes an enemy out of the collection of its tier.
+
+        Args:
+            enemy (Enemy): The enemy.
+            tier (int): AWAKE, DROWSY or ASLEEP.
+        """
+        if tier == AWAKE:
+            del self.awake[enemy]
+        elif tier == DROWSY:
+            for bucket in self.drowsy:
+                if bucket.pop(enemy, 0) is None:
+                    break
+        if tier == ASLEEP:
+            self.sleeping.remove(enemy)
+        else:
+            self.grid.remove(enemy)
+
+    def schedule(self, enemy: Enemy, tier: int) -> None:
+        """Moves an enemy to another tier. Drowsy enemies are dealt into the buckets in turn,
+        so every tick updates about the same amount of them.
+
+        Args:
+            enemy (Enemy): The enemy.
+            tier (int): AWAKE, DROWSY or ASLEEP.
+        """
+        index = self.indices[enemy]
+        if self.tier[index] == tier:
+            return
+        self.unschedule(enemy, self.tier[index])
+        self.tier[index] = tier
+        if tier == AWAKE:
+            self.awake[enemy] = None
+        elif tier == DROWSY:
+            self.drowsy[self.next_bucket][enemy] = None
+            self.next_bucket = (self.next_bucket + 1) % AI_DROWSY_INTERVAL
+        if tier == ASLEEP:
+            self.sleeping.insert(enemy, enemy.hitbox)
+        else:
+            self.grid.insert(enemy, enemy.hitbox)
+
+    def wake(self, enemy: Enemy) -> None:
+        """Updates an enemy every tick again, for example when something happens to it.
+
+        Args:
+            enemy (Enemy): The enemy, does nothing if it isn't in the batch.
+        """
+        if enemy in self.indices:
+            self.schedule(enemy, AWAKE)
+
+    def wake_near(self, player_centers: List[tuple]) -> None:
+        """Wakes the sleeping enemies a player came close to the max follow distance of.
+        The sleeping enemies are only looked up again once a player moved half of AI_SLEEP_MARGIN,
+        so the enemies are woken that much early and the ones left asleep can't be within their
+        max follow distance before the next look up.
+
+        Args:
+            player_centers (List[tuple]): Centre of every player.
+        """
+        slack = AI_SLEEP_MARGIN / 2
+        if self.wake_centers is not None and len(self.wake_centers) == len(player_centers) and all(
+                abs(x - last_x) < slack and abs(y - last_y) < slack
+                for (x, y), (last_x, last_y) in zip(player_centers, self.wake_centers)):
+            return
+        self.wake_centers = player_centers
+        if not len(self.sleeping):
+            return
+
+        for player_x, player_y in player_centers:
+            area = pygame.Rect(0, 0, (self.wake_radius + slack) * 2, (self.wake_radius + slack) * 2)
+            area.center = (player_x, player_y)
+            for enemy in self.sleeping.query(area):
+                enemy_x, enemy_y = enemy.rect.center
+                delta_x = player_x - enemy_x
+                delta_y = player_y - enemy_y
+                if sqrt(delta_x * delta_x + delta_y * delta_y) < self.max_follow_distance[self.indices[enemy]] + slack:
+                    self.schedule(enemy, DROWSY)
+
+    def update(self, players: List[Player], flow_field: Optional[FlowField] = None) -> None:
+        """Updates the enemies that are due this tick, and then their status and direction in relation to the closest player.
+        The enemies are moved first and their centres copied into the position columns, then one pass over the columns
+        works out the distance to the closest player once per enemy and reuses it for the status, the direction and the tier,
+        and the decisions are written back to the enemy objects at the end.
+        Enemies further away than their max follow distance go idle (back to spawn pos),
+        enemies within their attack radius attack if they can, and enemies within their notice radius follow the player.
+        Following enemies walk around obstacles along the flow field, and straight at the player
+        once they share a cell with it or are outside of the field.
+
+        Args:
+            players (List[Player]): The players in the scene.
+            flow_field (Optional[FlowField], optional): Paths to the players. Defaults to None, always walk straight.
+        """
+        player_centers = [player.rect.center for player in players]
+        attack_radius = self.attack_radius
+        notice_radius = self.notice_radius
+        max_follow_distance = self.max_follow_distance
+        distances = self.distance
+        xs, ys, ready, statuses = self.x, self.y, self.ready, self.status
+        directions_x, directions_y = self.direction_x, self.direction_y
+        indices = self.indices
+
+        self.wake_near(player_centers)
+        bucket = self.drowsy[self.tick % AI_DROWSY_INTERVAL]
+        self.tick += 1
+        due = [(enemy, 1) for enemy in self.awake]
+        due += [(enemy, AI_DROWSY_INTERVAL) for enemy in bucket]
+
+        # move the enemies and read back what the pass needs
+        due_indices = []
+        for enemy, ticks in due:
+            enemy.update(ticks)
+            self.grid.move(enemy, enemy.hitbox)
+            index = indices[enemy]
+            xs[index], ys[index] = enemy.rect.center
+            ready[index] = enemy.can_attack
+            due_indices.append(index)
+
+        # decide the status and direction of every due enemy from the columns
+        for index in due_indices:
+            enemy_x = xs[index]
+            enemy_y = ys[index]
+            distance = float('inf')
+            delta_x = delta_y = 0
+            for player_x, player_y in player_centers:
+                player_delta_x = player_x - enemy_x
+                player_delta_y = player_y - enemy_y
+                player_distance = sqrt(player_delta_x * player_delta_x + player_delta_y * player_delta_y)
+                if player_distance < distance:
+                    distance = player_distance
+                    delta_x = player_delta_x
+                    delta_y = player_delta_y
+            distances[index] = distance
+
+            if distance >= max_follow_distance[index]:
+                status = IDLE
+            elif distance <= attack_radius[index] and ready[index]:
+                status = ATTACK
+            elif distance <= notice_radius[index]:
+                status = MOVE
+            else:
+                status = IDLE
+            statuses[index] = status
+
+            direction_x = direction_y = 0
+            if status == MOVE:
+                path_direction = flow_field.direction((enemy_x, enemy_y)) if flow_field else None
+                if path_direction:
+                    direction_x, direction_y = path_direction
+                elif distance > 0:
+                    direction_x = delta_x / distance
+                    direction_y = delta_y / distance
+            directions_x[index] = direction_x
+            directions_y[index] = direction_y
+
+        # write the decisions back to the enemies and move them between the tiers
+        for enemy, _ in due:
+            index = indices[enemy]
+            status = statuses[index]
+            enemy.status = STATUSES[status]
+            if status == ATTACK:
+                enemy.attack_time = enemy.clock.get_ticks()
+            else:
+                # attacking enemies keep the direction they had
+                enemy.direction.update(directions_x[index], directions_y[index])
+
+            # idle enemies that are far enough can't do anything visible, an attack or its cooldown always finishes
+            distance = distances[index]
+            if status != IDLE or not ready[index] or distance <= notice_radius[index] + AI_WAKE_MARGIN:
+                self.schedule(enemy, AWAKE)
+            elif distance < max_follow_distance[index] + AI_SLEEP_MARGIN:
+                self.schedule(enemy, DROWSY)
+            else:
+                self.schedule(enemy, ASLEEP)
+
+    def query(self, rect: pygame.Rect) -> List[Enemy]:
+        """Returns the enemies that aren't asleep in the grid cells a rect overlaps.
+
+        Args:
+            rect (pygame.Rect): The area to look up.
+
+        Returns:
+            List[Enemy]: The enemies that might overlap the rect.
+        """
+        return self.grid.query(rect)
+
+    def __len__(self) -> int:
+        return len(self.enemies)
+
+    def __iter__(self):
+        return iter(self.enemies)
@@ -1,51 +1,44 @@
 import pygame
 from typing import Union
 from settings import *
+from timer import system_clock
+from collision import move_and_slide
+from profiler import profiler
 
 class Entity(pygame.sprite.Sprite):
-    def __init__(self, groups, obstacle_sprites):
+    def __init__(self, groups, obstacle_sprites, clock=None):
         super().__init__(groups)
         self.frame_index = 0
         self.animation_speed = PLAYER_ANIMATION_SPEED
         self.direction = pygame.math.Vector2()
         
         self.obstacle_sprites = obstacle_sprites
+
+        # all cooldowns are timed with this clock, so the simulation can be stepped without real time passing
+        self.clock = clock or system_clock
     
     def move(self, speed: Union[int, float]) -> None:
-        """Process movement.
+        """Process movement. The hitbox is swept against the obstacles around its path,
+        so it stops at the first one it touches and slides along it.
 
         Args:
             speed (Union[int, float]): Speed of the entity.
         """
-        if self.direction.magnitude() != 0:
-            self.direction = self.direction.normalize()
+        if self.direction.x == 0 and self.direction.y == 0:
+            self.rect.center = self.hitbox.center
+            return
+        self.direction = self.direction.normalize()
 
-        self.hitbox.x += self.direction.x * speed
-        self.collision("horizontal")
-        self.hitbox.y += self.direction.y * speed
-        self.collision("vertical")
+        target = self.hitbox.copy()
+        target.x += self.direction.x * speed
+        target.y += self.direction.y * speed
+        delta = (target.x - self.hitbox.x, target.y - self.hitbox.y)
+        if delta != (0, 0):
+            obstacles = self.obstacle_sprites.query(self.hitbox.union(target))
+            move_and_slide(self.hitbox, delta, obstacles)
+            if profiler.enabled:
+                profiler.count('collision tests', len(obstacles))
         self.rect.center = self.hitbox.center
-    
-    def collision(self, direction: str) -> None:
-        """Process and handle collisions.
-
-        Args:
-            direction (str): Either "horizontal" or "vertical" to process the directions individually.
-        """
-        if direction == "horizontal":
-            for sprite in self.obstacle_sprites:
-                if sprite.hitbox.colliderect(self.hitbox):
-                    if self.direction.x > 0:  # moving right
-                        self.hitbox.right = sprite.hitbox.left
-                    if self.direction.x < 0:  # moving left
-                        self.hitbox.left = sprite.hitbox.right
-        if direction == "vertical":
-            for sprite in self.obstacle_sprites:
-                if sprite.hitbox.colliderect(self.hitbox):
-                    if self.direction.y > 0:  # moving down
-                        self.hitbox.bottom = sprite.hitbox.top
-                    if self.direction.y < 0:  # moving up
-                        self.hitbox.top = sprite.hitbox.bottom
 
     def animate(self) -> None:
         """Selects and displays the right frame of the current animation.
@@ -58,4 +51,9 @@ class Entity(pygame.sprite.Sprite):
 
         # set the image
         self.image = animation[int(self.frame_index)]
-        self.rect = self.image.get_rect(center=self.hitbox.center)
\ No newline at end of file
+        self.rect = self.image.get_rect(center=self.hitbox.center)
+
+
+# timed while the profiler is on
+profiler.instrument(Entity, 'move')
+profiler.instrument(Entity, 'animate')
@@ -0,0 +1,141 @@
+from array import array
+from math import sqrt
+from typing import List, Optional, Tuple
+from settings import *
+from tile_store import NO_ENTRY, TileStore
+
+# the cells around a cell, orthogonal ones first so they win ties against diagonal ones
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, 1), (1, -1), (-1, -1))
+
+
+class FlowField:
+    def __init__(self, tiles: TileStore, radius: int = FLOW_FIELD_RADIUS) -> None:
+        """Walking distance from every map cell around the players to the closest player, shared by all enemies.
+        A cell is blocked if the hitbox of any tile overlaps it. The distances are worked out with a breadth first
+        search from the cells of the players, and only again when a player moves to another cell or a tile changes.
+        An enemy finds its way by stepping to the neighbouring cell that is closest to a player, which costs
+        the same however many enemies there are.
+
+        Args:
+            tiles (TileStore): The tiles of the level, the obstacles are read from its collision grid.
+            radius (int, optional): Furthest distance in cells the search goes. Defaults to FLOW_FIELD_RADIUS.
+        """
+        self.tiles = tiles
+        self.radius = radius
+        self.columns = tiles.columns
+        self.rows = tiles.rows
+
+        # one entry per map cell, a distance is only valid if its cell was reached by the current search
+        self.distance = array('i', [0]) * (self.columns * self.rows)
+        self.search = array('i', [0]) * (self.columns * self.rows)
+        self.generation = 0
+
+        # player cells and tile store version the distances were worked out for
+        self.last_state = None
+
+    def cell_at(self, pos: Tuple[float, float]) -> Optional[int]:
+        """Returns the index of the map cell a position is in.
+
+        Args:
+            pos (Tuple[float, float]): x and y coordinates in pixels.
+
+        Returns:
+            Optional[int]: Index of the cell, or None if the position is outside the map.
+        """
+        col = int(pos[0]) // TILESIZE
+        row = int(pos[1]) // TILESIZE
+        if 0 <= col < self.columns and 0 <= row < self.rows:
+            return row * self.columns + col
+        return None
+
+    def update(self, centers: List[Tuple[float, float]]) -> None:
+        """Works out the distances again if a player moved to another cell or the tiles changed.
+
+        Args:
+            centers (List[Tuple[float, float]]): Centre of every player.
+        """
+        sources = tuple(cell for cell in map(self.cell_at, centers) if cell is not None)
+        state = (sources, self.tiles.version)
+        if state != self.last_state:
+            self.last_state = state
+            self.compute(sources)
+
+    def compute(self, sources: Tuple[int, ...]) -> None:
+        """Breadth first search from the player cells, one ring of cells per step of distance.
+
+        Args:
+            sources (Tuple[int, ...]): Indices of the cells the players are in.
+        """
+        self.generation += 1
+        generation = self.generation
+        distances = self.distance
+        search = self.search
+        blocked = self.tiles.cell_first
+        columns = self.columns
+        last_col = columns - 1
+        last_start = len(distances) - columns
+
+        frontier = []
+        for cell in sources:
+            if search[cell] != generation:
+                search[cell] = generation
+                distances[cell] = 0
+                frontier.append(cell)
+
+        for distance in range(1, self.radius + 1):
+            next_frontier = []
+            for cell in frontier:
+                col = cell % columns
+                for neighbour, inside in ((cell - 1, col > 0), (cell + 1, col < last_col),
+                                          (cell - columns, cell >= columns), (cell + columns, cell < last_start)):
+                    if inside and search[neighbour] != generation and blocked[neighbour] == NO_ENTRY:
+                        search[neighbour] = generation
+                        distances[neighbour] = distance
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+
+    def direction(self, pos: Tuple[float, float]) -> Optional[Tuple[float, float]]:
+        """Returns which way to walk from a position to get closer to a player.
+        Diagonal steps are only taken if both cells next to them are free, so enemies don't cut corners.
+
+        Args:
+            pos (Tuple[float, float]): x and y coordinates in pixels, usually the centre of an enemy.
+
+        Returns:
+            Optional[Tuple[float, float]]: Unit vector towards the centre of the next cell on the way,
+                or None if the position is in a player cell or wasn't reached by the search.
+        """
+        cell = self.cell_at(pos)
+        if cell is None or self.search[cell] != self.generation:
+            return None
+
+        generation = self.generation
+        distances = self.distance
+        search = self.search
+        columns = self.columns
+        col, row = cell % columns, cell // columns
+
+        best_distance = distances[cell]
+        best_cell = None
+        for step_col, step_row in NEIGHBOURS:
+            next_col = col + step_col
+            next_row = row + step_row
+            if not (0 <= next_col < columns and 0 <= next_row < self.rows):
+                continue
+            neighbour = next_row * columns + next_col
+            if search[neighbour] != generation or distances[neighbour] >= best_distance:
+                continue
+            if step_col and step_row and (search[row * columns + next_col] != generation
+                                          or search[next_row * columns + col] != generation):
+                continue
+            best_distance = distances[neighbour]
+            best_cell = (next_col, next_row)
+
+        if best_cell is None:
+            return None
+        delta_x = (best_cell[0] + 0.5) * TILESIZE - pos[0]
+        delta_y = (best_cell[1] + 0.5) * TILESIZE - pos[1]
+        length = sqrt(delta_x * delta_x + delta_y * delta_y)
+        if length == 0:
+            return None
+        return delta_x / length, delta_y / length
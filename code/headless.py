@@ -0,0 +1,108 @@
+import os
+
+# has to be set before pygame initialises the display
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+import sys
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import Optional
+from settings import *
+from level import Level
+from main import Game
+from timer import FixedClock
+from profiler import profiler
+from replay import Replay
+
+
+class HeadlessGame(Game):
+    def __init__(self, seed: Optional[int] = None) -> None:
+        """Game without a window, the level is stepped at a fixed timestep as fast as possible
+        and nothing is drawn. Used for soak tests, checking replays and running the simulation on a server.
+
+        Args:
+            seed (Optional[int], optional): Seed of the level. Defaults to None, a random seed.
+        """
+        pygame.init()
+        # images are converted to the display format, so a (dummy) display is still needed
+        self.screen = pygame.display.set_mode((WIDTH, HEIGTH))
+
+        self.simulation_clock = FixedClock()
+        self.accumulator = 0
+        self.ticks = 0
+
+        self.level = Level(self.simulation_clock, seed=seed)
+        self.replay = None
+
+    def step(self) -> None:
+        """Advances the simulation by one fixed timestep.
+        """
+        super().step()
+        self.ticks += 1
+
+    def run(self, ticks: int) -> float:
+        """Steps the simulation a given amount of times.
+
+        Args:
+            ticks (int): Amount of fixed timesteps to simulate.
+
+        Returns:
+            float: Simulated ticks per second of real time.
+        """
+        start = perf_counter()
+        for _ in range(ticks):
+            profiler.begin_frame()
+            self.step()
+            profiler.end_frame()
+        return ticks / (perf_counter() - start)
+
+    def check_replay(self, replay: Replay) -> Optional[int]:
+        """Plays a whole replay back as fast as possible and checks the state after every tick.
+
+        Args:
+            replay (Replay): The replay, recorded with the seed of the level.
+
+        Returns:
+            Optional[int]: The first tick the state differed from the recording on, None if all of them matched.
+        """
+        self.play(replay)
+        self.run(len(replay))
+        return self.replay.mismatch
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Runs the game simulation without a window.")
+    parser.add_argument('--ticks', type=int, default=FPS * 60, help="amount of ticks to simulate")
+    parser.add_argument('--profile', metavar='PATH', help="profile every tick and write a Chrome trace to PATH")
+    parser.add_argument('--seed', type=int, help="seed of the level, random by default")
+    parser.add_argument('--record', metavar='PATH',
+                        help="record a replay to PATH, the player walks around like a room server bot")
+    parser.add_argument('--replay', metavar='PATH', help="play a replay back instead and check the state of every tick")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay) if args.replay else None
+    game = HeadlessGame(replay.seed if replay else args.seed)
+    if args.profile:
+        profiler.enable()
+    if replay:
+        start = perf_counter()
+        mismatch = game.check_replay(replay)
+        ticks_per_second = len(replay) / (perf_counter() - start)
+        print(f"played back {len(replay)} ticks at {ticks_per_second:.0f} ticks/s "
+              f"({ticks_per_second / FPS:.1f}x real time)")
+        if mismatch is not None:
+            print(f"the state differs from the recording from tick {mismatch} on")
+    else:
+        if args.record:
+            from room_server import WanderInput
+            game.record(args.record, WanderInput(str(game.level.seed)))
+        ticks_per_second = game.run(args.ticks)
+        print(f"simulated {args.ticks} ticks at {ticks_per_second:.0f} ticks/s "
+              f"({ticks_per_second / FPS:.1f}x real time)")
+        game.save_replay()
+    if args.profile:
+        print(f"trace written to {profiler.export(args.profile)}")
+    if replay and mismatch is not None:
+        sys.exit(1)
@@ -1,113 +1,334 @@
 import pygame
 from settings import *
-from tile import Tile
+from tile_store import TileStore
+from flow_field import FlowField
 from player import Player
 from debug import debug
 from support import *
-from random import choice
+from assets import load_image
+from random import randrange
+from array import array
+from functools import partial
 from weapon import Weapon
 from ui import UI
 from enemy import Enemy
+from enemy_batch import EnemyBatch
+from combat import Combat
+from particles import ABOVE_SPRITES, BELOW_SPRITES, ParticleSystem
+from spatial_hash import SpatialHash
+from depth_sort import DepthSortedList
+from operator import itemgetter
+from typing import Optional
+from timer import system_clock
+from profiler import profiler
+from world import WorldStreamer
+from loader import level_assets, prefetch
 
 
 class Level():
-    def __init__(self) -> None:
+    def __init__(self, clock=None, layout=None, seed=None, local_player=True, progress=None) -> None:
         # get the display surface (the screen you can write to)
         self.display_surface = pygame.display.get_surface()
 
+        # decode every image the level needs up front on worker threads, progress is called as they finish
+        if layout is None:
+            layout = import_map_layout()
+        prefetch(level_assets(layout), progress)
+
+        # clock used for every cooldown in the level
+        self.clock = clock or system_clock
+
+        # picks the grass variants, so a chunk looks the same every time it's loaded,
+        # kept to 32 bits as that's how it's sent to clients and stored in replays
+        self.seed = seed % 2 ** 32 if seed is not None else randrange(2 ** 32)
+
+        # static tiles are rows in one store instead of sprites, both groups read them from it
+        map_rows = next(iter(layout.values()))
+        self.tiles = TileStore(len(map_rows[0]), len(map_rows))
+
+        # hit effects and other short animations, drawn by the camera group
+        self.particles = ParticleSystem()
+
         # sprite group setup
-        self.visible_sprites = YsortCameraGroup()
-        self.obstacle_sprites = pygame.sprite.Group()
+        self.visible_sprites = YsortCameraGroup(self.tiles, self.particles)
+        self.obstacle_sprites = ObstacleGroup(self.tiles)
+        self.enemies = EnemyBatch()
+        self.flow_field = FlowField(self.tiles)
+        self.combat = Combat(self.enemies, self.kill_enemy, self.particles)
 
-        # attack sprite
-        self.current_attack = None
+        # players, the local player is the one the camera and UI follow
+        self.players = []
+        self.player = None
+
+        # attack sprite of every attacking player
+        self.attacks = {}
 
         # sprite setup
-        self.create_map()
+        self.create_map(layout, local_player)
 
         # user interface
         self.ui = UI()
 
-    def create_map(self) -> None:
-        """Loads all the sprites of the game map into the group objects.
+    def create_map(self, layout: dict = None, local_player: bool = True) -> None:
+        """Places the player and loads the chunks of the game map around it.
+        The rest of the map is streamed in and out as the players move.
+
+        Args:
+            layout (dict, optional): The 'boundary', 'grass', 'object' and 'entities' layers of the map.
+                Defaults to None, which loads the stock map.
+            local_player (bool, optional): Whether to create a player controlled by the keyboard.
+                Servers only have players added through add_player. Defaults to True.
         """
-        layout = {
-            'boundary': import_csv_layout('../map/map_FloorBlocks.csv'),
-            'grass': import_csv_layout('../map/map_Grass.csv'),
-            'object': import_csv_layout('../map/map_Objects.csv'),
-            'entities': import_csv_layout('../map/map_Entities.csv')
-        }
-        graphics = {
+        if layout is None:
+            layout = import_map_layout()
+        self.graphics = {
             'grass': import_folder("../graphics/grass"),
-            'object': import_folder("../graphics/objects"),
+            'object': import_tiles("../graphics/objects"),
         }
-        for style, layout in layout.items():
-            for row_index, row in enumerate(layout):
-                for col_index, col in enumerate(row):
-                    if col != '-1':
-                        x = col_index * TILESIZE
-                        y = row_index * TILESIZE
-                        if style == 'boundary':
-                            Tile((x, y), [self.obstacle_sprites], 'invisible')
-                        elif style == 'grass':
-                            random_grass_image = choice(graphics['grass'])
-                            Tile((x,
-                                  y),
-                                 [self.visible_sprites,
-                                  self.obstacle_sprites],
-                                 'grass',
-                                 random_grass_image)
-                        elif style == 'object':
-                            object_sprite = graphics['object'][int(col)]
-                            Tile(
-                                (x, y), [self.visible_sprites, self.obstacle_sprites], 'object', object_sprite)
-                        elif style == 'entities':
-                            if col == '394': # The player has the tile id 394
-                                self.player = Player((x, y),
-                                                    [self.visible_sprites],
-                                                    self.obstacle_sprites,
-                                                    self.create_attack,
-                                                    self.destroy_attack)
-                            else: # If not a player the entity has to be an enemy
-                                enemy_name = ''
-                                if col == '390': enemy_name = 'bamboo'
-                                elif col == '391': enemy_name = 'spirit'
-                                elif col == '392': enemy_name = 'raccoon'
-                                elif col == '393': enemy_name = 'squid'
-                                
-                                
-                                Enemy(enemy_name, (x, y), [self.visible_sprites], self.obstacle_sprites)
-                                
-                        
-
-        
-        
+
+        # enemies are created the first time their chunk loads and stored when it unloads
+        self.spawned_enemies = set()
+        self.active_enemies = {}
+        self.stored_enemies = {}
+
+        self.world = WorldStreamer(layout, self.load_chunk, self.unload_chunk)
+        row_index, col_index = self.world.find_tile('entities', 394) # The player has the tile id 394
+        self.spawn_pos = (col_index * TILESIZE, row_index * TILESIZE)
+        if local_player:
+            self.player = Player(self.spawn_pos,
+                                 [self.visible_sprites],
+                                 self.obstacle_sprites,
+                                 self.create_attack,
+                                 self.destroy_attack,
+                                 self.clock)
+            self.players.append(self.player)
+        self.world.update(self.stream_centers(), immediate=True)
+
         # Set camera position to player
-        self.visible_sprites.camera_pos = pygame.math.Vector2(self.player.rect.center)
+        camera_target = self.player.rect.center if self.player else self.spawn_pos
+        self.visible_sprites.camera_pos = pygame.math.Vector2(camera_target)
+
+    def add_player(self, input_source) -> Player:
+        """Adds a player at the spawn point that is controlled by something other than the keyboard.
+
+        Args:
+            input_source (Callable[[], int]): Returns the input bits of the player every update.
+
+        Returns:
+            Player: The new player.
+        """
+        player = Player(self.spawn_pos,
+                        [self.visible_sprites],
+                        self.obstacle_sprites,
+                        None,
+                        None,
+                        self.clock,
+                        input_source)
+        player.create_attack = partial(self.create_attack, player)
+        player.destroy_attack = partial(self.destroy_attack, player)
+        self.players.append(player)
+        return player
+
+    def remove_player(self, player: Player) -> None:
+        """Removes a player that was added with add_player.
+
+        Args:
+            player (Player): The player to remove.
+        """
+        self.destroy_attack(player)
+        self.players.remove(player)
+        player.kill()
+
+    def stream_centers(self) -> list:
+        """Returns the points the world is loaded around, one per player.
+
+        Returns:
+            list: Centre of every player, or the spawn point if there are none.
+        """
+        if not self.players:
+            return [self.spawn_pos]
+        return [player.rect.center for player in self.players]
+
+    def load_chunk(self, chunk: tuple) -> array:
+        """Creates the tiles of a chunk, spawns its enemies the first time
+        and brings back the enemies that were stored in it.
+
+        Args:
+            chunk (tuple): Key of the chunk to load.
+
+        Returns:
+            array: The tile store rows of the chunk.
+        """
+        tiles = array('i')
+        for style, row_index, col_index, col in self.world.chunk_tiles(chunk):
+            x = col_index * TILESIZE
+            y = row_index * TILESIZE
+            if style == 'boundary':
+                tiles.append(self.tiles.add((x, y), 'boundary'))
+            elif style == 'grass':
+                grass_images = self.graphics['grass']
+                grass_image = grass_images[hash((self.seed, row_index, col_index)) % len(grass_images)]
+                tiles.append(self.tiles.add((x, y), 'grass', grass_image))
+            elif style == 'object':
+                tiles.append(self.tiles.add((x, y), 'object', self.graphics['object'][col]))
+            elif style == 'entities' and col != 394: # If not a player the entity has to be an enemy
+                spawn = (row_index, col_index)
+                if spawn in self.spawned_enemies:
+                    continue
+                self.spawned_enemies.add(spawn)
+
+                self.spawn_enemy(spawn, ENEMY_TILES.get(col, ''))
+
+        for spawn, state in self.stored_enemies.pop(chunk, {}).items():
+            enemy = self.spawn_enemy(spawn, state['name'])
+            enemy.hitbox.center = state['pos']
+            enemy.rect.center = enemy.hitbox.center
+            enemy.health = state['health']
+        return tiles
+
+    def spawn_enemy(self, spawn: tuple, enemy_name: str) -> Enemy:
+        """Creates an enemy at its spawn tile.
+
+        Args:
+            spawn (tuple): Row and column of the tile the enemy spawns on.
+            enemy_name (str): Name of the monster.
+
+        Returns:
+            Enemy: The new enemy.
+        """
+        row_index, col_index = spawn
+        enemy = Enemy(enemy_name, (col_index * TILESIZE, row_index * TILESIZE),
+                      [self.visible_sprites], self.obstacle_sprites, self.clock)
+        self.enemies.add(enemy)
+        self.active_enemies[spawn] = enemy
+        return enemy
+
+    def kill_enemy(self, enemy: Enemy, player: Player) -> None:
+        """Removes an enemy that ran out of health for good and gives its exp to the player that killed it.
+
+        Args:
+            enemy (Enemy): The dead enemy.
+            player (Player): The player that killed it.
+        """
+        player.exp += enemy.exp
+        self.particles.spawn(enemy.monster_name, enemy.rect.center, BELOW_SPRITES)
+        for spawn, active_enemy in list(self.active_enemies.items()):
+            if active_enemy is enemy:
+                del self.active_enemies[spawn]
+        self.enemies.remove(enemy)
+        enemy.kill()
+
+    def unload_chunk(self, chunk: tuple, tiles: array) -> None:
+        """Removes the tiles of a chunk and stores the enemies that are no longer in a loaded chunk.
+
+        Args:
+            chunk (tuple): Key of the chunk to unload.
+            tiles (array): The tile store rows of the chunk.
+        """
+        for tile in tiles:
+            self.tiles.remove(tile)
+
+        for spawn, enemy in list(self.active_enemies.items()):
+            if not self.world.is_loaded(enemy.hitbox.center):
+                enemy_chunk = self.world.chunk_at(enemy.hitbox.center)
+                self.stored_enemies.setdefault(enemy_chunk, {})[spawn] = {
+                    'name': enemy.monster_name,
+                    'pos': enemy.hitbox.center,
+                    'health': enemy.health}
+                del self.active_enemies[spawn]
+                self.enemies.remove(enemy)
+                enemy.kill()
+
+    def create_attack(self, player: Player = None) -> None:
+        """Creates a Weapon object and sets it as the current attack object of a player.
+
+        Args:
+            player (Player, optional): The attacking player. Defaults to None, the local player.
+        """
+        player = player or self.player
+        self.destroy_attack(player)
+        self.attacks[player] = Weapon(player, [self.visible_sprites])
 
-    def create_attack(self) -> None:
-        """Creates a Weapon object and sets it as the current attack object.
+    def destroy_attack(self, player: Player = None) -> None:
+        """Destroyes the current attack object of a player.
+
+        Args:
+            player (Player, optional): The player that stopped attacking. Defaults to None, the local player.
         """
-        self.current_attack = Weapon(self.player, [self.visible_sprites])
+        attack = self.attacks.pop(player or self.player, None)
+        if attack:
+            attack.kill()
+
+    def update(self) -> None:
+        """Steps the simulation once without drawing anything.
+        """
+        with profiler.scope('world'):
+            self.world.update(self.stream_centers())
+        # enemies are updated by the batch, which skips the ones far from the players
+        with profiler.scope('players'):
+            for player in self.players:
+                player.update()
+        with profiler.scope('flow_field'):
+            self.flow_field.update([player.rect.center for player in self.players])
+        with profiler.scope('enemies'):
+            self.enemies.update(self.players, self.flow_field)
+        with profiler.scope('combat'):
+            self.combat.update(self.players, self.attacks)
+        with profiler.scope('particles'):
+            self.particles.update()
+
+    def draw(self) -> list:
+        """Draws the sprites if anything on screen changed, and the parts of the UI that changed.
 
-    def destroy_attack(self) -> None:
-        """Destroyes the current attack object.
+        Returns:
+            list: The rects of the screen that were drawn to, to pass to pygame.display.update.
         """
-        if self.current_attack:
-            self.current_attack.kill()
-        self.current_attack = None
+        uncovered = self.ui.update(self.player)
+        with profiler.scope('custom_draw'):
+            dirty_rects = self.visible_sprites.custom_draw(self.player, force=uncovered)
+        with profiler.scope('ui'):
+            dirty_rects += self.ui.display(self.player, redraw=bool(dirty_rects))
+        return dirty_rects
 
-    def run(self) -> None:
-        """Updates and draws all sprites.
+
+class ObstacleGroup(pygame.sprite.Group):
+    def __init__(self, tiles: TileStore) -> None:
+        """Sprite group that keeps a spatial index of its sprites hitboxes,
+        so collisions only have to look at the obstacles close to an entity.
+        The index is updated whenever a sprite is added or killed.
+        Static tiles aren't sprites, they are looked up in the grid of the tile store.
+
+        Args:
+            tiles (TileStore): The static tiles of the level.
         """
-        self.visible_sprites.custom_draw(self.player)
-        self.visible_sprites.update()
-        self.visible_sprites.enemy_update(self.player)
-        self.ui.display(self.player)
+        super().__init__()
+        self.tiles = tiles
+        self.grid = SpatialHash(TILESIZE)
+
+    def add_internal(self, sprite: pygame.sprite.Sprite, layer=None) -> None:
+        super().add_internal(sprite, layer)
+        self.grid.insert(sprite, sprite.hitbox)
+
+    def remove_internal(self, sprite: pygame.sprite.Sprite) -> None:
+        super().remove_internal(sprite)
+        self.grid.remove(sprite)
+
+    def query(self, rect: pygame.Rect) -> list:
+        """Returns the hitboxes of the obstacles in the grid cells that a rect overlaps.
+
+        Args:
+            rect (pygame.Rect): The area to look up, usually an entity hitbox.
+
+        Returns:
+            list: The hitboxes of the tiles and obstacle sprites that might collide with the rect.
+        """
+        hitboxes = self.tiles.query_hitboxes(rect)
+        hitboxes.extend(sprite.hitbox for sprite in self.grid.query(rect))
+        return hitboxes
 
 
 class YsortCameraGroup(pygame.sprite.Group):
-    def __init__(self) -> None:
+    def __init__(self, tiles: TileStore, particles: Optional[ParticleSystem] = None) -> None:
         # general setup
         super().__init__()
         self.display_surface = pygame.display.get_surface()
@@ -115,18 +336,65 @@ class YsortCameraGroup(pygame.sprite.Group):
         self.half_height = self.display_surface.get_size()[1] // 2
         self.offset = pygame.math.Vector2()
         self.camera_pos = pygame.math.Vector2(0, 0)
+        self.camera_rect = self.display_surface.get_rect().inflate(2, 2)
+
+        # tiles never move, the tile store keeps them depth sorted by chunk and they are culled per chunk,
+        # the sprites are kept in one depth sorted list and checked against the camera every frame
+        self.tiles = tiles
+        self.moving_sprites = DepthSortedList()
+        self.new_sprites = {} # entities join the group before they have a rect
+        self.particles = particles
 
         # creating the bg/floor
-        self.floor_surface = pygame.image.load(
-            '../graphics/tilemap/ground.png').convert()
+        self.floor_surface = load_image(
+            '../graphics/tilemap/ground.png', alpha=False)
         self.floor_rect = self.floor_surface.get_rect(topleft=(0, 0))
 
-    def custom_draw(self, player: Player) -> None:
+        # what was drawn last frame, the screen is only redrawn when it changes
+        self.last_frame = None
+
+    def add_internal(self, sprite: pygame.sprite.Sprite, layer=None) -> None:
+        super().add_internal(sprite, layer)
+        self.new_sprites[sprite] = None
+
+    def remove_internal(self, sprite: pygame.sprite.Sprite) -> None:
+        super().remove_internal(sprite)
+        self.new_sprites.pop(sprite, None)
+        self.moving_sprites.remove(sprite)
+
+    def visible_sprites(self) -> list:
+        """Returns what overlaps the camera in y-sorted order.
+        Tiles are looked up by the chunks the camera touches, so the cost
+        depends on what is on screen and not on the size of the map.
+        Every chunk and the moving sprites are already depth sorted, so the final
+        sort only has to merge those runs instead of sorting everything from scratch.
+
+        Returns:
+            list: (centery, image, topleft) of the tiles and sprites to draw this frame, back to front.
+        """
+        camera_rect = self.camera_rect
+        visible = self.tiles.visible(camera_rect)
+
+        for sprite in self.new_sprites:
+            self.moving_sprites.add(sprite)
+        self.new_sprites.clear()
+        self.moving_sprites.update()
+        visible.extend((sprite.rect.centery, sprite.image, sprite.rect.topleft) for sprite in self.moving_sprites
+                       if sprite.rect.colliderect(camera_rect))
+        visible.sort(key=itemgetter(0))
+        return visible
+
+    def custom_draw(self, player: Player, force: bool = True) -> list:
         """Customized draw function that y-sorts the sprites before writing them to the screen.
         This function also controlls the camera, and smoothly interpolates it towards the player.
+        Unless forced, nothing is drawn if the camera, every visible sprite image and position and the particles are the same as last frame.
 
         Args:
             player (Player): The player object for the game. Is used as the target for the camera.
+            force (bool, optional): Draw even if nothing changed. Defaults to True.
+
+        Returns:
+            list: The screen rect if it was drawn, otherwise an empty list.
         """
         # calculating new camera position
         heading = player.rect.center - self.camera_pos
@@ -135,23 +403,28 @@ class YsortCameraGroup(pygame.sprite.Group):
         # getting offset
         self.offset.x = self.camera_pos.x - self.half_width
         self.offset.y = self.camera_pos.y - self.half_height
+        self.camera_rect.topleft = (int(self.offset.x) - 1, int(self.offset.y) - 1)
 
-        # drawing floor
+        visible = self.visible_sprites()
+        particles = self.particles.version if self.particles is not None else None
+        frame = (tuple(self.offset), [(image, topleft) for _, image, topleft in visible], particles)
+        if not force and frame == self.last_frame:
+            return []
+        self.last_frame = frame
+
+        # drawing floor, the blit gets clipped to the screen so only the visible part is copied
+        self.display_surface.fill('black')
         offset_rect = self.floor_rect.topleft - self.offset
         self.display_surface.blit(self.floor_surface, offset_rect)
+        if self.particles is not None:
+            self.particles.draw(self.display_surface, self.offset, self.camera_rect, BELOW_SPRITES)
 
-        # drawing sprites
-        for sprite in sorted(self.sprites(),
-                             key=lambda sprite: sprite.rect.centery):
-            offset_rect = sprite.rect.topleft - self.offset
-            self.display_surface.blit(sprite.image, offset_rect)
-
-    def enemy_update(self, player):
-        """runs the enemy_update function on all sprites with the "enemy" type
-
-        Args:
-            player (Player): The local player object
-        """        
-        enemy_sprites = [sprite for sprite in self.sprites() if hasattr(sprite, 'sprite_type') and sprite.sprite_type == "enemy"]
-        for sprite in enemy_sprites:
-            sprite.enemy_update(player)
\ No newline at end of file
+        # drawing tiles and sprites
+        for _, image, topleft in visible:
+            self.display_surface.blit(image, topleft - self.offset)
+        if profiler.enabled:
+            profiler.count('sprites drawn', len(visible))
+            profiler.count('blits', len(visible) + 1)
+        if self.particles is not None:
+            self.particles.draw(self.display_surface, self.offset, self.camera_rect, ABOVE_SPRITES)
+        return [self.display_surface.get_rect()]
@@ -0,0 +1,68 @@
+import pygame
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from typing import Callable, Dict, List, Optional
+from settings import *
+from assets import asset_cache
+from atlas import TextureAtlas, atlas_root, atlases, decode_atlas
+from manifest import asset_manifest
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def level_assets(layout: Dict[str, List]) -> Dict[str, list]:
+    """Lists the assets a level needs before its first frame. Only the monsters
+    that actually appear in the entities layer of the map are listed.
+
+    Args:
+        layout (Dict[str, List]): The map layers, rows of tile ids by layer name.
+
+    Returns:
+        Dict[str, list]: (path, alpha) of the 'images' to load through the asset cache,
+            the 'atlases' to load and the 'animations' folders to cut out of them.
+    """
+    monsters = sorted({ENEMY_TILES[tile] for row in layout['entities'] for tile in row if tile in ENEMY_TILES})
+    animations = [f'../graphics/monsters/{monster}/{animation}'
+                  for monster in monsters for animation in ('idle', 'move', 'attack')]
+
+    images = [('../graphics/tilemap/ground.png', False), ('../graphics/test/player.png', True)]
+    images += [(path, True) for folder in ('../graphics/grass', '../graphics/objects') for path in asset_manifest.frames(folder)]
+    roots = {atlas_root(folder) for folder in animations + ['../graphics/player', '../graphics/weapons', '../graphics/particles']}
+    return {'images': images, 'atlases': sorted(roots), 'animations': animations}
+
+
+def store_atlas(root: str, finish: Callable[[], TextureAtlas]) -> None:
+    atlases[root] = finish()
+
+
+def prefetch(assets: Dict[str, list], progress: Optional[ProgressCallback] = None, workers: Optional[int] = LOADER_WORKERS) -> None:
+    """Loads the assets of a list that aren't loaded yet. Files are read and decoded on a thread pool,
+    converting them to the display format happens on the calling thread as each one finishes.
+
+    Args:
+        assets (Dict[str, list]): The assets to load, see level_assets.
+        progress (Optional[ProgressCallback], optional): Called with the amount of finished and total assets
+            after each one, on the calling thread. Defaults to None.
+        workers (Optional[int], optional): Amount of threads. Defaults to LOADER_WORKERS.
+    """
+    with ThreadPoolExecutor(workers) as executor:
+        # the future of every decode and what finishes it on this thread
+        futures = {}
+        for root in assets['atlases']:
+            if root not in atlases:
+                futures[executor.submit(decode_atlas, root)] = partial(store_atlas, root)
+        for path, alpha in assets['images']:
+            if not asset_cache.cached(path, alpha):
+                futures[executor.submit(pygame.image.load, path)] = partial(asset_cache.insert, path, alpha=alpha)
+
+        total = len(futures)
+        if progress:
+            progress(0, total)
+        for done, future in enumerate(as_completed(futures), 1):
+            futures[future](future.result())
+            if progress:
+                progress(done, total)
+
+    # cut the animations out of their atlas now, instead of when the first enemy of a kind spawns
+    for folder in assets['animations']:
+        atlases[atlas_root(folder)].folder(folder)
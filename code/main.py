@@ -1,34 +1,161 @@
 import pygame
 import sys
+from argparse import ArgumentParser
+from typing import Callable, Optional, Union
 from settings import *
 from debug import debug
 from level import Level
+from player import read_keyboard
+from timer import FixedClock
+from profiler import ProfilerOverlay, profiler
+from replay import Replay, ReplayPlayback, ReplayRecorder
 
 
 class Game:
-    def __init__(self) -> None:
+    def __init__(self, seed: Optional[int] = None) -> None:
+        """The game in a window.
+
+        Args:
+            seed (Optional[int], optional): Seed of the level. Defaults to None, a random seed.
+        """
         # general setup
         pygame.init()
         self.screen = pygame.display.set_mode((WIDTH, HEIGTH), pygame.RESIZABLE)
         pygame.display.set_caption("RPG-Game")
         self.clock = pygame.time.Clock()
 
-        self.level = Level()
+        # the simulation runs on its own clock that moves one fixed timestep per update
+        self.simulation_clock = FixedClock()
+        self.accumulator = 0
+
+        self.level = Level(self.simulation_clock, seed=seed, progress=self.show_progress)
+
+        # records the ticks or plays a replay back, see record and play
+        self.replay: Optional[Union[ReplayRecorder, ReplayPlayback]] = None
+        self.replay_path = None
+
+        # F3 turns the profiler and its overlay on and off, F4 exports what it recorded
+        self.profiler_overlay = ProfilerOverlay(profiler)
+
+    def show_progress(self, done: int, total: int) -> None:
+        """Draws a loading bar while the level loads its assets.
+
+        Args:
+            done (int): Amount of loaded assets.
+            total (int): Amount of assets to load.
+        """
+        pygame.event.pump()
+        self.screen.fill('black')
+        bar_rect = pygame.Rect(0, 0, WIDTH // 2, BAR_HEIGHT)
+        bar_rect.center = self.screen.get_rect().center
+        fill_rect = bar_rect.copy()
+        fill_rect.width = bar_rect.width * done // max(total, 1)
+
+        pygame.draw.rect(self.screen, UI_BG_COLOUR, bar_rect)
+        pygame.draw.rect(self.screen, ENERGY_COLOUR, fill_rect)
+        pygame.draw.rect(self.screen, UI_BORDER_COLOUR, bar_rect, 3)
+        pygame.display.update()
+
+    def record(self, path: str, input_source: Callable[[], int] = read_keyboard) -> None:
+        """Records the input and the state hash of every tick from now on, the replay is written when the game ends.
+
+        Args:
+            path (str): Where to write the replay.
+            input_source (Callable[[], int], optional): Where the input bits come from. Defaults to read_keyboard.
+        """
+        self.replay = ReplayRecorder(self.level, input_source)
+        self.replay_path = path
+
+    def save_replay(self) -> None:
+        """Writes the replay that is being recorded, if there is one.
+        """
+        if isinstance(self.replay, ReplayRecorder):
+            self.replay.replay.save(self.replay_path)
+            print(f"replay of {len(self.replay.replay)} ticks written to {self.replay_path}")
+
+    def play(self, replay: Replay) -> None:
+        """Plays a replay back instead of reading the keyboard. The level has to have been created with the seed of the replay.
+
+        Args:
+            replay (Replay): The replay.
+        """
+        self.replay = ReplayPlayback(self.level, replay)
+
+    def step(self) -> None:
+        """Advances the simulation by one fixed timestep.
+        """
+        if self.replay:
+            self.replay.begin_tick()
+        self.simulation_clock.advance(FIXED_TIMESTEP)
+        self.level.update()
+        if self.replay:
+            self.replay.end_tick()
+
+    def quit(self) -> None:
+        """Writes the replay if one is being recorded and closes the game.
+        """
+        self.save_replay()
+        pygame.quit()
+        sys.exit()
 
     def run(self) -> None:
         """Main game loop.
+        Runs as many fixed timestep updates as the real time that passed calls for, then draws one frame.
         """
+        self.clock.tick()
         while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-            self.screen.fill('black')
-            self.level.run()
-            pygame.display.update()
-            self.clock.tick(FPS)
+                    self.quit()
+                if event.type in (pygame.VIDEORESIZE, pygame.VIDEOEXPOSE):
+                    # the window contents are gone, so the next frame is drawn in full
+                    self.level.visible_sprites.last_frame = None
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    profiler.toggle()
+                    # the overlay is drawn over the level, which has to be drawn again once it's gone
+                    self.level.visible_sprites.last_frame = None
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                    print(f"trace written to {profiler.export()}")
+
+            self.accumulator += min(self.clock.tick(FPS), MAX_FRAME_TIME)
+            profiler.begin_frame()
+            while self.accumulator >= FIXED_TIMESTEP:
+                with profiler.scope('step'):
+                    self.step()
+                self.accumulator -= FIXED_TIMESTEP
+
+            # only the parts of the screen that changed are sent to the display
+            with profiler.scope('draw'):
+                dirty_rects = self.level.draw()
+            if profiler.enabled:
+                dirty_rects += self.profiler_overlay.display()
+            if dirty_rects:
+                with profiler.scope('display.update'):
+                    pygame.display.update(dirty_rects)
+            profiler.end_frame()
 
 
 if __name__ == "__main__":
-    game = Game()
+    parser = ArgumentParser(description="Runs the game.")
+    parser.add_argument('--connect', metavar='HOST:PORT', help="play on a game server instead of locally")
+    parser.add_argument('--room', help="room to join when --connect is the lobby of a room server")
+    parser.add_argument('--record', metavar='PATH', help="record a replay of the game to PATH")
+    parser.add_argument('--replay', metavar='PATH', help="watch a replay recorded with --record")
+    args = parser.parse_args()
+
+    if args.connect:
+        from client import NetworkGame, find_room
+        from network import parse_address
+        address = parse_address(args.connect)
+        if args.room:
+            address = find_room(address, args.room)
+        game = NetworkGame(address)
+    elif args.replay:
+        replay = Replay.load(args.replay)
+        game = Game(replay.seed)
+        game.play(replay)
+    else:
+        game = Game()
+        if args.record:
+            game.record(args.record)
     game.run()
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import posixpath
+import re
+from os import walk, path as os_path
+from typing import Dict, List, Optional
+from settings import *
+
+# trailing number of a file name, frames are ordered by it and object tiles are looked up by it
+FRAME_NUMBER = re.compile(r'(\d+)$')
+
+ManifestEntry = Dict[str, object]
+
+
+def asset_path(path: str) -> str:
+    """Returns the canonical form of an asset path, normalised with forward slashes on every platform,
+    which is how paths are stored in the manifest and used as keys everywhere.
+
+    Args:
+        path (str): Path of an image or folder, with either kind of separator.
+
+    Returns:
+        str: The normalised path.
+    """
+    return posixpath.normpath(path.replace('\\', '/'))
+
+
+def frame_key(name: str) -> tuple:
+    """Sort key of an image, numbered frames in numeric order and then by name.
+
+    Args:
+        name (str): File name of the image.
+
+    Returns:
+        tuple: The sort key.
+    """
+    match = FRAME_NUMBER.search(os_path.splitext(name)[0])
+    return (int(match.group(1)) if match else -1, name)
+
+
+def file_hash(path: str) -> str:
+    """Returns the content hash of a file.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        str: Hex digest of the file contents.
+    """
+    with open(path, 'rb') as asset_file:
+        return hashlib.sha1(asset_file.read()).hexdigest()
+
+
+def scan_folder(folder: str, img_files: List[str]) -> List[ManifestEntry]:
+    """Lists the images of a folder in frame order.
+
+    Args:
+        folder (str): Path of the folder.
+        img_files (List[str]): File names in the folder.
+
+    Returns:
+        List[ManifestEntry]: path, content hash and, for images named by a number, the tile id of every image.
+    """
+    entries = []
+    for image in sorted((name for name in img_files if name.endswith('.png')), key=frame_key):
+        path = asset_path(f"{folder}/{image}")
+        entry = {'path': path, 'hash': file_hash(path)}
+        if os_path.splitext(image)[0].isdigit():
+            entry['id'] = int(os_path.splitext(image)[0])
+        entries.append(entry)
+    return entries
+
+
+def build_manifest(roots: List[str] = MANIFEST_FOLDERS) -> Dict[str, List[ManifestEntry]]:
+    """Lists every image below some folders.
+
+    Args:
+        roots (List[str], optional): The folders to scan. Defaults to MANIFEST_FOLDERS.
+
+    Returns:
+        Dict[str, List[ManifestEntry]]: The images of every folder that has any, by the folder path.
+    """
+    folders = {}
+    for root in roots:
+        for folder, _, img_files in walk(root):
+            entries = scan_folder(folder, img_files)
+            if entries:
+                folders[asset_path(folder)] = entries
+    return dict(sorted(folders.items()))
+
+
+def save_manifest(folders: Dict[str, List[ManifestEntry]], path: str = ASSET_MANIFEST) -> None:
+    """Writes a manifest with sorted keys, so rebuilding it without changing any image gives the same file.
+
+    Args:
+        folders (Dict[str, List[ManifestEntry]]): The manifest.
+        path (str, optional): Where to write it. Defaults to ASSET_MANIFEST.
+    """
+    with open(path, 'w') as manifest_file:
+        json.dump({'folders': folders}, manifest_file, indent=1, sort_keys=True)
+        manifest_file.write('\n')
+
+
+class AssetManifest:
+    def __init__(self, folders: Dict[str, List[ManifestEntry]]) -> None:
+        """Index of the game images: the order of the frames in every folder,
+        the tile ids of numbered images and the content hash of every file.
+
+        Args:
+            folders (Dict[str, List[ManifestEntry]]): The images of every folder, see build_manifest.
+        """
+        self.folders = {asset_path(folder): [dict(entry, path=asset_path(entry['path'])) for entry in entries]
+                        for folder, entries in folders.items()}
+        self.hashes = {entry['path']: entry['hash'] for entries in self.folders.values() for entry in entries}
+
+    def frames(self, folder: str) -> List[str]:
+        """Returns the images of a folder in frame order.
+        Folders that aren't in the manifest are scanned, so new folders work before the manifest is rebuilt.
+
+        Args:
+            folder (str): Path of the folder.
+
+        Returns:
+            List[str]: The image paths.
+        """
+        folder = asset_path(folder)
+        if folder not in self.folders:
+            img_files = next(walk(folder), (None, None, []))[2]
+            self.folders[folder] = scan_folder(folder, img_files)
+            self.hashes.update((entry['path'], entry['hash']) for entry in self.folders[folder])
+        return [entry['path'] for entry in self.folders[folder]]
+
+    def tiles(self, folder: str) -> Dict[int, str]:
+        """Returns the numbered images of a folder by their tile id.
+
+        Args:
+            folder (str): Path of the folder.
+
+        Returns:
+            Dict[int, str]: The image paths by tile id.
+        """
+        self.frames(folder)
+        return {entry['id']: entry['path'] for entry in self.folders[asset_path(folder)] if 'id' in entry}
+
+    def content_hash(self, path: str) -> Optional[str]:
+        """Returns the content hash of an image.
+
+        Args:
+            path (str): Path of the image.
+
+        Returns:
+            Optional[str]: The hash, or None if the image isn't in the manifest.
+        """
+        return self.hashes.get(asset_path(path))
+
+    def tree_hash(self, root: str) -> str:
+        """Returns one hash of every image below a folder, it changes when any of them is added, removed or changed.
+
+        Args:
+            root (str): Path of the folder.
+
+        Returns:
+            str: Hex digest of the paths and hashes of the images.
+        """
+        root = asset_path(root)
+        digest = hashlib.sha1()
+        for folder, entries in self.folders.items():
+            if folder == root or folder.startswith(root + '/'):
+                for entry in entries:
+                    digest.update(f"{entry['path']}:{entry['hash']}\n".encode())
+        return digest.hexdigest()
+
+
+def load_manifest(path: str = ASSET_MANIFEST) -> AssetManifest:
+    """Reads the asset manifest, or scans the image folders if it's missing.
+
+    Args:
+        path (str, optional): Path of the manifest. Defaults to ASSET_MANIFEST.
+
+    Returns:
+        AssetManifest: The manifest.
+    """
+    if not os_path.exists(path):
+        return AssetManifest(build_manifest())
+    with open(path) as manifest_file:
+        return AssetManifest(json.load(manifest_file)['folders'])
+
+
+asset_manifest = load_manifest()
+
+
+if __name__ == "__main__":
+    folders = build_manifest()
+    save_manifest(folders)
+    print(f"listed {sum(len(entries) for entries in folders.values())} images in {len(folders)} folders to {ASSET_MANIFEST}")
@@ -0,0 +1,102 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, List
+from settings import *
+
+# file layout:
+#   header: magic, version, layer count, width, height
+#   layer table: one fixed size name per layer
+#   data: one int16 array per layer, row by row, in the order of the layer table
+MAGIC = b'RPGM'
+VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+LAYER_NAME = struct.Struct('<16s')
+
+
+def compile_map(layouts: Dict[str, List[List[int]]], path: str) -> None:
+    """Writes map layers to a compiled map file. The file is written next to the target and moved into place
+    once it's complete, so a failed or interrupted run never leaves a partial map behind.
+
+    Args:
+        layouts (Dict[str, List[List[int]]]): The layers by their name, all of the same size.
+        path (str): Where to write the compiled map.
+
+    Raises:
+        ValueError: If the layers aren't all the same size.
+    """
+    height = len(next(iter(layouts.values())))
+    width = len(next(iter(layouts.values()))[0])
+    for name, rows in layouts.items():
+        if len(rows) != height or any(len(row) != width for row in rows):
+            raise ValueError(f"layer '{name}' is not {width}x{height} tiles")
+
+    temp_path = path + '.tmp'
+    try:
+        with open(temp_path, 'wb') as map_file:
+            map_file.write(HEADER.pack(MAGIC, VERSION, len(layouts), width, height))
+            for name in layouts:
+                map_file.write(LAYER_NAME.pack(name.encode()))
+            for rows in layouts.values():
+                data = array('h', (tile for row in rows for tile in row))
+                if sys.byteorder != 'little':
+                    data.byteswap()
+                data.tofile(map_file)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_compiled_map(path: str) -> Dict[str, List[memoryview]]:
+    """Maps a compiled map file into memory, without parsing the tiles.
+
+    Args:
+        path (str): Path to the compiled map.
+
+    Raises:
+        ValueError: If the file isn't a complete compiled map of a supported version.
+
+    Returns:
+        Dict[str, List[memoryview]]: The layers by their name, as rows of int16 tile ids.
+    """
+    with open(path, 'rb') as map_file:
+        data = mmap.mmap(map_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a version {VERSION} compiled map")
+    magic, version, layer_count, width, height = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} compiled map")
+    if len(data) != HEADER.size + layer_count * (LAYER_NAME.size + width * height * 2):
+        raise ValueError(f"{path} is cut off")
+
+    names = []
+    offset = HEADER.size
+    for _ in range(layer_count):
+        names.append(LAYER_NAME.unpack_from(data, offset)[0].rstrip(b'\0').decode())
+        offset += LAYER_NAME.size
+
+    if sys.byteorder == 'little':
+        tiles = memoryview(data)[offset:].cast('h')
+    else:
+        swapped = array('h', data[offset:])
+        swapped.byteswap()
+        tiles = memoryview(swapped)
+
+    layer_size = width * height
+    layouts = {}
+    for layer_index, name in enumerate(names):
+        start = layer_index * layer_size
+        layouts[name] = [tiles[start + row * width:start + (row + 1) * width]
+                         for row in range(height)]
+    return layouts
+
+
+if __name__ == "__main__":
+    from support import import_csv_layout
+
+    compile_map({name: import_csv_layout(path) for name, path in MAP_LAYERS.items()}, MAP_FILE)
+    print(f"compiled {len(MAP_LAYERS)} layers to {MAP_FILE}")
@@ -0,0 +1,275 @@
+import struct
+from typing import Dict, List, Tuple
+from settings import *
+
+# packet types, the first byte of every packet
+CONNECT = 1
+WELCOME = 2
+INPUT = 3
+SNAPSHOT = 4
+DISCONNECT = 5
+JOIN = 6 # asks the room server which port a room is on
+ROOM = 7 # answer to JOIN
+
+# packet layouts, all little endian
+PACKET_TYPE = struct.Struct('<B')
+WELCOME_PACKET = struct.Struct('<BHI') # type, entity id of the player, level seed
+INPUT_HEADER = struct.Struct('<BIIB') # type, acked snapshot id, newest input seq, input count, then one byte per input (newest first)
+SNAPSHOT_HEADER = struct.Struct('<BIIIIHH') # type, snapshot id, base snapshot id, server tick, last processed input seq, entity count, removed count
+ENTITY_HEADER = struct.Struct('<HB') # entity id, mask of the fields that follow
+REMOVED_ENTITY = struct.Struct('<H') # entity id
+ROOM_PACKET = struct.Struct('<BH') # type, port of the room
+
+# entity ids are sent as uint16, 0 isn't used
+MAX_ENTITY_ID = 2 ** 16 - 1
+
+# the fields of an entity state in the order they are written, a snapshot only contains
+# the fields that changed since the base snapshot the client acknowledged
+ENTITY_FIELDS = (
+    ('kind', 'B'),
+    ('x', 'i'),
+    ('y', 'i'),
+    ('status', 'B'),
+    ('health', 'h'),
+    ('weapon', 'B'))
+FIELD_STRUCTS = [
+    struct.Struct('<' + ''.join(code for bit, (_, code) in enumerate(ENTITY_FIELDS) if mask & (1 << bit)))
+    for mask in range(1 << len(ENTITY_FIELDS))]
+ALL_FIELDS = (1 << len(ENTITY_FIELDS)) - 1
+
+# entity kinds and statuses are sent as indices into these lists
+KINDS = ['player'] + list(ENEMY_DATA.keys())
+KIND_INDEX = {kind: index for index, kind in enumerate(KINDS)}
+STATUSES = ['idle', 'move', 'attack'] + [
+    direction + state
+    for direction in ('down', 'left', 'right', 'up')
+    for state in ('', '_idle', '_attack', '_roll')]
+STATUS_INDEX = {status: index for index, status in enumerate(STATUSES)}
+
+EntityState = Tuple[int, int, int, int, int, int]
+
+
+def player_state(player) -> EntityState:
+    """Returns the networked state of a player.
+
+    Args:
+        player (Player): The player.
+
+    Returns:
+        EntityState: kind, hitbox position, status, health and weapon index.
+    """
+    return (KIND_INDEX['player'], player.hitbox.x, player.hitbox.y,
+            STATUS_INDEX[player.status], int(player.health), player.weapon_index)
+
+
+def enemy_state(enemy) -> EntityState:
+    """Returns the networked state of an enemy.
+
+    Args:
+        enemy (Enemy): The enemy.
+
+    Returns:
+        EntityState: kind, hitbox position, status, health and an unused weapon index.
+    """
+    return (KIND_INDEX[enemy.monster_name], enemy.hitbox.x, enemy.hitbox.y,
+            STATUS_INDEX[enemy.status], int(enemy.health), 0)
+
+
+def encode_input(acked_snapshot: int, newest_seq: int, inputs: List[int]) -> bytes:
+    """Builds an input packet. Every packet repeats the inputs the server hasn't acknowledged yet,
+    so a lost packet doesn't lose any input.
+
+    Args:
+        acked_snapshot (int): Id of the newest snapshot the client received.
+        newest_seq (int): Sequence number of the first input in the list.
+        inputs (List[int]): Input bits, newest first.
+
+    Returns:
+        bytes: The packet.
+    """
+    inputs = inputs[:255]
+    return INPUT_HEADER.pack(INPUT, acked_snapshot, newest_seq, len(inputs)) + bytes(inputs)
+
+
+def decode_input(data: bytes) -> Tuple[int, List[Tuple[int, int]]]:
+    """Reads an input packet.
+
+    Args:
+        data (bytes): The packet.
+
+    Raises:
+        ValueError: If the packet is cut off or longer than its input count says.
+
+    Returns:
+        Tuple[int, List[Tuple[int, int]]]: The acked snapshot id and the (seq, input bits) pairs, oldest first.
+    """
+    if len(data) < INPUT_HEADER.size:
+        raise ValueError(f"input packet of {len(data)} bytes is cut off")
+    _, acked_snapshot, newest_seq, count = INPUT_HEADER.unpack_from(data)
+    if len(data) != INPUT_HEADER.size + count:
+        raise ValueError(f"input packet of {len(data)} bytes doesn't hold {count} inputs")
+    bits = data[INPUT_HEADER.size:]
+    inputs = [(newest_seq - index, bits[index]) for index in range(len(bits) - 1, -1, -1)]
+    return acked_snapshot, [(seq, input_bits) for seq, input_bits in inputs if seq > 0]
+
+
+def encode_snapshot(
+        snapshot_id: int,
+        base_id: int,
+        tick: int,
+        last_input: int,
+        states: Dict[int, EntityState],
+        base: Dict[int, EntityState]) -> bytes:
+    """Builds a snapshot packet that is delta compressed against a base snapshot.
+    Entities that didn't change are left out, changed entities only contain the fields that changed,
+    and entities that are in the base but not in the new states are listed as removed.
+
+    Args:
+        snapshot_id (int): Id of the new snapshot.
+        base_id (int): Id of the base snapshot, 0 if the snapshot is sent in full.
+        tick (int): Server tick the states are from.
+        last_input (int): Sequence number of the last input of the client that was simulated.
+        states (Dict[int, EntityState]): States of every entity the client should know about.
+        base (Dict[int, EntityState]): States of the base snapshot, empty if the snapshot is sent in full.
+
+    Returns:
+        bytes: The packet.
+    """
+    parts = []
+    changed = 0
+    for entity_id, state in states.items():
+        old_state = base.get(entity_id)
+        if old_state is None:
+            mask = ALL_FIELDS
+            values = state
+        elif old_state == state:
+            continue
+        else:
+            mask = 0
+            values = []
+            for bit, value in enumerate(state):
+                if value != old_state[bit]:
+                    mask |= 1 << bit
+                    values.append(value)
+        parts.append(ENTITY_HEADER.pack(entity_id, mask))
+        parts.append(FIELD_STRUCTS[mask].pack(*values))
+        changed += 1
+
+    removed = [entity_id for entity_id in base if entity_id not in states]
+    parts.extend(REMOVED_ENTITY.pack(entity_id) for entity_id in removed)
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT, snapshot_id, base_id, tick, last_input, changed, len(removed))
+    return header + b''.join(parts)
+
+
+def decode_snapshot_header(data: bytes) -> Tuple[int, int, int, int]:
+    """Reads the ids of a snapshot packet without decoding the entities.
+
+    Args:
+        data (bytes): The packet.
+
+    Raises:
+        ValueError: If the packet is shorter than the snapshot header.
+
+    Returns:
+        Tuple[int, int, int, int]: Snapshot id, base snapshot id, server tick and last processed input.
+    """
+    if len(data) < SNAPSHOT_HEADER.size:
+        raise ValueError(f"snapshot packet of {len(data)} bytes is cut off")
+    _, snapshot_id, base_id, tick, last_input, _, _ = SNAPSHOT_HEADER.unpack_from(data)
+    return snapshot_id, base_id, tick, last_input
+
+
+def decode_snapshot(
+        data: bytes,
+        base: Dict[int, EntityState]) -> Tuple[Dict[int, EntityState], List[int], List[int]]:
+    """Rebuilds the full entity states of a snapshot packet from its base snapshot.
+
+    Args:
+        data (bytes): The packet.
+        base (Dict[int, EntityState]): States of the base snapshot, empty if it was sent in full.
+
+    Raises:
+        ValueError: If the packet is cut off, too long or has entities that can't be decoded.
+
+    Returns:
+        Tuple[Dict[int, EntityState], List[int], List[int]]: The entity states,
+            the ids of the entities that entered and the ids of the entities that left since the base.
+    """
+    if len(data) < SNAPSHOT_HEADER.size:
+        raise ValueError(f"snapshot packet of {len(data)} bytes is cut off")
+    _, _, _, _, _, changed, removed = SNAPSHOT_HEADER.unpack_from(data)
+    states = dict(base)
+    entered = []
+    offset = SNAPSHOT_HEADER.size
+    for _ in range(changed):
+        if offset + ENTITY_HEADER.size > len(data):
+            raise ValueError("snapshot packet is cut off")
+        entity_id, mask = ENTITY_HEADER.unpack_from(data, offset)
+        offset += ENTITY_HEADER.size
+        if mask > ALL_FIELDS:
+            raise ValueError(f"entity {entity_id} has an unknown field mask {mask}")
+        field_struct = FIELD_STRUCTS[mask]
+        if offset + field_struct.size > len(data):
+            raise ValueError("snapshot packet is cut off")
+        values = iter(field_struct.unpack_from(data, offset))
+        offset += field_struct.size
+
+        old_state = states.get(entity_id)
+        if old_state is None:
+            if mask != ALL_FIELDS:
+                raise ValueError(f"new entity {entity_id} is missing fields")
+            entered.append(entity_id)
+            states[entity_id] = tuple(values)
+        else:
+            states[entity_id] = tuple(next(values) if mask & (1 << bit) else value
+                                      for bit, value in enumerate(old_state))
+
+    if offset + removed * REMOVED_ENTITY.size != len(data):
+        raise ValueError(f"snapshot packet of {len(data)} bytes doesn't hold {removed} removed entities")
+    left = []
+    for _ in range(removed):
+        entity_id = REMOVED_ENTITY.unpack_from(data, offset)[0]
+        offset += REMOVED_ENTITY.size
+        states.pop(entity_id, None)
+        left.append(entity_id)
+    return states, entered, left
+
+
+def encode_join(room: str) -> bytes:
+    """Builds a join packet.
+
+    Args:
+        room (str): Name of the room, cut to MAX_ROOM_NAME bytes.
+
+    Returns:
+        bytes: The packet.
+    """
+    return PACKET_TYPE.pack(JOIN) + room.encode()[:MAX_ROOM_NAME]
+
+
+def decode_join(data: bytes) -> str:
+    """Reads a join packet.
+
+    Args:
+        data (bytes): The packet.
+
+    Returns:
+        str: Name of the room.
+    """
+    return data[PACKET_TYPE.size:PACKET_TYPE.size + MAX_ROOM_NAME].decode(errors='replace')
+
+
+def parse_address(address: str, default_port: int = SERVER_PORT) -> Tuple[str, int]:
+    """Splits a "host:port" string.
+
+    Args:
+        address (str): The address, the port is optional.
+        default_port (int, optional): Port to use if the address doesn't have one. Defaults to SERVER_PORT.
+
+    Returns:
+        Tuple[str, int]: Host and port.
+    """
+    host, _, port = address.rpartition(':')
+    if not host:
+        return port, default_port
+    return host, int(port)
@@ -1,32 +1,214 @@
 import pygame
+from collections import deque
 from settings import *
 from support import *
 from entity import Entity
 from player import Player
+from enemy import Enemy
+from network import STATUSES
+from timer import FixedClock
+
+# the player state the client predicts, besides the hitbox position and the direction
+PREDICTED_FIELDS = (
+    'status', 'rolling', 'invulnerable', 'roll_used', 'roll_time', 'roll_end_time',
+    'attacking', 'attack_time', 'weapon_index', 'weapon', 'can_switch_weapons', 'weapon_switch_time')
 
-# TODO THIS FILE IS IN PREPARATION FOR NETWORKING, AND NOTHING WILL BE DONE WITH IT FOR A WHILE
 
 class NetworkedPlayer(Player):
-    def __init__(self, pos, groups, obstacle_sprites, create_attack, destroy_attack):
-        super().__init__(pos, groups, obstacle_sprites, create_attack, destroy_attack)
-    
-    def listen_network(self):
-        # get status packet from network
-        
-        # attack input, direction vector, dodge input and weapon switch input
-        # also gets position and stores it in networked_position
-        self.networked_position = (0, 0)
-        pass
-
-    def move(self):
+    def __init__(self, pos, groups, obstacle_sprites, create_attack, destroy_attack, client, entity_id, clock=None):
+        """Player that is simulated on the server, it only follows the states the client receives.
+
+        Args:
+            client (GameClient): The connection the states come from.
+            entity_id (int): Network id of the player.
+        """
+        super().__init__(pos, groups, obstacle_sprites, create_attack, destroy_attack, clock)
+        self.client = client
+        self.entity_id = entity_id
+        self.networked_position = self.hitbox.topleft
+
+    def listen_network(self) -> None:
+        """Reads the interpolated state of the player from the client.
+        """
+        state = self.client.interpolated_state(self.entity_id)
+        if state is None:
+            return
+        _, x, y, status, health, weapon_index = state
+        self.networked_position = (x, y)
+        self.health = health
+        self.weapon_index = weapon_index
+        self.weapon = list(WEAPON_DATA.keys())[weapon_index]
+
+        # the weapon sprite is only shown while the server says the player attacks
+        self.status = STATUSES[status]
+        attacking = 'attack' in self.status
+        if attacking and not self.attacking:
+            self.create_attack()
+        elif self.attacking and not attacking:
+            self.destroy_attack()
+        self.attacking = attacking
+
+    def move(self, speed=None) -> None:
         self.hitbox.x, self.hitbox.y = self.networked_position
-        
-    
+        self.rect.center = self.hitbox.center
+
     def update(self) -> None:
         """Overwrite of the Player update function
         """
         self.listen_network()
-        self.cooldowns()
-        self.get_status()
         self.animate()
-        self.move()
\ No newline at end of file
+        self.move()
+
+
+class PredictedPlayer(Player):
+    def __init__(self, pos, groups, obstacle_sprites, create_attack, destroy_attack, client, entity_id, clock=None):
+        """The local player of a networked game. Its input is simulated right away instead of waiting
+        for the server, and every predicted state is kept with the input it came from. When a snapshot
+        says where the server had the player after an input, the prediction for that input is checked,
+        and if it was wrong the player is put where the server had it and the inputs the server hasn't
+        simulated yet are replayed. The error is then drawn away over a few ticks instead of jumping.
+
+        Args:
+            client (GameClient): The connection the inputs and states come from.
+            entity_id (int): Network id of the player.
+            clock (optional): Not used, the player is simulated on a clock of its own
+                that is wound back to the tick of an input when it's replayed.
+        """
+        super().__init__(pos, groups, obstacle_sprites, create_attack, destroy_attack, FixedClock(), self.replayed_input)
+        self.client = client
+        self.entity_id = entity_id
+        self.hitbox.topleft = pos
+        self.rect.center = self.hitbox.center
+
+        # (seq, input bits, predicted state) of the inputs the server hasn't acknowledged, oldest first
+        self.history = deque(maxlen=INPUT_BUFFER_SIZE)
+        self.current_input = 0
+        self.reconciled_input = 0
+
+        # how far the drawn player is from the predicted one, shrinks every tick
+        self.correction = pygame.math.Vector2()
+
+    def replayed_input(self) -> int:
+        return self.current_input
+
+    def save_state(self) -> tuple:
+        """Returns everything the movement of the next tick depends on.
+
+        Returns:
+            tuple: Hitbox position, direction and the PREDICTED_FIELDS.
+        """
+        return (self.hitbox.topleft, tuple(self.direction)) + tuple(getattr(self, name) for name in PREDICTED_FIELDS)
+
+    def load_state(self, state: tuple) -> None:
+        """Puts the player back in a state from save_state.
+
+        Args:
+            state (tuple): The state.
+        """
+        self.hitbox.topleft, direction = state[0], state[1]
+        self.direction.update(direction)
+        for name, value in zip(PREDICTED_FIELDS, state[2:]):
+            setattr(self, name, value)
+
+    def simulate_input(self, seq: int, input_bits: int) -> tuple:
+        """Simulates one input on the clock time of its tick.
+
+        Args:
+            seq (int): Sequence number of the input.
+            input_bits (int): The input.
+
+        Returns:
+            tuple: The predicted state after the input.
+        """
+        self.clock.time = seq * FIXED_TIMESTEP
+        self.current_input = input_bits
+        self.simulate()
+        return self.save_state()
+
+    def reconcile(self) -> None:
+        """Checks the prediction for the newest input the server simulated, and replays the newer inputs
+        from the server state if the prediction was wrong.
+        """
+        authoritative = self.client.authoritative
+        if authoritative is None or authoritative[0] <= self.reconciled_input:
+            return
+        seq, (_, x, y, status, health, weapon_index) = authoritative
+        self.reconciled_input = seq
+        self.health = health
+
+        while self.history and self.history[0][0] < seq:
+            self.history.popleft()
+        if self.history and self.history[0][0] == seq:
+            predicted = self.history.popleft()[2]
+            if predicted[0] == (x, y) and predicted[2] == STATUSES[status]:
+                return
+        else:
+            # nothing was predicted for the input, the timers are kept as they are now
+            predicted = self.save_state()
+
+        drawn_position = pygame.math.Vector2(self.rect.center)
+        self.load_state(predicted)
+        self.hitbox.topleft = (x, y)
+        self.status = STATUSES[status]
+        self.weapon_index = weapon_index
+        self.weapon = list(WEAPON_DATA.keys())[weapon_index]
+
+        # the attacks of the replayed inputs don't show the weapon, it follows the replayed player afterwards
+        create_attack, destroy_attack = self.create_attack, self.destroy_attack
+        self.create_attack = self.destroy_attack = lambda: None
+        for index, (replayed_seq, input_bits, _) in enumerate(self.history):
+            self.history[index] = (replayed_seq, input_bits, self.simulate_input(replayed_seq, input_bits))
+        self.create_attack, self.destroy_attack = create_attack, destroy_attack
+        if self.attacking:
+            self.create_attack()
+        else:
+            self.destroy_attack()
+        self.correction += drawn_position - self.hitbox.center
+
+    def update(self) -> None:
+        """Overwrite of the Player update function, predicts the newest input.
+        """
+        self.reconcile()
+        if self.client.pending_inputs:
+            seq, input_bits = self.client.pending_inputs[-1]
+            if not self.history or seq > self.history[-1][0]:
+                self.history.append((seq, input_bits, self.simulate_input(seq, input_bits)))
+        self.animate()
+
+        # draw the player part of the way from where it was drawn to where it is predicted
+        if self.correction.length() > CORRECTION_SNAP_DISTANCE:
+            self.correction.update(0, 0)
+        self.correction *= 1 - CORRECTION_SMOOTH_SPEED
+        if self.correction.length() < 0.5:
+            self.correction.update(0, 0)
+        self.rect.center = self.hitbox.center + self.correction
+
+
+class NetworkedEnemy(Enemy):
+    def __init__(self, monster_name, pos, groups, obstacle_sprites, client, entity_id, clock=None) -> None:
+        """Enemy that is simulated on the server, it only follows the states the client receives.
+
+        Args:
+            client (GameClient): The connection the states come from.
+            entity_id (int): Network id of the enemy.
+        """
+        super().__init__(monster_name, pos, groups, obstacle_sprites, clock)
+        self.client = client
+        self.entity_id = entity_id
+
+    def listen_network(self) -> None:
+        """Reads the interpolated state of the enemy from the client.
+        """
+        state = self.client.interpolated_state(self.entity_id)
+        if state is None:
+            return
+        _, x, y, status, health, _ = state
+        self.hitbox.x, self.hitbox.y = x, y
+        self.status = STATUSES[status]
+        self.health = health
+
+    def update(self) -> None:
+        """Overwrite of the Enemy update function
+        """
+        self.listen_network()
+        self.animate()
@@ -0,0 +1,170 @@
+import pygame
+from array import array
+from typing import List, Tuple
+from settings import *
+from support import import_atlas
+from profiler import profiler
+
+# the layers particles are drawn on
+BELOW_SPRITES = 0 # on the floor, behind every tile and sprite
+ABOVE_SPRITES = 1 # in front of every tile and sprite
+LAYERS = 2
+
+# folder of the animation of every effect, the attack types in ENEMY_DATA and the monster names are effects
+PARTICLE_EFFECTS = {
+    # magic
+    'flame': '../graphics/particles/flame/frames',
+    'aura': '../graphics/particles/aura',
+    'heal': '../graphics/particles/heal',
+
+    # attacks
+    'claw': '../graphics/particles/claw',
+    'slash': '../graphics/particles/slash',
+    'sparkle': '../graphics/particles/sparkle',
+    'leaf_attack': '../graphics/particles/leaf_attack',
+    'thunder': '../graphics/particles/thunder',
+
+    # monster deaths
+    'squid': '../graphics/particles/smoke_orange',
+    'raccoon': '../graphics/particles/raccoon',
+    'spirit': '../graphics/particles/nova',
+    'bamboo': '../graphics/particles/bamboo'}
+
+
+class ParticleLayer:
+    def __init__(self, capacity: int) -> None:
+        """The particles of one layer, the live ones are always the first self.count slots of the columns.
+
+        Args:
+            capacity (int): Most particles that can be alive at once.
+        """
+        self.capacity = capacity
+        self.count = 0
+
+        # one entry per slot
+        self.effect = array('H', [0]) * capacity
+        self.frame = array('d', [0]) * capacity
+        self.x = array('i', [0]) * capacity
+        self.y = array('i', [0]) * capacity
+
+        # what Surface.blits is given, one [image, [x, y]] entry per slot that is filled in again every frame
+        self.blit_items = [[None, [0, 0]] for _ in range(capacity)]
+
+    def remove(self, slot: int) -> None:
+        """Removes a particle by moving the last live particle into its slot.
+
+        Args:
+            slot (int): The slot of the particle.
+        """
+        self.count -= 1
+        last = self.count
+        for column in (self.effect, self.frame, self.x, self.y):
+            column[slot] = column[last]
+
+
+class ParticleSystem:
+    def __init__(self, capacity: int = PARTICLE_POOL_SIZE) -> None:
+        """Plays short animations, like hit effects, without a sprite per animation.
+        Every layer has a fixed amount of slots, set aside up front, and a particle is only an effect id,
+        a frame and a position in typed arrays, so spawning and ending particles doesn't create any objects.
+        All the live particles of a layer are drawn with one Surface.blits call.
+
+        Args:
+            capacity (int, optional): Most particles that can be alive at once on every layer. Defaults to PARTICLE_POOL_SIZE.
+        """
+        self.effect_ids = {}
+        self.frames: List[List[pygame.Surface]] = []
+        self.half_sizes: List[List[Tuple[int, int]]] = [] # frames are drawn centered on the particle
+        self.frame_counts = array('H')
+        for name, folder in PARTICLE_EFFECTS.items():
+            frames = import_atlas(folder)
+            self.effect_ids[name] = len(self.frames)
+            self.frames.append(frames)
+            self.half_sizes.append([(frame.get_width() // 2, frame.get_height() // 2) for frame in frames])
+            self.frame_counts.append(len(frames))
+
+        self.layers = [ParticleLayer(capacity) for _ in range(LAYERS)]
+        # changes whenever what the particles look like changes
+        self.version = 0
+
+    def spawn(self, effect: str, pos: Tuple[int, int], layer: int = ABOVE_SPRITES) -> bool:
+        """Starts an effect, centered on a position.
+
+        Args:
+            effect (str): Name of the effect, a key of PARTICLE_EFFECTS.
+            pos (Tuple[int, int]): Centre of the effect in pixels.
+            layer (int, optional): BELOW_SPRITES or ABOVE_SPRITES. Defaults to ABOVE_SPRITES.
+
+        Returns:
+            bool: False if the layer was full and the effect was dropped.
+        """
+        particles = self.layers[layer]
+        slot = particles.count
+        if slot == particles.capacity:
+            return False
+        particles.count += 1
+        particles.effect[slot] = self.effect_ids[effect]
+        particles.frame[slot] = 0
+        particles.x[slot], particles.y[slot] = int(pos[0]), int(pos[1])
+        self.version += 1
+        return True
+
+    def update(self) -> None:
+        """Steps the animation of every particle, particles that played their last frame are removed.
+        """
+        frame_counts = self.frame_counts
+        for particles in self.layers:
+            if not particles.count:
+                continue
+            self.version += 1
+            effects, frames = particles.effect, particles.frame
+            slot = 0
+            while slot < particles.count:
+                frame = frames[slot] + PARTICLE_ANIMATION_SPEED
+                if frame >= frame_counts[effects[slot]]:
+                    # the last particle is moved into this slot, so the slot is checked again
+                    particles.remove(slot)
+                else:
+                    frames[slot] = frame
+                    slot += 1
+
+    def draw(self, surface: pygame.Surface, offset: pygame.math.Vector2, camera_rect: pygame.Rect, layer: int) -> None:
+        """Draws the particles of a layer that overlap the camera.
+
+        Args:
+            surface (pygame.Surface): The surface to draw on.
+            offset (pygame.math.Vector2): Top left of the camera in the world.
+            camera_rect (pygame.Rect): The area of the world on screen.
+            layer (int): BELOW_SPRITES or ABOVE_SPRITES.
+        """
+        particles = self.layers[layer]
+        if not particles.count:
+            return
+        all_frames, half_sizes = self.frames, self.half_sizes
+        effects, frames, xs, ys = particles.effect, particles.frame, particles.x, particles.y
+        items = particles.blit_items
+        offset_x, offset_y = offset
+        left, top, right, bottom = camera_rect.left, camera_rect.top, camera_rect.right, camera_rect.bottom
+
+        drawn = 0
+        for slot in range(particles.count):
+            effect = effects[slot]
+            frame = int(frames[slot])
+            half_width, half_height = half_sizes[effect][frame]
+            x = xs[slot] - half_width
+            y = ys[slot] - half_height
+            if x >= right or x + half_width * 2 <= left or y >= bottom or y + half_height * 2 <= top:
+                continue
+            item = items[drawn]
+            item[0] = all_frames[effect][frame]
+            dest = item[1]
+            dest[0] = x - offset_x
+            dest[1] = y - offset_y
+            drawn += 1
+        surface.blits(items[:drawn], doreturn=False)
+        if profiler.enabled:
+            profiler.count('particles drawn', drawn)
+            profiler.count('blits', drawn)
+
+    def __len__(self) -> int:
+        return sum(particles.count for particles in self.layers)
@@ -1,8 +1,41 @@
 import pygame
 from settings import *
 from support import *
+from assets import load_image
 from entity import Entity
-from typing import Union
+from typing import Callable, Union
+
+# input bits, one for every key the player reacts to
+INPUT_UP = 1
+INPUT_DOWN = 2
+INPUT_LEFT = 4
+INPUT_RIGHT = 8
+INPUT_ATTACK = 16
+INPUT_ROLL = 32
+INPUT_SWITCH = 64
+INPUT_KEYS = {
+    pygame.K_UP: INPUT_UP,
+    pygame.K_DOWN: INPUT_DOWN,
+    pygame.K_LEFT: INPUT_LEFT,
+    pygame.K_RIGHT: INPUT_RIGHT,
+    pygame.K_f: INPUT_ATTACK,
+    pygame.K_d: INPUT_ROLL,
+    pygame.K_q: INPUT_SWITCH}
+
+
+def read_keyboard() -> int:
+    """Reads the keys the player reacts to from the keyboard.
+
+    Returns:
+        int: The pressed keys as input bits.
+    """
+    keys = pygame.key.get_pressed()
+    bits = 0
+    for key, bit in INPUT_KEYS.items():
+        if keys[key]:
+            bits |= bit
+    return bits
+
 
 class Player(Entity):
     def __init__(
@@ -11,14 +44,23 @@ class Player(Entity):
             groups,
             obstacle_sprites,
             create_attack,
-            destroy_attack) -> None:
-        super().__init__(groups, obstacle_sprites)
+            destroy_attack,
+            clock=None,
+            input_source: Callable[[], int] = None) -> None:
+        super().__init__(groups, obstacle_sprites, clock)
+        # where the input bits come from every update, the keyboard unless it's a remote player
+        self.input_source = input_source or read_keyboard
+
         # Sprite vars
-        self.image = pygame.image.load(
-            '../graphics/test/player.png').convert_alpha()
+        self.image = load_image('../graphics/test/player.png')
         self.rect = self.image.get_rect(topleft=pos)
         self.hitbox = self.rect.inflate(0, -20)
-        self.invulnerable = False
+        self.invulnerable = False # while rolling
+
+        # taking damage, the player can't be hit again until the invincibility is over
+        self.vulnerable = True
+        self.hurt_time = None
+        self.invincibility_duration = 500
 
         # Graphics setup
         self.import_player_assets()
@@ -84,13 +126,13 @@ class Player(Entity):
             'up_idle': [],
             'up_roll': []}
         for animation in self.animations.keys():
-            self.animations[animation] = import_folder(
+            self.animations[animation] = import_atlas(
                 character_path + animation)
 
     def input(self) -> None:
         """Process keyboard inputs.
         """
-        keys = pygame.key.get_pressed()
+        keys = self.input_source()
 
         # make sure that if we're rolling we keep momentum, but when attacking
         # we want to reset it
@@ -114,37 +156,37 @@ class Player(Entity):
             return
 
         # Attack:
-        if keys[pygame.K_f]:
+        if keys & INPUT_ATTACK:
             self.attacking = True
             self.create_attack()
-            self.attack_time = pygame.time.get_ticks()
+            self.attack_time = self.clock.get_ticks()
             return
 
         # Movement:
-        if keys[pygame.K_UP]:
+        if keys & INPUT_UP:
             self.direction.y -= 1
             self.status = "up"
-        if keys[pygame.K_DOWN]:
+        if keys & INPUT_DOWN:
             self.direction.y += 1
             self.status = "down"
 
-        if keys[pygame.K_LEFT]:
+        if keys & INPUT_LEFT:
             self.direction.x -= 1
             self.status = "left"
-        if keys[pygame.K_RIGHT]:
+        if keys & INPUT_RIGHT:
             self.direction.x += 1
             self.status = "right"
 
         # Dodge roll:
-        if keys[pygame.K_d] and not self.roll_used:
+        if keys & INPUT_ROLL and not self.roll_used:
             self.rolling = True
             self.invulnerable = True
-            self.roll_time = pygame.time.get_ticks()
+            self.roll_time = self.clock.get_ticks()
 
         # Weapon switch:
-        if keys[pygame.K_q] and self.can_switch_weapons:
+        if keys & INPUT_SWITCH and self.can_switch_weapons:
             self.can_switch_weapons = False
-            self.weapon_switch_time = pygame.time.get_ticks()
+            self.weapon_switch_time = self.clock.get_ticks()
             self.weapon_index += 1
             self.weapon_index %= len(WEAPON_DATA)
             self.weapon = list(WEAPON_DATA.keys())[self.weapon_index]
@@ -173,10 +215,10 @@ class Player(Entity):
     def cooldowns(self) -> None:
         """Function that checks to see if the attack or roll cooldown has been completed.
         """
-        current_time = pygame.time.get_ticks()
+        current_time = self.clock.get_ticks()
 
         if self.attacking:
-            if current_time - self.attack_time >= self.attack_active:
+            if current_time - self.attack_time >= self.attack_active + WEAPON_DATA[self.weapon]['cooldown']:
                 self.attacking = False
                 self.status = self.status.replace('_attack', '')
                 self.destroy_attack()
@@ -197,6 +239,34 @@ class Player(Entity):
             if current_time - self.weapon_switch_time >= self.weapon_switch_dureation_cooldown:
                 self.can_switch_weapons = True
 
+        if not self.vulnerable:
+            if current_time - self.hurt_time >= self.invincibility_duration:
+                self.vulnerable = True
+
+    def get_full_weapon_damage(self) -> int:
+        """Returns the damage of an attack with the current weapon.
+
+        Returns:
+            int: The attack stat of the player plus the damage of the weapon.
+        """
+        return self.stats['attack'] + WEAPON_DATA[self.weapon]['damage']
+
+    def get_damage(self, amount: int) -> bool:
+        """Takes damage from an enemy attack, unless the player is rolling or still invincible from the last hit.
+
+        Args:
+            amount (int): The damage of the attack.
+
+        Returns:
+            bool: Whether the attack hit.
+        """
+        if self.invulnerable or not self.vulnerable:
+            return False
+        self.health = max(self.health - amount, 0)
+        self.vulnerable = False
+        self.hurt_time = self.clock.get_ticks()
+        return True
+
     def move(self, speed: Union[int, float]):
         """Takes into account if the player is rolling or not before running the move command
 
@@ -211,11 +281,17 @@ class Player(Entity):
             speed *= self.post_roll_speed_modifier
         super().move(speed)
     
-    def update(self) -> None:
-        """Is run every frame, gets input and updates movement.
+    def simulate(self) -> None:
+        """Steps the state of the player one tick: input, cooldowns, status and movement.
+        It only reads the clock of the player and never draws, so the client can replay it to predict the player.
         """
         self.input()
         self.cooldowns()
         self.get_status()
-        self.animate()
         self.move(self.speed)
+
+    def update(self) -> None:
+        """Is run every frame, gets input and updates movement.
+        """
+        self.simulate()
+        self.animate()
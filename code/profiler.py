@@ -0,0 +1,263 @@
+import pygame
+import json
+import os
+from array import array
+from collections import deque
+from contextlib import nullcontext
+from functools import wraps
+from time import perf_counter, strftime
+from typing import Callable, Dict, List, Optional
+from settings import *
+from debug import debug
+
+# returned by Profiler.scope while profiling is off, entering it does nothing
+NO_SCOPE = nullcontext()
+
+
+class Scope:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler: 'Profiler', name: str) -> None:
+        """Times the code in a with block and records it as one event.
+
+        Args:
+            profiler (Profiler): The profiler to record the event in.
+            name (str): Name of the event.
+        """
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.profiler.record(self.name, self.start, perf_counter())
+
+
+class Profiler:
+    def __init__(self, history: int = PROFILER_HISTORY, trace_events: int = PROFILER_TRACE_EVENTS) -> None:
+        """Scoped timers and counters per frame, kept off until it's enabled.
+        While it's off a scope is a shared do nothing context and instrumented methods aren't wrapped at all,
+        so the only cost left in the game is a with statement per phase and an attribute check per counter.
+
+        Args:
+            history (int, optional): Frame times kept for the graph. Defaults to PROFILER_HISTORY.
+            trace_events (int, optional): Newest events kept for the trace export. Defaults to PROFILER_TRACE_EVENTS.
+        """
+        self.enabled = False
+
+        # time and count of every scope and every counter this frame, and the ones of the last finished frame
+        self.times: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self.last_frame = ({}, {}, {})
+
+        # milliseconds of the last frames, oldest first
+        self.history = array('d', [0]) * history
+        self.frame_start = None
+
+        # (name, start, end) of the scopes and (start, counters) of the frames, times in seconds
+        self.events = deque(maxlen=trace_events)
+        self.frames = deque(maxlen=trace_events)
+        self.origin = perf_counter()
+
+        # methods that are timed while profiling is on: (owner, attribute, name, original)
+        self.instrumented: List[tuple] = []
+
+    def enable(self) -> None:
+        """Starts profiling and wraps the instrumented methods in timers.
+        """
+        if self.enabled:
+            return
+        self.enabled = True
+        self.frame_start = None
+        for owner, attribute, name, original in self.instrumented:
+            setattr(owner, attribute, self.timed(original, name))
+
+    def disable(self) -> None:
+        """Stops profiling and puts back the original instrumented methods.
+        The recorded events are kept until the next export.
+        """
+        if not self.enabled:
+            return
+        self.enabled = False
+        for owner, attribute, name, original in self.instrumented:
+            setattr(owner, attribute, original)
+
+    def toggle(self) -> None:
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def scope(self, name: str):
+        """Returns a context manager that times its with block.
+
+        Args:
+            name (str): Name of the timed code.
+
+        Returns:
+            A Scope, or NO_SCOPE while profiling is off.
+        """
+        return Scope(self, name) if self.enabled else NO_SCOPE
+
+    def timed(self, function: Callable, name: str) -> Callable:
+        """Wraps a function in a scope.
+
+        Args:
+            function (Callable): The function to time.
+            name (str): Name of the timed code.
+
+        Returns:
+            Callable: The wrapped function.
+        """
+        record = self.record
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, start, perf_counter())
+        return wrapper
+
+    def instrument(self, owner: object, attribute: str, name: Optional[str] = None) -> None:
+        """Times a method or function every time it's called, but only while profiling is on.
+        The attribute is replaced by a timed wrapper when profiling starts and put back when it stops,
+        so instrumenting a hot method costs nothing while profiling is off.
+
+        Args:
+            owner (object): The class or module the attribute is looked up on.
+            attribute (str): Name of the method or function.
+            name (Optional[str], optional): Name of the timed code. Defaults to None, owner.attribute.
+        """
+        name = name or f'{owner.__name__}.{attribute}'
+        original = owner.__dict__[attribute]
+        self.instrumented.append((owner, attribute, name, original))
+        if self.enabled:
+            setattr(owner, attribute, self.timed(original, name))
+
+    def record(self, name: str, start: float, end: float) -> None:
+        """Adds a timed event to the current frame.
+
+        Args:
+            name (str): Name of the timed code.
+            start (float): When it started, from perf_counter.
+            end (float): When it ended, from perf_counter.
+        """
+        self.times[name] = self.times.get(name, 0) + end - start
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.events.append((name, start, end))
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Adds to a counter of the current frame. Hot code should check self.enabled before calling this.
+
+        Args:
+            name (str): Name of the counter.
+            amount (int, optional): Amount to add. Defaults to 1.
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def begin_frame(self) -> None:
+        if self.enabled:
+            self.frame_start = perf_counter()
+
+    def end_frame(self) -> None:
+        """Finishes the current frame, its times and counters are what the overlay shows next.
+        """
+        if not self.enabled or self.frame_start is None:
+            return
+        end = perf_counter()
+        self.history.pop(0)
+        self.history.append((end - self.frame_start) * 1000)
+        self.events.append(('frame', self.frame_start, end))
+        self.frames.append((self.frame_start, dict(self.counters)))
+        self.last_frame = (self.times, self.calls, self.counters)
+        self.times, self.calls, self.counters = {}, {}, {}
+
+    def trace(self) -> dict:
+        """Returns the recorded events in the Chrome trace event format,
+        which chrome://tracing and Perfetto can open.
+
+        Returns:
+            dict: The trace, with one complete event per scope and one counter event per frame.
+        """
+        origin = self.origin
+        pid = os.getpid()
+        events = [{'name': name, 'ph': 'X', 'pid': pid, 'tid': 0,
+                   'ts': (start - origin) * 1e6, 'dur': (end - start) * 1e6}
+                  for name, start, end in self.events]
+        events += [{'name': 'counters', 'ph': 'C', 'pid': pid, 'tid': 0,
+                    'ts': (start - origin) * 1e6, 'args': counters}
+                   for start, counters in self.frames if counters]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path: Optional[str] = None) -> str:
+        """Writes the trace to a JSON file.
+
+        Args:
+            path (Optional[str], optional): Where to write it. Defaults to None, a timestamped file in PROFILER_TRACE_DIR.
+
+        Returns:
+            str: The path of the written file.
+        """
+        if path is None:
+            os.makedirs(PROFILER_TRACE_DIR, exist_ok=True)
+            path = os.path.join(PROFILER_TRACE_DIR, strftime('trace_%Y%m%d_%H%M%S.json'))
+        with open(path, 'w') as f:
+            json.dump(self.trace(), f)
+        return path
+
+
+class ProfilerOverlay:
+    def __init__(self, profiler: Profiler) -> None:
+        """Frame time graph and the times and counters of the last frame, drawn in the top right corner.
+
+        Args:
+            profiler (Profiler): The profiler to show.
+        """
+        self.profiler = profiler
+        self.graph_height = 80
+        self.graph_scale = self.graph_height / (2000 / FPS) # the graph tops out at two frame budgets
+        self.line_height = 22
+        self.width = max(len(profiler.history), 330) # wide enough for the longer scope names
+        # most lines shown so far, the panel behind them covers the longest text there has been,
+        # as the level isn't drawn again behind the overlay if nothing in it changed
+        self.most_lines = 0
+
+    def display(self) -> List[pygame.Rect]:
+        """Draws the overlay.
+
+        Returns:
+            List[pygame.Rect]: The areas of the screen that were drawn to.
+        """
+        display_surface = pygame.display.get_surface()
+        history = self.profiler.history
+        left = display_surface.get_width() - self.width - 10
+        graph_rect = pygame.Rect(left, 10, len(history), self.graph_height)
+
+        times, calls, counters = self.profiler.last_frame
+        lines = [f'frame {history[-1]:.2f} ms']
+        lines += [f'{name} {time * 1000:.2f} ms x{calls[name]}' for name, time in sorted(times.items(), key=lambda item: -item[1])]
+        lines += [f'{name} {amount}' for name, amount in sorted(counters.items())]
+        self.most_lines = max(self.most_lines, len(lines))
+        panel_rect = pygame.Rect(left, 10, self.width, self.graph_height + 4 + self.most_lines * self.line_height)
+        pygame.draw.rect(display_surface, 'Black', panel_rect)
+        budget_y = graph_rect.bottom - int(1000 / FPS * self.graph_scale)
+        for x, milliseconds in enumerate(history, left):
+            height = min(int(milliseconds * self.graph_scale), self.graph_height)
+            colour = 'Red' if milliseconds > 1000 / FPS else 'Green'
+            pygame.draw.line(display_surface, colour, (x, graph_rect.bottom - 1), (x, graph_rect.bottom - height))
+        pygame.draw.line(display_surface, 'White', (left, budget_y), (graph_rect.right - 1, budget_y))
+
+        y = graph_rect.bottom + 4
+        for line in lines:
+            debug(line, y, left)
+            y += self.line_height
+        return [panel_rect]
+
+
+# the profiler of the game, everything that is timed records in this one
+profiler = Profiler()
@@ -0,0 +1,176 @@
+import struct
+import sys
+from array import array
+from typing import Callable
+from zlib import crc32
+from settings import *
+from network import enemy_state, player_state
+from player import read_keyboard
+
+# file layout:
+#   header: magic, version, level seed, fixed timestep, tick count, input run count
+#   input runs: input bits and the amount of ticks in a row they were held
+#   hashes: one uint32 state hash per tick
+MAGIC = b'RPGR'
+VERSION = 1
+HEADER = struct.Struct('<4sHIdII')
+INPUT_RUN = struct.Struct('<BH')
+MAX_RUN = 2 ** 16 - 1
+
+
+def state_hash(level) -> int:
+    """Returns a hash of the simulated state of a level, two runs that stay in step have the same hash every tick.
+
+    Args:
+        level (Level): The level.
+
+    Returns:
+        int: CRC32 of the players, in the order they joined, and the loaded enemies, by their spawn tile.
+    """
+    state = array('i')
+    for player in level.players:
+        state.extend(player_state(player))
+        state.append(int(player.energy))
+        state.append(int(player.exp))
+    active_enemies = level.active_enemies
+    for spawn in sorted(active_enemies):
+        state.extend(enemy_state(active_enemies[spawn]))
+    if sys.byteorder != 'little':
+        state.byteswap()
+    return crc32(state)
+
+
+class Replay:
+    def __init__(self, seed: int) -> None:
+        """The input bits of the local player every tick and the state hash after every tick.
+        The simulation only depends on the level seed, the map and the inputs,
+        so playing the inputs back on a level with the same seed has to end up with the same hashes.
+
+        Args:
+            seed (int): Seed of the recorded level.
+        """
+        self.seed = seed
+        self.inputs = array('B')
+        self.hashes = array('I')
+
+    def save(self, path: str) -> None:
+        """Writes the replay to a file, the inputs are stored as runs as they mostly stay the same for many ticks.
+
+        Args:
+            path (str): Where to write the replay.
+        """
+        runs = []
+        for input_bits in self.inputs:
+            if runs and runs[-1][0] == input_bits and runs[-1][1] < MAX_RUN:
+                runs[-1][1] += 1
+            else:
+                runs.append([input_bits, 1])
+
+        hashes = array('I', self.hashes)
+        if sys.byteorder != 'little':
+            hashes.byteswap()
+        # built before the file is opened, so a replay that can't be written doesn't wipe the file
+        data = b''.join([
+            HEADER.pack(MAGIC, VERSION, self.seed, FIXED_TIMESTEP, len(self.inputs), len(runs)),
+            b''.join(INPUT_RUN.pack(input_bits, ticks) for input_bits, ticks in runs),
+            hashes.tobytes()])
+        with open(path, 'wb') as replay_file:
+            replay_file.write(data)
+
+    @classmethod
+    def load(cls, path: str) -> 'Replay':
+        """Reads a replay written by save.
+
+        Args:
+            path (str): Path to the replay.
+
+        Raises:
+            ValueError: If the file isn't a complete replay of a supported version, or was recorded at another timestep.
+
+        Returns:
+            Replay: The replay.
+        """
+        with open(path, 'rb') as replay_file:
+            data = replay_file.read()
+
+        magic, version, seed, timestep, ticks, run_count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} replay")
+        if timestep != FIXED_TIMESTEP:
+            raise ValueError(f"{path} was recorded at a timestep of {timestep} ms, not {FIXED_TIMESTEP} ms")
+
+        replay = cls(seed)
+        hashes_offset = HEADER.size + run_count * INPUT_RUN.size
+        if len(data) != hashes_offset + ticks * replay.hashes.itemsize:
+            raise ValueError(f"{path} is cut off")
+        for input_bits, run in INPUT_RUN.iter_unpack(data[HEADER.size:hashes_offset]):
+            replay.inputs.extend(array('B', [input_bits]) * run)
+        replay.hashes.frombytes(data[hashes_offset:])
+        if sys.byteorder != 'little':
+            replay.hashes.byteswap()
+        if len(replay.inputs) != ticks:
+            raise ValueError(f"{path} has {len(replay.inputs)} inputs for {ticks} ticks")
+        return replay
+
+    def __len__(self) -> int:
+        return len(self.inputs)
+
+
+class ReplayRecorder:
+    def __init__(self, level, input_source: Callable[[], int] = read_keyboard) -> None:
+        """Records a replay of a level. The input is read once at the start of every tick and the local
+        player is given that, as the player doesn't read its input on every tick, for example while rolling.
+
+        Args:
+            level (Level): The level to record, it has to have a local player.
+            input_source (Callable[[], int], optional): Where the input bits come from. Defaults to read_keyboard.
+        """
+        self.level = level
+        self.input_source = input_source
+        self.replay = Replay(level.seed)
+        self.input_bits = 0
+        level.player.input_source = lambda: self.input_bits
+
+    def begin_tick(self) -> None:
+        self.input_bits = self.input_source()
+
+    def end_tick(self) -> None:
+        self.replay.inputs.append(self.input_bits)
+        self.replay.hashes.append(state_hash(self.level))
+
+
+class ReplayPlayback:
+    def __init__(self, level, replay: Replay) -> None:
+        """Plays a replay back on a level and checks the state hash after every tick.
+        Once the replay is over the player gets no more input and nothing is checked.
+
+        Args:
+            level (Level): The level to play the replay on, created with the seed of the replay.
+            replay (Replay): The replay.
+
+        Raises:
+            ValueError: If the level has another seed than the replay.
+        """
+        if level.seed != replay.seed:
+            raise ValueError(f"the replay was recorded with seed {replay.seed}, the level has seed {level.seed}")
+        self.level = level
+        self.replay = replay
+        self.tick = 0
+        self.input_bits = 0
+        # first tick after which the state hash didn't match the recording
+        self.mismatch = None
+        level.player.input_source = lambda: self.input_bits
+
+    @property
+    def finished(self) -> bool:
+        return self.tick >= len(self.replay)
+
+    def begin_tick(self) -> None:
+        self.input_bits = 0 if self.finished else self.replay.inputs[self.tick]
+
+    def end_tick(self) -> None:
+        if self.finished:
+            return
+        if self.mismatch is None and state_hash(self.level) != self.replay.hashes[self.tick]:
+            self.mismatch = self.tick
+        self.tick += 1
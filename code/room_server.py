@@ -0,0 +1,409 @@
+import os
+
+# has to be set before pygame initialises the display
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import asyncio
+import multiprocessing
+import pygame
+from argparse import ArgumentParser
+from multiprocessing.connection import Connection
+from random import Random
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+from settings import *
+from network import *
+from level import Level
+from player import INPUT_DOWN, INPUT_LEFT, INPUT_RIGHT, INPUT_UP
+from server import GameServer
+from timer import FixedClock
+
+# what a bot can press, standing still included
+WANDER_INPUTS = (0, INPUT_UP, INPUT_DOWN, INPUT_LEFT, INPUT_RIGHT,
+                 INPUT_UP | INPUT_LEFT, INPUT_UP | INPUT_RIGHT, INPUT_DOWN | INPUT_LEFT, INPUT_DOWN | INPUT_RIGHT)
+
+
+class WanderInput:
+    def __init__(self, seed: str) -> None:
+        """Input source of a bot player that walks in a random direction and picks a new one every second.
+
+        Args:
+            seed (str): Seed of the directions, so a bot walks the same way every run.
+        """
+        self.random = Random(seed)
+        self.ticks = 0
+        self.input_bits = 0
+
+    def __call__(self) -> int:
+        if self.ticks % FPS == 0:
+            self.input_bits = self.random.choice(WANDER_INPUTS)
+        self.ticks += 1
+        return self.input_bits
+
+
+class RoomScheduler:
+    def __init__(self, workers: int) -> None:
+        """Decides which worker process a new room runs on. The workers report how many entities
+        every room of theirs simulates, and a new room goes to the worker with the fewest entities,
+        so busy rooms are spread over the workers instead of the rooms being dealt out in turn.
+        Rooms stay on their worker once they're running.
+
+        Args:
+            workers (int): Amount of worker processes.
+        """
+        # entity count of every room, by worker
+        self.loads: List[Dict[str, int]] = [{} for _ in range(workers)]
+        self.rooms: Dict[str, int] = {}
+
+    def load(self, worker: int) -> int:
+        """Returns how many entities a worker simulates.
+
+        Args:
+            worker (int): Index of the worker.
+
+        Returns:
+            int: The entities of all its rooms.
+        """
+        return sum(self.loads[worker].values())
+
+    def place(self, room: str) -> int:
+        """Picks the worker for a new room, ties go to the worker with the fewest rooms.
+
+        Args:
+            room (str): Name of the room.
+
+        Returns:
+            int: Index of the worker.
+        """
+        worker = min(range(len(self.loads)), key=lambda worker: (self.load(worker), len(self.loads[worker])))
+        # until its worker reports it, a new room is guessed to be as busy as the average room
+        counts = [count for loads in self.loads for count in loads.values()]
+        self.loads[worker][room] = sum(counts) // len(counts) if counts else 0
+        self.rooms[room] = worker
+        return worker
+
+    def remove(self, room: str) -> int:
+        """Forgets a room that is closed.
+
+        Args:
+            room (str): Name of the room.
+
+        Returns:
+            int: Index of the worker it ran on.
+        """
+        worker = self.rooms.pop(room)
+        del self.loads[worker][room]
+        return worker
+
+    def report(self, worker: int, counts: Dict[str, int]) -> None:
+        """Stores the entity counts a worker reported.
+
+        Args:
+            worker (int): Index of the worker.
+            counts (Dict[str, int]): Entity count by room name.
+        """
+        for room, count in counts.items():
+            if self.rooms.get(room) == worker:
+                self.loads[worker][room] = count
+
+
+class RoomWorker:
+    def __init__(self, connection: Connection, host: str, realtime: bool = True) -> None:
+        """Runs the rooms the room server gives a worker process. Every room is a GameServer
+        with its own level and UDP port, and all of them are ticked together at the fixed timestep.
+
+        Args:
+            connection (Connection): Pipe to the room server, commands come in and reports go out.
+            host (str): Address the rooms listen on.
+            realtime (bool, optional): Whether to tick at the fixed timestep, or as fast as possible for benchmarks.
+                Defaults to True.
+        """
+        self.connection = connection
+        self.host = host
+        self.realtime = realtime
+        self.rooms: Dict[str, GameServer] = {}
+        self.ticks = 0 # room ticks, summed over the rooms
+        self.running = True
+
+    async def handle_commands(self) -> None:
+        """Runs the commands the room server sent since the last tick.
+        ('create', name, seed, bots) opens a room and answers ('created', name, port), ('close', name) closes a room,
+        ('stop',) ends the worker, and so does the room server going away.
+        """
+        while self.connection.poll():
+            try:
+                command, *args = self.connection.recv()
+            except EOFError:
+                # the room server is gone, nobody can reach the rooms anymore
+                self.running = False
+                return
+            if command == 'create':
+                name, seed, bots = args
+                clock = FixedClock()
+                room = GameServer(Level(clock, seed=seed, local_player=False), clock)
+                for bot in range(bots):
+                    room.level.add_player(WanderInput(f'{name}/{bot}'))
+                await room.listen(self.host, 0)
+                self.rooms[name] = room
+                self.connection.send(('created', name, room.transport.get_extra_info('sockname')[1]))
+            elif command == 'close':
+                name, = args
+                room = self.rooms.pop(name, None)
+                if room:
+                    room.transport.close()
+            elif command == 'stop':
+                self.running = False
+
+    def report(self) -> None:
+        """Sends the room server the entity and player count of every room and the room ticks so far.
+        """
+        self.connection.send((
+            'load',
+            {name: room.entity_count() for name, room in self.rooms.items()},
+            {name: len(room.level.players) for name, room in self.rooms.items()},
+            self.ticks))
+
+    async def run(self) -> None:
+        """Ticks every room until the room server stops the worker, reporting the entity counts every ROOM_REPORT_INTERVAL.
+        """
+        loop = asyncio.get_running_loop()
+        step = FIXED_TIMESTEP / 1000
+        next_tick = next_report = loop.time()
+        try:
+            while self.running:
+                await self.handle_commands()
+                for room in self.rooms.values():
+                    room.tick()
+                self.ticks += len(self.rooms)
+
+                if loop.time() >= next_report:
+                    next_report += ROOM_REPORT_INTERVAL
+                    self.report()
+
+                if self.realtime:
+                    next_tick += step
+                    await asyncio.sleep(max(0, next_tick - loop.time()))
+                else:
+                    # still lets the rooms receive their packets
+                    await asyncio.sleep(0)
+            self.report()
+        finally:
+            for room in self.rooms.values():
+                room.transport.close()
+
+
+def run_worker(connection: Connection, host: str, realtime: bool) -> None:
+    """Entry point of a worker process.
+
+    Args:
+        connection (Connection): Pipe to the room server.
+        host (str): Address the rooms listen on.
+        realtime (bool): Whether to tick at the fixed timestep.
+    """
+    pygame.init()
+    # images are converted to the display format, so a (dummy) display is still needed
+    pygame.display.set_mode((WIDTH, HEIGTH))
+    asyncio.run(RoomWorker(connection, host, realtime).run())
+
+
+class RoomServer(asyncio.DatagramProtocol):
+    def __init__(self, host: str = '0.0.0.0', workers: Optional[int] = ROOM_WORKERS, realtime: bool = True) -> None:
+        """Dedicated server that runs many independent levels, called rooms, on a pool of worker processes.
+        Clients send the name of the room they want to the lobby port and get back the port the room is on,
+        after which they talk to the room directly. A room is opened the first time it's asked for,
+        on the worker the scheduler picks. At most MAX_ROOMS rooms run at once,
+        and rooms that had no players for ROOM_IDLE_TIMEOUT are closed again.
+
+        Args:
+            host (str, optional): Address the lobby and the rooms listen on. Defaults to '0.0.0.0'.
+            workers (Optional[int], optional): Amount of worker processes. Defaults to ROOM_WORKERS, one per cpu.
+            realtime (bool, optional): Whether the rooms tick at the fixed timestep. Defaults to True.
+        """
+        self.host = host
+        self.transport = None
+
+        # workers are spawned instead of forked, so they don't inherit the pipes of the other workers
+        # and see their own pipe close when the room server goes away
+        context = multiprocessing.get_context('spawn')
+        self.connections: List[Connection] = []
+        self.processes: List[multiprocessing.Process] = []
+        for _ in range(workers or os.cpu_count() or 1):
+            connection, worker_connection = context.Pipe()
+            process = context.Process(target=run_worker, args=(worker_connection, host, realtime), daemon=True)
+            process.start()
+            self.connections.append(connection)
+            self.processes.append(process)
+        self.scheduler = RoomScheduler(len(self.processes))
+
+        # port of every running room, and the clients waiting for a room that is being opened
+        self.ports: Dict[str, int] = {}
+        self.waiting: Dict[str, Dict[Tuple[str, int], None]] = {}
+        # room ticks every worker reported
+        self.ticks = [0] * len(self.processes)
+        # since when the rooms without players have been reported empty
+        self.idle_since: Dict[str, float] = {}
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, address: Tuple[str, int]) -> None:
+        if not data or data[0] != JOIN:
+            return
+        room = decode_join(data)
+        port = self.ports.get(room)
+        if port is None:
+            # clients keep asking until they get an answer, so they only have to be answered once the room runs
+            if self.open_room(room):
+                self.waiting.setdefault(room, {})[address] = None
+        else:
+            self.transport.sendto(ROOM_PACKET.pack(ROOM, port), address)
+
+    def open_room(self, room: str, seed: Optional[int] = None, bots: int = 0) -> bool:
+        """Opens a room on the least busy worker, unless it is already open or opening.
+
+        Args:
+            room (str): Name of the room.
+            seed (Optional[int], optional): Seed of the level. Defaults to None, a random seed.
+            bots (int, optional): Bot players to add to the room. Defaults to 0.
+
+        Returns:
+            bool: False if the room isn't open and MAX_ROOMS rooms already are.
+        """
+        if room in self.scheduler.rooms:
+            return True
+        if len(self.scheduler.rooms) >= MAX_ROOMS:
+            return False
+        worker = self.scheduler.place(room)
+        self.connections[worker].send(('create', room, seed, bots))
+        return True
+
+    def close_room(self, room: str) -> None:
+        """Closes a running room, a client that asks for it afterwards gets a new one.
+
+        Args:
+            room (str): Name of the room.
+        """
+        worker = self.scheduler.remove(room)
+        del self.ports[room]
+        self.idle_since.pop(room, None)
+        self.connections[worker].send(('close', room))
+
+    def close_idle_rooms(self) -> None:
+        """Closes the rooms that have been reported without players for ROOM_IDLE_TIMEOUT.
+        """
+        now = monotonic()
+        for room in [room for room, since in self.idle_since.items() if now - since >= ROOM_IDLE_TIMEOUT]:
+            self.close_room(room)
+
+    def poll_workers(self) -> None:
+        """Handles the messages of the workers without blocking.
+        """
+        for worker, connection in enumerate(self.connections):
+            while connection.poll():
+                try:
+                    message, *args = connection.recv()
+                except EOFError:
+                    # the worker stopped, everything it sent was read already
+                    break
+                if message == 'created':
+                    room, port = args
+                    self.ports[room] = port
+                    for address in self.waiting.pop(room, {}):
+                        self.transport.sendto(ROOM_PACKET.pack(ROOM, port), address)
+                elif message == 'load':
+                    counts, players, self.ticks[worker] = args
+                    self.scheduler.report(worker, counts)
+                    for room, count in players.items():
+                        # reports sent before a room was closed still name it
+                        if count or room not in self.ports:
+                            self.idle_since.pop(room, None)
+                        else:
+                            self.idle_since.setdefault(room, monotonic())
+
+    def stop(self) -> None:
+        """Stops the workers and waits for their last report.
+        """
+        for connection in self.connections:
+            connection.send(('stop',))
+        for process in self.processes:
+            process.join()
+        self.poll_workers()
+
+    async def serve(self, port: int, stats_interval: float = 0) -> None:
+        """Listens for clients on the lobby port until cancelled.
+
+        Args:
+            port (int): Lobby port.
+            stats_interval (float, optional): Seconds between load reports, 0 to not report. Defaults to 0.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, local_addr=(self.host, port))
+        next_stats = loop.time() + stats_interval
+        try:
+            while True:
+                self.poll_workers()
+                self.close_idle_rooms()
+                if stats_interval and loop.time() >= next_stats:
+                    next_stats += stats_interval
+                    for worker in range(len(self.processes)):
+                        print(f"worker {worker}: {len(self.scheduler.loads[worker])} rooms, "
+                              f"{self.scheduler.load(worker)} entities")
+                await asyncio.sleep(0.01)
+        finally:
+            self.transport.close()
+            self.stop()
+
+    async def benchmark(self, rooms: int, bots: int, seconds: float) -> float:
+        """Runs rooms with bot players as fast as the workers can and measures the ticks of all of them together.
+
+        Args:
+            rooms (int): Amount of rooms to open.
+            bots (int): Bot players per room.
+            seconds (float): How long to measure for.
+
+        Returns:
+            float: Room ticks per second, summed over every room.
+
+        Raises:
+            ValueError: If more than MAX_ROOMS rooms are asked for.
+        """
+        if rooms > MAX_ROOMS:
+            raise ValueError(f"at most {MAX_ROOMS} rooms can run at once, got {rooms}")
+        for room in range(rooms):
+            self.open_room(f'benchmark{room}', seed=room, bots=bots)
+        while len(self.ports) < rooms:
+            self.poll_workers()
+            await asyncio.sleep(0.01)
+
+        loop = asyncio.get_running_loop()
+        # measured from one report to another, the workers don't all report at the same time
+        await asyncio.sleep(ROOM_REPORT_INTERVAL * 2)
+        self.poll_workers()
+        start, start_ticks = loop.time(), sum(self.ticks)
+        await asyncio.sleep(seconds)
+        self.poll_workers()
+        end, end_ticks = loop.time(), sum(self.ticks)
+        return (end_ticks - start_ticks) / (end - start)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Runs many headless game rooms on a pool of worker processes.")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help="lobby port, rooms get a free port each")
+    parser.add_argument('--workers', type=int, default=ROOM_WORKERS, help="worker processes, one per cpu by default")
+    parser.add_argument('--stats', type=float, default=5, help="seconds between load reports, 0 to disable")
+    parser.add_argument('--benchmark', type=float, metavar='SECONDS',
+                        help="run --rooms rooms as fast as possible and report the ticks per second instead of serving")
+    parser.add_argument('--rooms', type=int, default=8, help="rooms to open for --benchmark")
+    parser.add_argument('--bots', type=int, default=4, help="bot players per room for --benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        server = RoomServer('127.0.0.1', args.workers, realtime=False)
+        ticks_per_second = asyncio.run(server.benchmark(args.rooms, args.bots, args.benchmark))
+        server.stop()
+        print(f"{args.rooms} rooms on {len(server.processes)} workers: {ticks_per_second:.0f} room ticks/s "
+              f"({ticks_per_second / FPS:.1f} rooms in real time)")
+    else:
+        asyncio.run(RoomServer(args.host, args.workers).serve(args.port, args.stats))
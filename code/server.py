@@ -0,0 +1,368 @@
+import os
+
+# has to be set before pygame initialises the display
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import asyncio
+import pygame
+from argparse import ArgumentParser
+from collections import OrderedDict, deque
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+from settings import *
+from level import Level
+from network import *
+from timer import FixedClock
+
+
+class ClientConnection:
+    def __init__(self, address: Tuple[str, int], entity_id: int, player) -> None:
+        """Server side state of a connected client.
+
+        Args:
+            address (Tuple[str, int]): Address the client sends from.
+            entity_id (int): Network id of the client's player.
+            player (Player): The player the client controls.
+        """
+        self.address = address
+        self.entity_id = entity_id
+        self.player = player
+
+        # inputs are simulated one per tick in the order they were made
+        self.inputs = deque(maxlen=INPUT_BUFFER_SIZE)
+        self.current_input = 0
+        self.newest_input = 0
+        self.last_processed_input = 0
+
+        # snapshots sent to the client, by id, to delta compress against once acknowledged
+        self.history: OrderedDict[int, Dict[int, EntityState]] = OrderedDict()
+        self.acked_snapshot = 0
+
+        # ids of the entities in the area of interest of the player, the ones the client is sent
+        self.interest: Dict[int, None] = {}
+
+        # bandwidth counters
+        self.connected_at = monotonic()
+        self.last_heard = self.connected_at
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def bandwidth(self) -> Dict[str, float]:
+        """Returns the average bandwidth used by the client since it connected.
+
+        Returns:
+            Dict[str, float]: Bytes per second sent to and received from the client,
+                and how many entities it is sent.
+        """
+        elapsed = max(monotonic() - self.connected_at, 1e-6)
+        return {
+            'sent_bytes_per_second': self.bytes_sent / elapsed,
+            'received_bytes_per_second': self.bytes_received / elapsed,
+            'entities': len(self.interest)}
+
+
+class GameServer(asyncio.DatagramProtocol):
+    def __init__(self, level: Optional[Level] = None, clock: Optional[FixedClock] = None) -> None:
+        """Authoritative UDP game server. Clients send their inputs, the server simulates
+        the level at a fixed timestep and sends every client delta compressed snapshots.
+
+        Args:
+            level (Optional[Level], optional): The level to simulate. Defaults to None, a new level without a local player.
+            clock (Optional[FixedClock], optional): The clock of the level. Defaults to None, a new clock.
+        """
+        self.clock = clock or FixedClock()
+        self.level = level or Level(self.clock, local_player=False)
+        self.transport = None
+        self.clients: Dict[Tuple[str, int], ClientConnection] = {}
+
+        # network ids stay the same for an entity, enemies keep theirs across chunk reloads
+        self.entity_ids: Dict[tuple, int] = {}
+        self.next_entity_id = 1
+        # ids of players that left, with the last snapshot they could have been in, oldest first
+        self.free_ids = deque()
+        self.tick_count = 0
+        self.snapshot_id = 0
+
+    def entity_id(self, key: tuple) -> Optional[int]:
+        """Returns the network id of an entity, giving it one the first time.
+        The id of a player that left is given out again once no client can still delta compress against
+        a snapshot it was in, so a client never mistakes the new entity for the old one.
+
+        Args:
+            key (tuple): What identifies the entity, its spawn tile or the client address.
+
+        Returns:
+            Optional[int]: The network id, or None if all MAX_ENTITY_ID ids are taken.
+        """
+        entity_id = self.entity_ids.get(key)
+        if entity_id is not None:
+            return entity_id
+
+        if self.free_ids:
+            # the oldest snapshot any client could still acknowledge
+            oldest = min((next(iter(client.history)) for client in self.clients.values() if client.history),
+                         default=self.snapshot_id + 1)
+            if self.free_ids[0][0] < oldest:
+                entity_id = self.free_ids.popleft()[1]
+        if entity_id is None:
+            if self.next_entity_id > MAX_ENTITY_ID:
+                return None
+            entity_id = self.next_entity_id
+            self.next_entity_id += 1
+        self.entity_ids[key] = entity_id
+        return entity_id
+
+    def release_entity_id(self, key: tuple) -> None:
+        """Frees the network id of an entity that is gone for good, so it can be given out again.
+
+        Args:
+            key (tuple): What identifies the entity.
+        """
+        entity_id = self.entity_ids.pop(key, None)
+        if entity_id is not None:
+            self.free_ids.append((self.snapshot_id, entity_id))
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, address: Tuple[str, int]) -> None:
+        # anyone can send to the port, so packets that aren't client packets are dropped
+        if not data or data[0] not in (CONNECT, INPUT, DISCONNECT):
+            return
+        packet_type = data[0]
+        client = self.clients.get(address)
+        if client:
+            client.bytes_received += len(data)
+            client.last_heard = monotonic()
+
+        if packet_type == CONNECT:
+            if len(data) != PACKET_TYPE.size:
+                return
+            if client is None:
+                client = self.connect(address)
+            # without a free entity id the client isn't answered, and gives up after its timeout
+            if client:
+                self.send(client, WELCOME_PACKET.pack(WELCOME, client.entity_id, self.level.seed))
+        elif packet_type == INPUT and client:
+            try:
+                acked_snapshot, inputs = decode_input(data)
+            except ValueError:
+                return
+            if acked_snapshot in client.history:
+                client.acked_snapshot = max(client.acked_snapshot, acked_snapshot)
+            for seq, input_bits in inputs:
+                if seq > client.newest_input:
+                    client.inputs.append((seq, input_bits))
+                    client.newest_input = seq
+        elif packet_type == DISCONNECT and client:
+            self.disconnect(client)
+
+    def connect(self, address: Tuple[str, int]) -> Optional[ClientConnection]:
+        """Adds a player to the level for a new client.
+
+        Args:
+            address (Tuple[str, int]): Address of the client.
+
+        Returns:
+            Optional[ClientConnection]: The new connection, or None if there is no entity id left for its player.
+        """
+        entity_id = self.entity_id(('player', address))
+        if entity_id is None:
+            return None
+        client = None
+        player = self.level.add_player(lambda: client.current_input)
+        client = ClientConnection(address, entity_id, player)
+        self.clients[address] = client
+        return client
+
+    def disconnect(self, client: ClientConnection) -> None:
+        """Removes a client and its player.
+
+        Args:
+            client (ClientConnection): The client to remove.
+        """
+        del self.clients[client.address]
+        self.level.remove_player(client.player)
+        self.release_entity_id(('player', client.address))
+
+    def send(self, client: ClientConnection, packet: bytes) -> None:
+        client.bytes_sent += len(packet)
+        self.transport.sendto(packet, client.address)
+
+    def entity_states(self) -> Dict[int, EntityState]:
+        """Returns the networked state of every player and loaded enemy.
+
+        Returns:
+            Dict[int, EntityState]: States by network id.
+        """
+        states = {client.entity_id: player_state(client.player) for client in self.clients.values()}
+        for spawn, enemy in self.level.active_enemies.items():
+            entity_id = self.entity_id(('enemy', spawn))
+            # an enemy that gets no id while every id is taken isn't sent until one is free
+            if entity_id is not None:
+                states[entity_id] = enemy_state(enemy)
+        return states
+
+    def interest_grid(self, states: Dict[int, EntityState]) -> Dict[Tuple[int, int], List[int]]:
+        """Buckets the entities by the world chunk they are in, so a client only has to look at
+        the entities in the chunks around its player.
+
+        Args:
+            states (Dict[int, EntityState]): States by network id.
+
+        Returns:
+            Dict[Tuple[int, int], List[int]]: Network ids by chunk, only chunks with entities in them are keys.
+        """
+        chunk_at = self.level.world.chunk_at
+        grid = {}
+        for entity_id, state in states.items():
+            chunk = chunk_at((state[1], state[2]))
+            entities = grid.get(chunk)
+            if entities is None:
+                grid[chunk] = [entity_id]
+            else:
+                entities.append(entity_id)
+        return grid
+
+    def interest(self, client: ClientConnection, states: Dict[int, EntityState],
+                 grid: Dict[Tuple[int, int], List[int]]) -> Dict[int, EntityState]:
+        """Returns the states of the entities in the area of interest of a client, the screen around its player
+        plus AOI_MARGIN. An entity the client already knows about is kept until it is AOI_HYSTERESIS further out.
+        Entities that enter the area are sent in full and entities that leave it are sent as removed,
+        the same way as entities that spawn and die, as the snapshots are delta compressed against what the client has.
+
+        Args:
+            client (ClientConnection): The client.
+            states (Dict[int, EntityState]): States of every entity by network id.
+            grid (Dict[Tuple[int, int], List[int]]): The entities by chunk, from interest_grid.
+
+        Returns:
+            Dict[int, EntityState]: States of the entities the client should know about, always including its own player.
+        """
+        # measured between hitbox positions, like the states
+        player_x, player_y = client.player.hitbox.topleft
+        reach_x = WIDTH // 2 + AOI_MARGIN
+        reach_y = HEIGTH // 2 + AOI_MARGIN
+        first_column, first_row = self.level.world.chunk_at(
+            (player_x - reach_x - AOI_HYSTERESIS, player_y - reach_y - AOI_HYSTERESIS))
+        last_column, last_row = self.level.world.chunk_at(
+            (player_x + reach_x + AOI_HYSTERESIS, player_y + reach_y + AOI_HYSTERESIS))
+
+        known = client.interest
+        visible = {client.entity_id: states[client.entity_id]}
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                for entity_id in grid.get((column, row), ()):
+                    state = states[entity_id]
+                    slack = AOI_HYSTERESIS if entity_id in known else 0
+                    if abs(state[1] - player_x) <= reach_x + slack and abs(state[2] - player_y) <= reach_y + slack:
+                        visible[entity_id] = state
+
+        client.interest = dict.fromkeys(visible)
+        return visible
+
+    def send_snapshots(self) -> None:
+        """Sends every client the states of the entities in its area of interest,
+        delta compressed against the last snapshot it acknowledged.
+        """
+        self.snapshot_id += 1
+        states = self.entity_states()
+        grid = self.interest_grid(states)
+        for client in self.clients.values():
+            visible = self.interest(client, states, grid)
+            base = client.history.get(client.acked_snapshot)
+            base_id = client.acked_snapshot if base is not None else 0
+            self.send(client, encode_snapshot(
+                self.snapshot_id, base_id, self.tick_count, client.last_processed_input, visible, base or {}))
+
+            # keep the snapshots the client might still acknowledge
+            client.history[self.snapshot_id] = visible
+            while client.history and (len(client.history) > SNAPSHOT_HISTORY
+                                      or next(iter(client.history)) < client.acked_snapshot):
+                client.history.popitem(last=False)
+
+    def tick(self) -> None:
+        """Simulates one fixed timestep and sends snapshots every SNAPSHOT_INTERVAL ticks.
+        Every client gets one of its inputs simulated per tick, the last one is repeated if none arrived in time.
+        """
+        now = monotonic()
+        for client in list(self.clients.values()):
+            if now - client.last_heard > CLIENT_TIMEOUT:
+                self.disconnect(client)
+            elif client.inputs:
+                client.last_processed_input, client.current_input = client.inputs.popleft()
+
+        self.clock.advance(FIXED_TIMESTEP)
+        self.level.update()
+        self.tick_count += 1
+
+        if self.tick_count % SNAPSHOT_INTERVAL == 0:
+            self.send_snapshots()
+
+    def entity_count(self) -> int:
+        """Returns how many entities are simulated, which is what the cost of a tick mostly depends on.
+
+        Returns:
+            int: Amount of players and loaded enemies.
+        """
+        return len(self.level.players) + len(self.level.enemies)
+
+    def bandwidth(self) -> Dict[str, Dict[str, float]]:
+        """Returns the bandwidth used by every client.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Sent and received bytes per second by client address.
+        """
+        return {f'{host}:{port}': client.bandwidth() for (host, port), client in self.clients.items()}
+
+    async def listen(self, host: str, port: int) -> None:
+        """Starts receiving client packets on an address.
+
+        Args:
+            host (str): Address to listen on.
+            port (int): Port to listen on.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, local_addr=(host, port))
+
+    async def serve(self, host: str, port: int, stats_interval: float = 0) -> None:
+        """Listens for clients and runs the simulation in real time until cancelled.
+
+        Args:
+            host (str): Address to listen on.
+            port (int): Port to listen on.
+            stats_interval (float, optional): Seconds between bandwidth reports, 0 to not report. Defaults to 0.
+        """
+        loop = asyncio.get_running_loop()
+        await self.listen(host, port)
+        step = FIXED_TIMESTEP / 1000
+        next_tick = loop.time()
+        next_stats = loop.time() + stats_interval
+        try:
+            while True:
+                self.tick()
+                if stats_interval and loop.time() >= next_stats:
+                    next_stats += stats_interval
+                    for address, usage in self.bandwidth().items():
+                        print(f"{address}: sent {usage['sent_bytes_per_second']:.0f} B/s, "
+                              f"received {usage['received_bytes_per_second']:.0f} B/s, "
+                              f"{usage['entities']} entities in view")
+
+                next_tick += step
+                await asyncio.sleep(max(0, next_tick - loop.time()))
+        finally:
+            self.transport.close()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Runs a headless authoritative game server.")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--stats', type=float, default=5, help="seconds between bandwidth reports, 0 to disable")
+    args = parser.parse_args()
+
+    pygame.init()
+    # images are converted to the display format, so a (dummy) display is still needed
+    pygame.display.set_mode((WIDTH, HEIGTH))
+    asyncio.run(GameServer().serve(args.host, args.port, args.stats))
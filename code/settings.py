@@ -4,11 +4,79 @@ HEIGTH = 680
 FPS = 60
 TILESIZE = 64
 
+# simulation
+FIXED_TIMESTEP = 1000 / FPS # milliseconds simulated per update
+MAX_FRAME_TIME = 250 # longest frame that is caught up on, so a hitch can't snowball
+
 # camera and player speed
 SMOOTH_SPEED = 0.07
 PLAYER_SPEED = 5
 PLAYER_ANIMATION_SPEED = 0.15
 
+# map
+MAP_LAYERS = {
+    'boundary': '../map/map_FloorBlocks.csv',
+    'grass': '../map/map_Grass.csv',
+    'object': '../map/map_Objects.csv',
+    'entities': '../map/map_Entities.csv'}
+MAP_FILE = '../map/map.bin' # compiled by map_compiler.py, the csv files are used if it's missing or outdated
+
+# world streaming
+WORLD_CHUNK_TILES = 16 # width and height of a world chunk in tiles
+STREAM_LOAD_MARGIN = TILESIZE * 16 # chunks this close to the screen around the player get loaded
+STREAM_UNLOAD_MARGIN = TILESIZE * 32 # chunks further away than this get unloaded
+CHUNK_LOADS_PER_FRAME = 1
+
+# enemy AI
+FLOW_FIELD_RADIUS = 32 # tiles the path distance field reaches out from the players
+AI_WAKE_MARGIN = TILESIZE * 2 # idle enemies this much further than their notice radius are still updated every tick
+AI_DROWSY_INTERVAL = 4 # ticks between updates of idle enemies further away, up to their max follow distance
+AI_SLEEP_MARGIN = TILESIZE * 2 # enemies this much further than their max follow distance stop updating until a player comes close
+
+# networking
+SERVER_PORT = 7777
+SNAPSHOT_INTERVAL = 2 # server ticks between snapshots
+SNAPSHOT_HISTORY = 32 # sent snapshots kept per client to delta compress against
+INPUT_BUFFER_SIZE = 64 # unacknowledged inputs the client keeps and resends
+INTERPOLATION_DELAY = 6 # ticks the client renders behind the newest snapshot
+CORRECTION_SMOOTH_SPEED = 0.2 # part of a prediction error of the local player that is drawn away every tick
+CORRECTION_SNAP_DISTANCE = TILESIZE * 2 # prediction errors larger than this are corrected at once
+CLIENT_TIMEOUT = 5 # seconds without packets before the server drops a client
+AOI_MARGIN = TILESIZE * 4 # entities this far outside the screen around a player are still sent to its client
+AOI_HYSTERESIS = TILESIZE # entities only stop being sent once they are this much further out, so they don't flicker in and out
+ROOM_WORKERS = None # processes the room server runs its rooms on, None for one per cpu
+ROOM_REPORT_INTERVAL = 1 # seconds between the entity counts a room worker reports
+MAX_ROOM_NAME = 32 # bytes
+MAX_ROOMS = 64 # rooms the room server runs at once, joins that would open another one are ignored
+ROOM_IDLE_TIMEOUT = 30 # seconds a room without players stays open
+
+# rendering
+CHUNK_SIZE = TILESIZE * 8 # size of the chunks static sprites are culled in
+PARTICLE_POOL_SIZE = 512 # particles that can be alive at once per layer, effects spawned while a layer is full are dropped
+PARTICLE_ANIMATION_SPEED = 0.15 # frames per tick
+
+# profiling
+PROFILER_HISTORY = 240 # frames shown in the frame time graph
+PROFILER_TRACE_EVENTS = 200000 # newest timed events kept for the trace export
+PROFILER_TRACE_DIR = '../profiles' # where traces are exported to
+
+# assets
+ASSET_CACHE_BUDGET = None # max bytes of decoded images kept in memory, None for no limit
+ATLAS_FOLDERS = [ # every image below these folders is packed into one texture atlas per folder
+    '../graphics/player',
+    '../graphics/monsters',
+    '../graphics/particles',
+    '../graphics/weapons']
+ATLAS_DIR = '../graphics/atlas' # prebuilt atlases, built by atlas.py and packed at startup if missing or outdated
+ATLAS_WIDTH = 2048 # width of an atlas sheet in pixels
+LOADER_WORKERS = None # threads that decode assets at startup, None for one per cpu
+MANIFEST_FOLDERS = ATLAS_FOLDERS + [ # every image below these folders is listed in the asset manifest
+    '../graphics/grass',
+    '../graphics/objects',
+    '../graphics/tilemap',
+    '../graphics/test']
+ASSET_MANIFEST = '../graphics/manifest.json' # built by manifest.py, rebuild it after adding or changing images
+
 # UI
 BAR_HEIGHT = 26
 HEALTH_BAR_WIDTH = 200
@@ -16,6 +84,7 @@ ENERGY_BAR_WIDTH = 140
 ITEM_BOX_SIZE = 80
 UI_FONT = "../graphics/font/joystix.ttf"
 UI_FONT_SIZE = 18
+TEXT_CACHE_SIZE = 256 # rendered texts kept by the UI and debug overlay before the cache is cleared
 
 # general colours
 WATER_COLOUR = '#71DDEE'
@@ -54,4 +123,5 @@ ENEMY_DATA = {
 	'squid': {'health': 100,'exp':100,'damage':20,'attack_type': 'slash', 'attack_sound':'../audio/attack/slash.wav', 'speed': 3, 'resistance': 3, 'attack_radius': 80, 'notice_radius': 360, 'max_follow_distance': 1000},
 	'raccoon': {'health': 300,'exp':250,'damage':40,'attack_type': 'claw',  'attack_sound':'../audio/attack/claw.wav','speed': 2, 'resistance': 3, 'attack_radius': 120, 'notice_radius': 400, 'max_follow_distance': 2000},
 	'spirit': {'health': 100,'exp':110,'damage':8,'attack_type': 'thunder', 'attack_sound':'../audio/attack/fireball.wav', 'speed': 4, 'resistance': 3, 'attack_radius': 60, 'notice_radius': 350, 'max_follow_distance': 1000},
-	'bamboo': {'health': 70,'exp':120,'damage':6,'attack_type': 'leaf_attack', 'attack_sound':'../audio/attack/slash.wav', 'speed': 3, 'resistance': 3, 'attack_radius': 50, 'notice_radius': 300, 'max_follow_distance': 1000}}
\ No newline at end of file
+	'bamboo': {'health': 70,'exp':120,'damage':6,'attack_type': 'leaf_attack', 'attack_sound':'../audio/attack/slash.wav', 'speed': 3, 'resistance': 3, 'attack_radius': 50, 'notice_radius': 300, 'max_follow_distance': 1000}}
+ENEMY_TILES = {390: 'bamboo', 391: 'spirit', 392: 'raccoon', 393: 'squid'} # monsters by their tile id in the entities layer
@@ -0,0 +1,98 @@
+import pygame
+from typing import Dict, Hashable, List, Tuple
+from settings import *
+
+
+class SpatialHash:
+    def __init__(self, cell_size: int = TILESIZE) -> None:
+        """Uniform grid that buckets items by the cells their rect overlaps.
+
+        Args:
+            cell_size (int, optional): Width and height of a cell in pixels. Defaults to TILESIZE.
+        """
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], Dict[Hashable, None]] = {}
+        self.item_cells: Dict[Hashable, Tuple[Tuple[int, int], ...]] = {}
+
+    def cells_for(self, rect: pygame.Rect) -> Tuple[Tuple[int, int], ...]:
+        """Returns the keys of every cell a rect overlaps.
+
+        Args:
+            rect (pygame.Rect): The rect to look up.
+
+        Returns:
+            Tuple[Tuple[int, int], ...]: (column, row) keys of the overlapped cells.
+        """
+        size = self.cell_size
+        left = rect.left // size
+        top = rect.top // size
+        right = max(rect.right - 1, rect.left) // size
+        bottom = max(rect.bottom - 1, rect.top) // size
+        return tuple((col, row)
+                     for row in range(top, bottom + 1)
+                     for col in range(left, right + 1))
+
+    def insert(self, item: Hashable, rect: pygame.Rect) -> None:
+        """Adds an item to every cell its rect overlaps.
+
+        Args:
+            item (Hashable): The item to store, usually a sprite.
+            rect (pygame.Rect): The area the item covers.
+        """
+        if item in self.item_cells:
+            self.remove(item)
+        keys = self.cells_for(rect)
+        for key in keys:
+            self.cells.setdefault(key, {})[item] = None
+        self.item_cells[item] = keys
+
+    def move(self, item: Hashable, rect: pygame.Rect) -> None:
+        """Updates the cells of an item after its rect moved, does nothing if it still overlaps the same cells.
+
+        Args:
+            item (Hashable): The stored item.
+            rect (pygame.Rect): The new area of the item.
+        """
+        # the cells of a rect are a block, it's the same block if the first and last cell are the same
+        size = self.cell_size
+        keys = self.item_cells.get(item)
+        if (keys and keys[0] == (rect.left // size, rect.top // size)
+                and keys[-1] == (max(rect.right - 1, rect.left) // size, max(rect.bottom - 1, rect.top) // size)):
+            return
+        self.insert(item, rect)
+
+    def remove(self, item: Hashable) -> None:
+        """Removes an item from the grid, does nothing if it isn't stored.
+
+        Args:
+            item (Hashable): The item to remove.
+        """
+        for key in self.item_cells.pop(item, ()):
+            cell = self.cells[key]
+            del cell[item]
+            if not cell:
+                del self.cells[key]
+
+    def query(self, rect: pygame.Rect) -> List[Hashable]:
+        """Returns every item stored in the cells a rect overlaps.
+        The result is a broad phase, items still have to be tested against the rect.
+
+        Args:
+            rect (pygame.Rect): The area to look up.
+
+        Returns:
+            List[Hashable]: The items, each listed once and in insertion order per cell.
+        """
+        cells = self.cells
+        found = {}
+        for key in self.cells_for(rect):
+            cell = cells.get(key)
+            if cell:
+                found.update(cell)
+        return list(found)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self.item_cells
+
+    def __len__(self) -> int:
+        return len(self.item_cells)
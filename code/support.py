@@ -1,7 +1,13 @@
 from csv import reader
-from os import walk
+from os import path as os_path
 import pygame
-from typing import List
+import warnings
+from assets import load_image
+from atlas import get_atlas
+from manifest import asset_manifest
+from typing import Dict, List
+from settings import *
+from map_compiler import load_compiled_map
 
 
 def import_csv_layout(path: str) -> List[List[int]]:
@@ -17,12 +23,29 @@ def import_csv_layout(path: str) -> List[List[int]]:
     with open(path) as level_map:
         layout = reader(level_map, delimiter=",")
         for row in layout:
-            terrain_map.append(row)
+            terrain_map.append([int(tile) for tile in row])
         return terrain_map
 
 
+def import_map_layout() -> Dict[str, List[List[int]]]:
+    """Imports every layer of the game map that the level uses.
+    The compiled map is used when it's up to date and complete, otherwise the csv files are parsed.
+
+    Returns:
+        Dict[str, List[List[int]]]: The layouts of the map layers by their name.
+    """
+    if os_path.exists(MAP_FILE):
+        compiled_time = os_path.getmtime(MAP_FILE)
+        if all(os_path.getmtime(path) <= compiled_time for path in MAP_LAYERS.values()):
+            try:
+                return load_compiled_map(MAP_FILE)
+            except ValueError as error:
+                warnings.warn(f"{error}, reading the csv files instead")
+    return {name: import_csv_layout(path) for name, path in MAP_LAYERS.items()}
+
+
 def import_folder(path: str) -> List[pygame.Surface]:
-    """Returns all images in a folder parsed as pygame surfaces.
+    """Returns all images in a folder parsed as pygame surfaces, in the frame order of the asset manifest.
 
     Args:
         path (str): Path to the folder.
@@ -30,10 +53,32 @@ def import_folder(path: str) -> List[pygame.Surface]:
     Returns:
         List[pygame.Surface]: An array containing the parsed surfaces.
     """
-    surface_list = []
-    for _, __, img_files in walk(path):
-        for image in img_files:
-            full_path = f"{path}/{image}"
-            image_surf = pygame.image.load(full_path).convert_alpha()
-            surface_list.append(image_surf)
-    return surface_list
+    return [load_image(image_path) for image_path in asset_manifest.frames(path)]
+
+
+def import_tiles(path: str) -> Dict[int, pygame.Surface]:
+    """Returns the images in a folder by their tile id, the number in their file name.
+
+    Args:
+        path (str): Path to the folder.
+
+    Returns:
+        Dict[int, pygame.Surface]: The parsed surfaces by tile id.
+    """
+    return {tile_id: load_image(image_path) for tile_id, image_path in asset_manifest.tiles(path).items()}
+
+
+def import_atlas(path: str) -> List[pygame.Surface]:
+    """Returns all images in a folder as subsurfaces of the texture atlas the folder is packed in.
+    Falls back to import_folder for folders that aren't part of an atlas.
+
+    Args:
+        path (str): Path to the folder.
+
+    Returns:
+        List[pygame.Surface]: An array containing the images, in the same order as import_folder.
+    """
+    atlas = get_atlas(path)
+    if atlas is None:
+        return import_folder(path)
+    return atlas.folder(path)
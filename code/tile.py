@@ -11,7 +11,6 @@ class Tile(pygame.sprite.Sprite):
         surface=pygame.Surface(
             (TILESIZE,
              TILESIZE))) -> None:
-        super().__init__(groups)
         self.sprite_type = sprite_type
         self.image = surface
         if sprite_type == 'object':
@@ -22,3 +21,6 @@ class Tile(pygame.sprite.Sprite):
         else:
             self.rect = self.image.get_rect(topleft=pos)
             self.hitbox = self.rect.inflate(0, -30).move(0, -10)
+
+        # joined last, the obstacle group indexes the hitbox when a tile is added
+        super().__init__(groups)
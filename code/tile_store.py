@@ -0,0 +1,292 @@
+import pygame
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Optional, Tuple
+from settings import *
+
+# tile kinds, boundary tiles collide but are never drawn
+BOUNDARY = 0
+GRASS = 1
+OBJECT = 2
+REMOVED = 255
+TILE_KINDS = {'boundary': BOUNDARY, 'grass': GRASS, 'object': OBJECT}
+
+NO_IMAGE = -1 # image index of invisible tiles
+NO_ENTRY = -1 # end of the tile list of a grid cell
+
+
+class TileStore:
+    def __init__(self, columns: int, rows: int, chunk_size: int = CHUNK_SIZE) -> None:
+        """Static tiles stored as rows of typed arrays instead of one sprite per tile.
+        A tile is only a row index: its kind, rect, hitbox and image index live in the columns below,
+        so a tile costs a few dozen bytes instead of a sprite with its own dict and rects.
+        Tiles are indexed twice, by the map cells their hitbox overlaps for collisions
+        and, if they have an image, by the chunk they're in, depth sorted, for drawing.
+
+        Args:
+            columns (int): Width of the map in tiles.
+            rows (int): Height of the map in tiles.
+            chunk_size (int, optional): Size of the drawing chunks in pixels. Defaults to CHUNK_SIZE.
+        """
+        self.columns = columns
+        self.rows = rows
+        self.chunk_size = chunk_size
+
+        # one entry per tile row
+        self.kind = array('B')
+        self.image = array('i')
+        self.x = array('i')
+        self.y = array('i')
+        self.width = array('i')
+        self.height = array('i')
+        self.hitbox_x = array('i')
+        self.hitbox_y = array('i')
+        self.hitbox_width = array('i')
+        self.hitbox_height = array('i')
+        self.free_rows = array('i') # rows of removed tiles, reused by the next tiles added
+        self.count = 0
+        self.version = 0 # changes whenever a tile is added or removed
+
+        # the images are shared by many tiles, tiles only store their index
+        self.images: List[pygame.Surface] = []
+        self.image_ids: Dict[pygame.Surface, int] = {}
+
+        # collision grid, one cell per map tile. Every cell points to the first entry of a linked list
+        # of the tiles whose hitbox overlaps it, hitboxes outside the map are clamped to the edge cells
+        self.cell_first = array('i', [NO_ENTRY]) * (columns * rows)
+        self.entry_row = array('i')
+        self.entry_next = array('i')
+        self.free_entries = array('i')
+
+        # drawing chunks, (centery << 32 | row) keys kept sorted, so the rows are in depth order
+        self.chunks: Dict[Tuple[int, int], array] = {}
+        # widest or tallest tile image, chunks this far outside the camera can still reach into it
+        self.margin = 0
+
+    def image_id(self, image: pygame.Surface) -> int:
+        """Returns the index of an image, adding it the first time.
+
+        Args:
+            image (pygame.Surface): The image.
+
+        Returns:
+            int: Index of the image in self.images.
+        """
+        image_id = self.image_ids.get(image)
+        if image_id is None:
+            image_id = self.image_ids[image] = len(self.images)
+            self.images.append(image)
+            self.margin = max(self.margin, *image.get_size())
+        return image_id
+
+    def add(self, pos: Tuple[int, int], sprite_type: str, image: Optional[pygame.Surface] = None) -> int:
+        """Adds a tile, with the same rect and hitbox a Tile sprite would have.
+
+        Args:
+            pos (Tuple[int, int]): Top left of the map tile in pixels.
+            sprite_type (str): 'boundary', 'grass' or 'object'.
+            image (Optional[pygame.Surface], optional): What the tile looks like. Defaults to None, an invisible tile.
+
+        Returns:
+            int: The row of the tile.
+        """
+        kind = TILE_KINDS[sprite_type]
+        x, y = pos
+        width, height = image.get_size() if image else (TILESIZE, TILESIZE)
+        if kind == OBJECT:
+            # objects stand on the tile below their position, their hitbox only covers their base
+            y -= TILESIZE
+            hitbox = (x + 1, y + 23, width - 2, height - 62)
+        else:
+            hitbox = (x, y + 5, width, height - 30)
+        image_id = self.image_id(image) if image else NO_IMAGE
+
+        if self.free_rows:
+            row = self.free_rows.pop()
+            self.kind[row] = kind
+            self.image[row] = image_id
+            self.x[row], self.y[row], self.width[row], self.height[row] = x, y, width, height
+            self.hitbox_x[row], self.hitbox_y[row], self.hitbox_width[row], self.hitbox_height[row] = hitbox
+        else:
+            row = len(self.kind)
+            self.kind.append(kind)
+            self.image.append(image_id)
+            self.x.append(x)
+            self.y.append(y)
+            self.width.append(width)
+            self.height.append(height)
+            self.hitbox_x.append(hitbox[0])
+            self.hitbox_y.append(hitbox[1])
+            self.hitbox_width.append(hitbox[2])
+            self.hitbox_height.append(hitbox[3])
+        self.count += 1
+        self.version += 1
+
+        for cell in self.cells_for(*hitbox):
+            self.link(cell, row)
+        if image_id != NO_IMAGE:
+            centery = y + height // 2
+            insort(self.chunks.setdefault(self.chunk_at(x + width // 2, centery), array('q')), (centery << 32) | row)
+        return row
+
+    def remove(self, row: int) -> None:
+        """Removes a tile, its row is reused by a later tile.
+
+        Args:
+            row (int): The row of the tile.
+        """
+        for cell in self.cells_for(self.hitbox_x[row], self.hitbox_y[row], self.hitbox_width[row], self.hitbox_height[row]):
+            self.unlink(cell, row)
+        if self.image[row] != NO_IMAGE:
+            centery = self.y[row] + self.height[row] // 2
+            chunk = self.chunk_at(self.x[row] + self.width[row] // 2, centery)
+            keys = self.chunks[chunk]
+            keys.remove((centery << 32) | row)
+            if not keys:
+                del self.chunks[chunk]
+
+        self.kind[row] = REMOVED
+        self.free_rows.append(row)
+        self.count -= 1
+        self.version += 1
+
+    def link(self, cell: int, row: int) -> None:
+        """Puts a tile at the front of the list of a grid cell.
+
+        Args:
+            cell (int): Index of the cell.
+            row (int): The row of the tile.
+        """
+        if self.free_entries:
+            entry = self.free_entries.pop()
+            self.entry_row[entry] = row
+            self.entry_next[entry] = self.cell_first[cell]
+        else:
+            entry = len(self.entry_row)
+            self.entry_row.append(row)
+            self.entry_next.append(self.cell_first[cell])
+        self.cell_first[cell] = entry
+
+    def unlink(self, cell: int, row: int) -> None:
+        """Takes a tile out of the list of a grid cell.
+
+        Args:
+            cell (int): Index of the cell.
+            row (int): The row of the tile.
+        """
+        previous = NO_ENTRY
+        entry = self.cell_first[cell]
+        while self.entry_row[entry] != row:
+            previous = entry
+            entry = self.entry_next[entry]
+        if previous == NO_ENTRY:
+            self.cell_first[cell] = self.entry_next[entry]
+        else:
+            self.entry_next[previous] = self.entry_next[entry]
+        self.free_entries.append(entry)
+
+    def cells_for(self, left: int, top: int, width: int, height: int) -> Iterator[int]:
+        """Yields the index of every grid cell a rect overlaps, clamped to the map.
+
+        Args:
+            left (int): Left edge of the rect.
+            top (int): Top edge of the rect.
+            width (int): Width of the rect.
+            height (int): Height of the rect.
+
+        Yields:
+            Iterator[int]: Indices of the overlapped cells.
+        """
+        columns = self.columns
+        first_col = min(max(left // TILESIZE, 0), columns - 1)
+        last_col = min(max((left + width - 1) // TILESIZE, first_col), columns - 1)
+        first_row = min(max(top // TILESIZE, 0), self.rows - 1)
+        last_row = min(max((top + height - 1) // TILESIZE, first_row), self.rows - 1)
+        for start in range(first_row * columns, last_row * columns + 1, columns):
+            yield from range(start + first_col, start + last_col + 1)
+
+    def chunk_at(self, x: int, y: int) -> Tuple[int, int]:
+        """Returns the key of the drawing chunk a position is in.
+
+        Args:
+            x (int): x coordinate in pixels.
+            y (int): y coordinate in pixels.
+
+        Returns:
+            Tuple[int, int]: (column, row) of the chunk.
+        """
+        return (x // self.chunk_size, y // self.chunk_size)
+
+    def rect(self, row: int) -> pygame.Rect:
+        return pygame.Rect(self.x[row], self.y[row], self.width[row], self.height[row])
+
+    def hitbox(self, row: int) -> pygame.Rect:
+        return pygame.Rect(self.hitbox_x[row], self.hitbox_y[row], self.hitbox_width[row], self.hitbox_height[row])
+
+    def query(self, rect: pygame.Rect) -> List[int]:
+        """Returns the tiles in the grid cells a rect overlaps.
+        The result is a broad phase, the hitboxes still have to be tested against the rect.
+
+        Args:
+            rect (pygame.Rect): The area to look up.
+
+        Returns:
+            List[int]: The rows, each listed once.
+        """
+        cell_first, entry_row, entry_next = self.cell_first, self.entry_row, self.entry_next
+        found = {}
+        for cell in self.cells_for(*rect):
+            entry = cell_first[cell]
+            while entry != NO_ENTRY:
+                found[entry_row[entry]] = None
+                entry = entry_next[entry]
+        return list(found)
+
+    def query_hitboxes(self, rect: pygame.Rect) -> List[pygame.Rect]:
+        """Returns the hitboxes of the tiles in the grid cells a rect overlaps.
+
+        Args:
+            rect (pygame.Rect): The area to look up.
+
+        Returns:
+            List[pygame.Rect]: The hitboxes that might collide with the rect.
+        """
+        return [self.hitbox(row) for row in self.query(rect)]
+
+    def visible(self, camera_rect: pygame.Rect) -> List[Tuple[int, pygame.Surface, Tuple[int, int]]]:
+        """Returns the drawn tiles that overlap the camera, looked up by the chunks the camera touches.
+
+        Args:
+            camera_rect (pygame.Rect): The area of the map on screen.
+
+        Returns:
+            List[Tuple[int, pygame.Surface, Tuple[int, int]]]: centery, image and top left of every tile,
+                back to front within each chunk.
+        """
+        search_rect = camera_rect.inflate(self.margin * 2, self.margin * 2)
+        left, top = self.chunk_at(*search_rect.topleft)
+        right, bottom = self.chunk_at(*search_rect.bottomright)
+        camera_left, camera_top, camera_right, camera_bottom = camera_rect.left, camera_rect.top, camera_rect.right, camera_rect.bottom
+        xs, ys, widths, heights = self.x, self.y, self.width, self.height
+        images, image_ids = self.images, self.image
+        # the keys are sorted by centery, only tiles with their center this close to the camera can overlap it
+        first_key = (search_rect.top + self.margin // 2) << 32
+        last_key = (search_rect.bottom - self.margin // 2 + 1) << 32
+
+        visible = []
+        for chunk_row in range(top, bottom + 1):
+            for chunk_col in range(left, right + 1):
+                keys = self.chunks.get((chunk_col, chunk_row))
+                if not keys:
+                    continue
+                for index in range(bisect_left(keys, first_key), bisect_left(keys, last_key)):
+                    key = keys[index]
+                    row = key & 0xFFFFFFFF
+                    x = xs[row]
+                    y = ys[row]
+                    if x < camera_right and x + widths[row] > camera_left and y < camera_bottom and y + heights[row] > camera_top:
+                        visible.append((key >> 32, images[image_ids[row]], (x, y)))
+        return visible
+
+    def __len__(self) -> int:
+        return self.count
@@ -0,0 +1,45 @@
+import pygame
+from typing import Union
+
+
+class SystemClock:
+    """Clock that reads the real time since pygame was initialised.
+    """
+
+    def get_ticks(self) -> Union[int, float]:
+        """Returns the current time.
+
+        Returns:
+            Union[int, float]: Time in milliseconds.
+        """
+        return pygame.time.get_ticks()
+
+
+class FixedClock:
+    def __init__(self, start: Union[int, float] = 0) -> None:
+        """Clock that only moves forward when it's told to,
+        used to step the simulation at a fixed timestep independent of the real time.
+
+        Args:
+            start (Union[int, float], optional): Starting time in milliseconds. Defaults to 0.
+        """
+        self.time = start
+
+    def advance(self, milliseconds: Union[int, float]) -> None:
+        """Moves the clock forward.
+
+        Args:
+            milliseconds (Union[int, float]): Amount of time to move forward.
+        """
+        self.time += milliseconds
+
+    def get_ticks(self) -> Union[int, float]:
+        """Returns the current time.
+
+        Returns:
+            Union[int, float]: Time in milliseconds.
+        """
+        return self.time
+
+
+system_clock = SystemClock()
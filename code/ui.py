@@ -1,6 +1,8 @@
 import pygame
 from settings import *
 from player import Player
+from atlas import load_frame
+from typing import Dict, List, Tuple
 
 
 class UI:
@@ -17,124 +19,167 @@ class UI:
         self.weapon_graphics = []
         for weapon in WEAPON_DATA.values():
             path = weapon['graphic']
-            weapon = pygame.image.load(path).convert_alpha()
+            weapon = load_frame(path)
             self.weapon_graphics.append(weapon)
 
-    def show_bar(
+        # the HUD is retained: every element is kept rendered with the values it was rendered from
+        self.values = {}
+        self.elements: Dict[str, Tuple[pygame.Surface, pygame.Rect]] = {}
+        self.changed = set()
+        self.text_cache: Dict[str, pygame.Surface] = {}
+
+    def render_bar(
             self,
             current: int,
             max_amount: int,
             bg_rect: pygame.Rect,
-            colour: str) -> None:
-        """Renders a bar onto the screen.
+            colour: str) -> Tuple[pygame.Surface, pygame.Rect]:
+        """Renders a bar.
 
         Args:
             current (int): Current value of the bar.
             max_amount (int): Max value of the bar.
-            bg_rect (pygame.Rect): The Rect object to modify and draw to screen.
+            bg_rect (pygame.Rect): Where the bar goes on the screen.
             colour (str): pygame colour name or hex code
+
+        Returns:
+            Tuple[pygame.Surface, pygame.Rect]: The bar and where to blit it.
         """
+        surface = pygame.Surface(bg_rect.size)
+        local_rect = surface.get_rect()
+
         # draw background:
-        pygame.draw.rect(self.display_surface, UI_BG_COLOUR, bg_rect)
+        pygame.draw.rect(surface, UI_BG_COLOUR, local_rect)
 
         # stat -> ration conversion
         ratio = current / max_amount
-        current_width = bg_rect.width * ratio
-        current_rect = bg_rect.copy()
+        current_width = local_rect.width * ratio
+        current_rect = local_rect.copy()
         current_rect.width = current_width
 
         # draw bar:
-        pygame.draw.rect(self.display_surface, colour, current_rect)
-        pygame.draw.rect(self.display_surface, UI_BORDER_COLOUR, bg_rect, 3)
+        pygame.draw.rect(surface, colour, current_rect)
+        pygame.draw.rect(surface, UI_BORDER_COLOUR, local_rect, 3)
+        return surface, bg_rect.copy()
 
-    def show_exp(self, exp: int) -> None:
-        """Renders exp amount onto the screen in the bottom right, on top of a background.
+    def render_text(self, text: str) -> pygame.Surface:
+        """Renders a text with the UI font, every text is only rendered once.
 
         Args:
-            exp (int): Amount of Exp.
+            text (str): The text.
+
+        Returns:
+            pygame.Surface: The rendered text.
         """
-        text_surf = self.font.render(str(exp), False, TEXT_COLOUR)
-        x, y = self.display_surface.get_size()
-        x, y = x - 20, y - 20
-        text_rect = text_surf.get_rect(bottomright=(x, y))
-
-        pygame.draw.rect(
-            self.display_surface,
-            UI_BG_COLOUR,
-            text_rect.inflate(
-                20,
-                20))
-        self.display_surface.blit(text_surf, text_rect)
-        pygame.draw.rect(
-            self.display_surface,
-            UI_BORDER_COLOUR,
-            text_rect.inflate(
-                20,
-                20),
-            3)
-
-    def selection_box(
-            self,
-            left: float,
-            top: float,
-            has_switched: bool) -> pygame.Rect:
-        """Creates a box background at the given coords
-        with an outline that turns gold if has switched is true.
+        text_surf = self.text_cache.get(text)
+        if text_surf is None:
+            if len(self.text_cache) >= TEXT_CACHE_SIZE:
+                self.text_cache.clear()
+            text_surf = self.text_cache[text] = self.font.render(text, False, TEXT_COLOUR)
+        return text_surf
+
+    def render_exp(self, exp: int, screen_size: Tuple[int, int]) -> Tuple[pygame.Surface, pygame.Rect]:
+        """Renders the exp amount on top of a background, for the bottom right of the screen.
 
         Args:
-            left (float): Amount of pixels from the left side of the screen.
-            top (float): Amount of pixels from the top of the screen.
-            has_switched (bool): Whether or not to make the outline gold.
+            exp (int): Amount of Exp.
+            screen_size (Tuple[int, int]): Size of the screen.
 
         Returns:
-            pygame.Rect: The selection box object (not the outline)
+            Tuple[pygame.Surface, pygame.Rect]: The box and where to blit it.
         """
-        bg_rect = pygame.Rect(left, top, ITEM_BOX_SIZE, ITEM_BOX_SIZE)
-        pygame.draw.rect(self.display_surface, UI_BG_COLOUR, bg_rect)
-        if has_switched:
-            pygame.draw.rect(
-                self.display_surface,
-                UI_BORDER_COLOUR_ACTIVE,
-                bg_rect,
-                3)
-        else:
-            pygame.draw.rect(
-                self.display_surface,
-                UI_BORDER_COLOUR,
-                bg_rect,
-                3)
-        return bg_rect
+        text_surf = self.render_text(str(exp))
+        x, y = screen_size
+        x, y = x - 20, y - 20
+        box_rect = text_surf.get_rect(bottomright=(x, y)).inflate(20, 20)
 
-    def weapon_overlay(self, weapon_index: int, has_switched: bool) -> None:
-        """Creates a box in the bottom left corner containing the currently selected weapon.
+        surface = pygame.Surface(box_rect.size)
+        local_rect = surface.get_rect()
+        pygame.draw.rect(surface, UI_BG_COLOUR, local_rect)
+        surface.blit(text_surf, (10, 10))
+        pygame.draw.rect(surface, UI_BORDER_COLOUR, local_rect, 3)
+        return surface, box_rect
+
+    def render_weapon(self, weapon_index: int, has_switched: bool, screen_height: int) -> Tuple[pygame.Surface, pygame.Rect]:
+        """Renders a box containing the currently selected weapon, for the bottom left of the screen.
+        The outline turns gold if the player has recently switched weapons.
 
         Args:
             weapon_index (int): Weapon index of player, what weapon they have equipped.
             has_switched (bool): If the player has recently switched weapons.
+            screen_height (int): Height of the screen.
+
+        Returns:
+            Tuple[pygame.Surface, pygame.Rect]: The box and where to blit it.
         """
-        bg_rect = self.selection_box(10, self.display_surface.get_size()[
-                                     1] - 10 - ITEM_BOX_SIZE, has_switched)
+        box_rect = pygame.Rect(10, screen_height - 10 - ITEM_BOX_SIZE, ITEM_BOX_SIZE, ITEM_BOX_SIZE)
+        surface = pygame.Surface(box_rect.size)
+        local_rect = surface.get_rect()
+        pygame.draw.rect(surface, UI_BG_COLOUR, local_rect)
+        if has_switched:
+            pygame.draw.rect(surface, UI_BORDER_COLOUR_ACTIVE, local_rect, 3)
+        else:
+            pygame.draw.rect(surface, UI_BORDER_COLOUR, local_rect, 3)
+
         weapon_surf = self.weapon_graphics[weapon_index]
-        weapon_rect = weapon_surf.get_rect(center=bg_rect.center)
+        surface.blit(weapon_surf, weapon_surf.get_rect(center=local_rect.center))
+        return surface, box_rect
 
-        self.display_surface.blit(weapon_surf, weapon_rect)
+    def update(self, player: Player) -> bool:
+        """Re-renders the HUD elements whose values changed since they were last rendered.
 
-    def display(self, player: Player) -> None:
-        """Runs functions to blit all of the bars and other UI objects to the screen
+        Args:
+            player (Player): our player object
+
+        Returns:
+            bool: True if an element no longer covers all of its old area,
+                so what is behind the HUD has to be redrawn before it.
+        """
+        screen_size = self.display_surface.get_size()
+        values = {
+            'health': (player.health, player.stats['health']),
+            'energy': (player.energy, player.stats['energy']),
+            'exp': (player.exp, screen_size),
+            'weapon': (player.weapon_index, not player.can_switch_weapons, screen_size[1])}
+
+        uncovered = False
+        for name, value in values.items():
+            if self.values.get(name) == value:
+                continue
+            self.values[name] = value
+            if name == 'health':
+                element = self.render_bar(*value, self.health_bar_rect, HEALTH_COLOUR)
+            elif name == 'energy':
+                element = self.render_bar(*value, self.energy_bar_rect, ENERGY_COLOUR)
+            elif name == 'exp':
+                element = self.render_exp(*value)
+            else:
+                element = self.render_weapon(*value)
+
+            old_element = self.elements.get(name)
+            if old_element and not element[1].contains(old_element[1]):
+                uncovered = True
+            self.elements[name] = element
+            self.changed.add(name)
+        return uncovered
+
+    def display(self, player: Player, redraw: bool = True) -> List[pygame.Rect]:
+        """Blits the bars and other UI objects to the screen. Each element is only
+        rendered again when the value it shows changes.
 
         Args:
             player (Player): our player object
+            redraw (bool, optional): Blit every element, because the screen below them was redrawn.
+                Otherwise only the elements that changed are blitted. Defaults to True.
+
+        Returns:
+            List[pygame.Rect]: The areas of the screen that were drawn to.
         """
-        self.show_bar(
-            player.health,
-            player.stats['health'],
-            self.health_bar_rect,
-            HEALTH_COLOUR)
-        self.show_bar(
-            player.energy,
-            player.stats['energy'],
-            self.energy_bar_rect,
-            ENERGY_COLOUR)
-
-        self.show_exp(player.exp)
-        self.weapon_overlay(player.weapon_index, not player.can_switch_weapons)
+        self.update(player)
+        dirty_rects = []
+        for name, (surface, rect) in self.elements.items():
+            if redraw or name in self.changed:
+                self.display_surface.blit(surface, rect)
+                dirty_rects.append(rect)
+        self.changed.clear()
+        return dirty_rects
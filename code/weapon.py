@@ -1,16 +1,21 @@
 import pygame
+from atlas import load_frame
 from player import Player
 
 
 class Weapon(pygame.sprite.Sprite):
     def __init__(self, player: Player, groups):
         super().__init__(groups)
+        self.player = player
+
+        # enemies this swing already hit, every swing hits an enemy once
+        self.hit_enemies = set()
 
         direction = player.status.split("_")[0]
 
         # Graphics:
         full_path = f'../graphics/weapons/{player.weapon}/{direction}.png'
-        self.image = pygame.image.load(full_path).convert_alpha()
+        self.image = load_frame(full_path)
 
         # Placement:
         if direction == "right":
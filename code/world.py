@@ -0,0 +1,145 @@
+import pygame
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from settings import *
+
+
+class WorldStreamer:
+    def __init__(
+            self,
+            layout: Dict[str, List],
+            load_chunk: Callable[[Tuple[int, int]], list],
+            unload_chunk: Callable[[Tuple[int, int], list], None]) -> None:
+        """Keeps the chunks of the map around the players loaded and unloads the ones far away from them.
+        Chunks near a player are queued and loaded a few per frame, so crossing into a new
+        area doesn't load a whole row of chunks in a single frame.
+
+        Args:
+            layout (Dict[str, List]): The map layers, rows of tile ids by layer name.
+            load_chunk (Callable[[Tuple[int, int]], list]): Creates the sprites of a chunk and returns them.
+            unload_chunk (Callable[[Tuple[int, int], list], None]): Removes the sprites of a chunk.
+        """
+        self.layout = layout
+        self.height = len(next(iter(layout.values())))
+        self.width = len(next(iter(layout.values()))[0])
+
+        self.chunk_size = WORLD_CHUNK_TILES * TILESIZE
+        self.columns = -(-self.width // WORLD_CHUNK_TILES)
+        self.rows = -(-self.height // WORLD_CHUNK_TILES)
+
+        self.load_chunk = load_chunk
+        self.unload_chunk = unload_chunk
+        self.loaded: Dict[Tuple[int, int], list] = {}
+        self.pending: Dict[Tuple[int, int], None] = {}
+        self.last_tiles = None
+
+    def chunk_at(self, pos: Tuple[float, float]) -> Tuple[int, int]:
+        """Returns the key of the chunk a position is in.
+
+        Args:
+            pos (Tuple[float, float]): x and y coordinates in pixels.
+
+        Returns:
+            Tuple[int, int]: (column, row) of the chunk.
+        """
+        return (int(pos[0]) // self.chunk_size, int(pos[1]) // self.chunk_size)
+
+    def chunks_around(self, center: Tuple[float, float], margin: int) -> List[Tuple[int, int]]:
+        """Returns the chunks of the map that overlap the screen area around a point plus a margin.
+
+        Args:
+            center (Tuple[float, float]): Centre of the area in pixels.
+            margin (int): Extra pixels around the screen area.
+
+        Returns:
+            List[Tuple[int, int]]: The chunk keys, closest to the centre first.
+        """
+        area = pygame.Rect(0, 0, WIDTH + margin * 2, HEIGTH + margin * 2)
+        area.center = (int(center[0]), int(center[1]))
+        left, top = self.chunk_at(area.topleft)
+        right, bottom = self.chunk_at(area.bottomright)
+        chunks = [(col, row)
+                  for row in range(max(top, 0), min(bottom, self.rows - 1) + 1)
+                  for col in range(max(left, 0), min(right, self.columns - 1) + 1)]
+
+        center_col, center_row = self.chunk_at(center)
+        chunks.sort(key=lambda chunk: abs(chunk[0] - center_col) + abs(chunk[1] - center_row))
+        return chunks
+
+    def chunk_tiles(self, chunk: Tuple[int, int]) -> Iterator[Tuple[str, int, int, int]]:
+        """Yields the non empty tiles of a chunk, layer by layer.
+
+        Args:
+            chunk (Tuple[int, int]): Key of the chunk.
+
+        Yields:
+            Iterator[Tuple[str, int, int, int]]: Layer name, row, column and tile id of every tile.
+        """
+        first_col = chunk[0] * WORLD_CHUNK_TILES
+        first_row = chunk[1] * WORLD_CHUNK_TILES
+        last_col = min(first_col + WORLD_CHUNK_TILES, self.width)
+        last_row = min(first_row + WORLD_CHUNK_TILES, self.height)
+        for style, rows in self.layout.items():
+            for row_index in range(first_row, last_row):
+                row = rows[row_index]
+                for col_index in range(first_col, last_col):
+                    tile = row[col_index]
+                    if tile != -1:
+                        yield style, row_index, col_index, tile
+
+    def find_tile(self, style: str, tile_id: int) -> Optional[Tuple[int, int]]:
+        """Finds the first tile with a given id in a layer.
+
+        Args:
+            style (str): Name of the layer.
+            tile_id (int): The tile id to look for.
+
+        Returns:
+            Optional[Tuple[int, int]]: Row and column of the tile, or None if the layer doesn't contain it.
+        """
+        for row_index, row in enumerate(self.layout[style]):
+            if tile_id in row:
+                return row_index, list(row).index(tile_id)
+        return None
+
+    def update(self, centers: List[Tuple[float, float]], immediate: bool = False) -> None:
+        """Loads the chunks that came close to any of the points and unloads the ones that got far away from all of them.
+        Unloading uses a bigger margin than loading, so walking back and forth over a chunk border
+        doesn't keep loading and unloading the same chunks.
+
+        Args:
+            centers (List[Tuple[float, float]]): The points to stream the world around, usually the players.
+            immediate (bool, optional): Load every chunk in range right away instead of a few per frame.
+                Defaults to False.
+        """
+        tiles = tuple((int(center[0]) // TILESIZE, int(center[1]) // TILESIZE) for center in centers)
+        if tiles != self.last_tiles or immediate:
+            self.last_tiles = tiles
+            wanted = {}
+            keep = set()
+            for center in centers:
+                wanted.update(dict.fromkeys(self.chunks_around(center, STREAM_LOAD_MARGIN)))
+                keep.update(self.chunks_around(center, STREAM_UNLOAD_MARGIN))
+
+            for chunk in [chunk for chunk in self.loaded if chunk not in keep]:
+                self.unload_chunk(chunk, self.loaded.pop(chunk))
+
+            # queue the missing chunks, closest first, and forget the ones that aren't needed anymore
+            self.pending = {chunk: None for chunk in wanted if chunk not in self.loaded}
+
+        budget = len(self.pending) if immediate else CHUNK_LOADS_PER_FRAME
+        while self.pending and budget > 0:
+            chunk = next(iter(self.pending))
+            del self.pending[chunk]
+            self.loaded[chunk] = self.load_chunk(chunk)
+            budget -= 1
+
+    def is_loaded(self, pos: Tuple[float, float]) -> bool:
+        """Returns whether the chunk at a position is loaded.
+
+        Args:
+            pos (Tuple[float, float]): x and y coordinates in pixels.
+
+        Returns:
+            bool: True if the chunk is loaded.
+        """
+        return self.chunk_at(pos) in self.loaded